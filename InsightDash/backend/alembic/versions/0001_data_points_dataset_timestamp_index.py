@@ -0,0 +1,33 @@
+"""composite (dataset_id, timestamp, id) index on data_points
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves ordered range scans and keyset pagination over one dataset;
+    # id breaks ties between points that share a timestamp.
+    op.create_index(
+        "ix_data_points_dataset_id_timestamp",
+        "data_points",
+        ["dataset_id", "timestamp", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_data_points_dataset_id_timestamp", table_name="data_points", if_exists=True)
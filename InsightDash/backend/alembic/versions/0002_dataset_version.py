@@ -0,0 +1,33 @@
+"""version counter on datasets
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases created by create_all after this change already have it
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("datasets")}
+    if "version" not in columns:
+        op.add_column(
+            "datasets",
+            sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("datasets") as batch_op:
+        batch_op.drop_column("version")
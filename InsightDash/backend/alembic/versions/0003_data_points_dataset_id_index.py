@@ -0,0 +1,32 @@
+"""(dataset_id, id) index on data_points
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Counts and reads a dataset's points past its segment watermark
+    op.create_index(
+        "ix_data_points_dataset_id_id",
+        "data_points",
+        ["dataset_id", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_data_points_dataset_id_id", table_name="data_points", if_exists=True)
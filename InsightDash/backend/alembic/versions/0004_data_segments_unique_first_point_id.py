@@ -0,0 +1,33 @@
+"""unique (dataset_id, first_point_id) on data_segments
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Two processes sealing the same id range: the second commit fails
+    op.create_index(
+        "uq_data_segments_dataset_id_first_point_id",
+        "data_segments",
+        ["dataset_id", "first_point_id"],
+        unique=True,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_data_segments_dataset_id_first_point_id", table_name="data_segments", if_exists=True)
@@ -0,0 +1,70 @@
+"""per-dataset partial meta_data indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+from app.models import models
+from app.services.meta_query import meta_query_service
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _registrations(bind):
+    if not sa.inspect(bind).has_table("dataset_indexes"):
+        return []
+    return bind.execute(sa.text("SELECT id, dataset_id, key, kind, index_name FROM dataset_indexes")).all()
+
+
+def _drop(bind, names) -> None:
+    preparer = bind.dialect.identifier_preparer
+    for name in names:
+        op.execute(f"DROP INDEX IF EXISTS {preparer.quote(name)}")
+
+
+def upgrade() -> None:
+    # Registrations used to point at one index per key shared by every dataset
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    shared = set()
+    for row in _registrations(bind):
+        index = meta_query_service.index_for(dialect, row.dataset_id, row.key, row.kind)
+        if row.index_name == index.name:
+            continue
+        index.dialect_options["postgresql"]["concurrently"] = False  # Runs inside the migration transaction
+        op.execute(CreateIndex(index, if_not_exists=True))
+        bind.execute(
+            sa.text("UPDATE dataset_indexes SET index_name = :name WHERE id = :id"),
+            {"name": index.name, "id": row.id},
+        )
+        shared.add(row.index_name)
+    _drop(bind, shared)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    partial = set()
+    for row in _registrations(bind):
+        suffix = "" if row.kind == "text" else "_num"
+        name = f"ix_data_points_meta_{row.key}{suffix}"
+        index = sa.Index(name, models.DataPoint.dataset_id, meta_query_service.expression(dialect, row.key, row.kind))
+        op.execute(CreateIndex(index, if_not_exists=True))
+        bind.execute(
+            sa.text("UPDATE dataset_indexes SET index_name = :name WHERE id = :id"),
+            {"name": name, "id": row.id},
+        )
+        partial.add(row.index_name)
+    _drop(bind, partial)
@@ -0,0 +1,43 @@
+"""fold watermark on dataset_statistics
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("dataset_statistics"):
+        return
+    # Databases created by create_all after this change already have it
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("dataset_statistics")}
+    if "folded_through" not in columns:
+        op.add_column(
+            "dataset_statistics",
+            sa.Column("folded_through", sa.Integer(), nullable=False, server_default="0"),
+        )
+        # Existing statistics and sketches were folded in on insert, so every
+        # stored point is already counted
+        op.execute(
+            "UPDATE dataset_statistics SET folded_through = COALESCE("
+            "(SELECT MAX(id) FROM data_points WHERE data_points.dataset_id = dataset_statistics.dataset_id), 0)"
+        )
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("dataset_statistics"):
+        with op.batch_alter_table("dataset_statistics") as batch_op:
+            batch_op.drop_column("folded_through")
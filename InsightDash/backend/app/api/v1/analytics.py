@@ -1,28 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
-from ...core.database import get_db
+from ...core.config import settings
+from ...core.database import get_async_db, run_in_session
 from ...models import models, schemas
 from ...core.dependencies import get_current_user
-from ...services.forecast import forecast_service
+from ...core.versioning import dataset_etag, etag_matches, version_bump
+from ...services.forecast_jobs import forecast_jobs, load_forecast_data
 from ...services.cache import redis_service
+from ...services.ingest import ingest_service
+from ...services.rollups import rollup_service, ROLLUP_BUCKETS
+from ...services.aggregation import aggregation_service
+from ...services.meta_query import meta_query_service
+from ...services.statistics import statistics_service
+from ...services.sketches import sketch_service
+from .websocket import broadcast_forecast_update
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
 
+@router.post("/forecast/batch")
+async def batch_forecast(
+    batch: schemas.ForecastBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Forecast many dataset/column pairs at once"""
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(batch.items) > settings.forecast_batch_max_items:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.forecast_batch_max_items} items per batch"
+        )
+    
+    # Check datasets exist and user has access, in one query
+    dataset_ids = {item.dataset_id for item in batch.items}
+    result = await db.execute(select(models.Dataset).where(models.Dataset.id.in_(dataset_ids)))
+    datasets = {dataset.id: dataset for dataset in result.scalars().all()}
+    
+    items, failures = [], []
+    for index, item in enumerate(batch.items):
+        dataset = datasets.get(item.dataset_id)
+        error = None
+        if dataset is None:
+            error = "Dataset not found"
+        elif not dataset.is_public and dataset.owner_id != current_user.id:
+            error = "Access denied"
+        elif not 1 <= item.periods <= 365:
+            error = "periods must be between 1 and 365"
+        elif item.target_column != "value":
+            try:
+                meta_query_service.validate_key(item.target_column)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            failures.append({
+                "index": index,
+                "dataset_id": item.dataset_id,
+                "target_column": item.target_column,
+                "status": "failed",
+                "error": error,
+            })
+        else:
+            items.append((index, item.dataset_id, item.target_column, item.model_type, item.periods))
+    
+    return StreamingResponse(
+        forecast_jobs.stream_batch(items, failures),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.post("/forecast/{dataset_id}", response_model=schemas.Forecast)
 async def generate_forecast(
     dataset_id: int,
     target_column: str = Query(..., description="Column to forecast"),
     model_type: str = Query("arima", description="Model type: arima, linear_regression, moving_average"),
     forecast_periods: int = Query(30, ge=1, le=365, description="Number of periods to forecast"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Generate forecast for a dataset"""
     # Check if dataset exists and user has access
-    dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    dataset = await db.get(models.Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
@@ -39,28 +102,15 @@ async def generate_forecast(
         return cached_forecast
     
     # Get dataset data
-    data_points = db.query(models.DataPoint).filter(
-        models.DataPoint.dataset_id == dataset_id
-    ).order_by(models.DataPoint.timestamp).all()
+    data_for_forecast, point_count = await run_in_session(load_forecast_data, dataset_id, target_column)
     
-    if not data_points:
+    if not point_count:
         raise HTTPException(status_code=400, detail="No data points found for dataset")
     
-    # Prepare data for forecasting
-    data_for_forecast = []
-    for point in data_points:
-        point_data = point.meta_data.copy() if point.meta_data else {}
-        point_data['timestamp'] = point.timestamp
-        point_data['value'] = point.value
-        data_for_forecast.append(point_data)
-    
     try:
-        # Generate forecast
-        forecast_result = forecast_service.generate_forecast(
-            data=data_for_forecast,
-            target_column=target_column,
-            model_type=model_type,
-            forecast_periods=forecast_periods
+        # Generate forecast in the worker pool
+        forecast_result = await forecast_jobs.run(
+            dataset_id, data_for_forecast, target_column, model_type, forecast_periods
         )
         
         # Save forecast to database
@@ -74,8 +124,9 @@ async def generate_forecast(
         )
         
         db.add(db_forecast)
-        db.commit()
-        db.refresh(db_forecast)
+        await db.execute(version_bump(db_forecast.dataset_id))
+        await db.commit()
+        await db.refresh(db_forecast)
         
         # Cache result (safe serialization)
         try:
@@ -99,26 +150,93 @@ async def generate_forecast(
         raise HTTPException(status_code=500, detail=f"Forecast generation failed: {str(e)}")
 
 
+@router.post("/forecast/{dataset_id}/jobs", response_model=schemas.ForecastJob, status_code=202)
+async def submit_forecast_job(
+    dataset_id: int,
+    job_request: schemas.ForecastJobCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Queue a forecast and return immediately; poll the job for its result"""
+    # Check if dataset exists and user has access
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not 1 <= job_request.periods <= 365:
+        raise HTTPException(status_code=400, detail="periods must be between 1 and 365")
+    
+    job = await run_in_session(
+        forecast_jobs.submit,
+        dataset_id,
+        current_user.id,
+        job_request.target_column,
+        job_request.model_type,
+        job_request.periods,
+    )
+    forecast_jobs.schedule(job.id, on_complete=broadcast_forecast_update)
+    return job
+
+
+@router.get("/forecast/jobs/{job_id}", response_model=schemas.ForecastJob)
+async def get_forecast_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Status of a forecast job, with the forecast once it has completed"""
+    job = await db.scalar(
+        select(models.ForecastJob)
+        .options(selectinload(models.ForecastJob.forecast))
+        .where(models.ForecastJob.id == job_id)
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Forecast job not found")
+    
+    # Check if dataset exists and user has access
+    dataset = await db.get(models.Dataset, job.dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return job
+
+
 @router.get("/forecast/{dataset_id}/history", response_model=List[schemas.Forecast])
 async def get_forecast_history(
     dataset_id: int,
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get forecast history for a dataset"""
     try:
         # Check if dataset exists and user has access
-        dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+        dataset = await db.get(models.Dataset, dataset_id)
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
         if not dataset.is_public and dataset.owner_id != current_user.id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        forecasts = db.query(models.Forecast).filter(
-            models.Forecast.dataset_id == dataset_id
-        ).order_by(models.Forecast.created_at.desc()).limit(limit).all()
+        etag = dataset_etag(dataset)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        
+        result = await db.execute(
+            select(models.Forecast).where(
+                models.Forecast.dataset_id == dataset_id
+            ).order_by(models.Forecast.created_at.desc()).limit(limit)
+        )
+        forecasts = result.scalars().all()
 
         return forecasts
     
@@ -131,44 +249,67 @@ async def get_forecast_history(
 @router.get("/analytics/summary/{dataset_id}")
 async def get_analytics_summary(
     dataset_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get analytics summary for a dataset"""
     try:
         # Check if dataset exists and user has access
-        dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+        dataset = await db.get(models.Dataset, dataset_id)
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
         if not dataset.is_public and dataset.owner_id != current_user.id:
             raise HTTPException(status_code=403, detail="Access denied")
 
+        # Unchanged since the client's copy: skip the cache and data tables
+        etag = dataset_etag(dataset)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
         # Check cache (optional - continue if cache fails)
         cache_key = None
         cached_summary = None
         try:
-            cache_key = redis_service.get_cache_key("analytics_summary", str(dataset_id))
+            cache_key = redis_service.get_cache_key("analytics_summary", f"{dataset_id}_{dataset.version}")
             cached_summary = await redis_service.get(cache_key)
             if cached_summary:
                 return cached_summary
         except:
             pass  # Continue without cache if Redis fails
 
-        # Get data points count
-        total_points = db.query(models.DataPoint).filter(
-            models.DataPoint.dataset_id == dataset_id
-        ).count()
+        # Get data points count from the daily rollups, which keep counting
+        # points that retention has already compacted away
+        total_points = await db.scalar(
+            select(func.coalesce(func.sum(models.DataRollup.count), 0)).where(
+                models.DataRollup.dataset_id == dataset_id,
+                models.DataRollup.bucket_seconds == ROLLUP_BUCKETS["day"],
+            )
+        )
 
         # Get latest data point
-        latest_point = db.query(models.DataPoint).filter(
-            models.DataPoint.dataset_id == dataset_id
-        ).order_by(models.DataPoint.timestamp.desc()).first()
+        latest_point = await db.scalar(
+            select(models.DataPoint).where(
+                models.DataPoint.dataset_id == dataset_id
+            ).order_by(models.DataPoint.timestamp.desc()).limit(1)
+        )
+        if not total_points and latest_point is not None:
+            # Points loaded before rollups existed; POST /rollups/{id}/rebuild backfills them
+            total_points = await db.scalar(
+                select(func.count()).select_from(models.DataPoint).where(
+                    models.DataPoint.dataset_id == dataset_id
+                )
+            )
 
         # Get forecasts count
-        forecasts_count = db.query(models.Forecast).filter(
-            models.Forecast.dataset_id == dataset_id
-        ).count()
+        forecasts_count = await db.scalar(
+            select(func.count()).select_from(models.Forecast).where(
+                models.Forecast.dataset_id == dataset_id
+            )
+        )
 
         # Safely get data source
         data_source = getattr(dataset, 'data_source', 'unknown')
@@ -198,29 +339,100 @@ async def get_analytics_summary(
         raise HTTPException(status_code=500, detail=f"Error getting analytics summary: {str(e)}")
 
 
+@router.get("/datasets/{dataset_id}/analytics", response_model=Dict[str, Any])
+async def get_dataset_analytics(
+    dataset_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get per-column statistics, correlations and a daily series for a dataset"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    etag = dataset_etag(dataset)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    result = await run_in_session(statistics_service.summary, dataset_id)
+    if result is None:
+        # Nothing folded in yet; the background maintenance catches up
+        ingest_service.schedule_maintenance([dataset_id])
+        raise HTTPException(
+            status_code=503, detail="Statistics are being rebuilt", headers={"Retry-After": "5"}
+        )
+    
+    days = (await db.execute(
+        select(models.DataRollup.bucket_start, models.DataRollup.count, models.DataRollup.sum).where(
+            models.DataRollup.dataset_id == dataset_id,
+            models.DataRollup.bucket_seconds == ROLLUP_BUCKETS["day"],
+        ).order_by(models.DataRollup.bucket_start.desc()).limit(30)
+    )).all()
+    result["time_series"] = [
+        {"date": day.bucket_start.isoformat(), "value": day.sum / day.count}
+        for day in reversed(days) if day.count
+    ]
+    
+    return result
+
+
+@router.post("/datasets/{dataset_id}/analytics/rebuild", response_model=Dict[str, Any])
+async def rebuild_dataset_analytics(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Recompute a dataset's statistics from its raw data points"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    stats = await run_in_session(statistics_service.rebuild, dataset_id)
+    
+    return {"dataset_id": dataset_id, "points_folded": stats.row_count}
+
+
 @router.get("/summary", response_model=Dict[str, Any])
 async def get_overall_analytics_summary(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get overall analytics summary for the current user"""
     try:
         # Get user's datasets count
-        datasets_count = db.query(models.Dataset).filter(
-            models.Dataset.owner_id == current_user.id
-        ).count()
+        datasets_count = await db.scalar(
+            select(func.count()).select_from(models.Dataset).where(
+                models.Dataset.owner_id == current_user.id
+            )
+        )
         
-        # Get total data points
-        total_data_points = db.query(models.DataPoint).join(
-            models.Dataset
-        ).filter(models.Dataset.owner_id == current_user.id).count()
+        # Get total data points (from daily rollups, see get_analytics_summary)
+        total_data_points = await db.scalar(
+            select(func.coalesce(func.sum(models.DataRollup.count), 0)).join(
+                models.Dataset, models.Dataset.id == models.DataRollup.dataset_id
+            ).where(
+                models.Dataset.owner_id == current_user.id,
+                models.DataRollup.bucket_seconds == ROLLUP_BUCKETS["day"],
+            )
+        )
         
         # Get recent activity (datasets created in last 7 days)
         week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_datasets = db.query(models.Dataset).filter(
-            models.Dataset.owner_id == current_user.id,
-            models.Dataset.created_at >= week_ago
-        ).count()
+        recent_datasets = await db.scalar(
+            select(func.count()).select_from(models.Dataset).where(
+                models.Dataset.owner_id == current_user.id,
+                models.Dataset.created_at >= week_ago
+            )
+        )
         
         return {
             "datasets_count": datasets_count,
@@ -236,15 +448,13 @@ async def get_overall_analytics_summary(
 @router.post("/forecast", response_model=Dict[str, Any])
 async def create_forecast(
     forecast_request: schemas.ForecastRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a forecast for a dataset"""
     try:
         # Check if dataset exists and user has access
-        dataset = db.query(models.Dataset).filter(
-            models.Dataset.id == forecast_request.dataset_id
-        ).first()
+        dataset = await db.get(models.Dataset, forecast_request.dataset_id)
         
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
@@ -253,27 +463,14 @@ async def create_forecast(
             raise HTTPException(status_code=403, detail="Access denied")
         
         # Get data points for forecasting
-        data_points = db.query(models.DataPoint).filter(
-            models.DataPoint.dataset_id == forecast_request.dataset_id
-        ).order_by(models.DataPoint.timestamp).all()
+        data_for_forecast, point_count = await run_in_session(load_forecast_data, forecast_request.dataset_id)
         
-        if len(data_points) < 10:
+        if point_count < 10:
             raise HTTPException(status_code=400, detail="Need at least 10 data points for forecasting")
         
-        # Prepare data for forecasting
-        data_for_forecast = []
-        for point in data_points:
-            point_data = point.meta_data.copy() if point.meta_data else {}
-            point_data['timestamp'] = point.timestamp
-            point_data['value'] = point.value
-            data_for_forecast.append(point_data)
-        
-        # Use the forecast service
-        forecast_result = forecast_service.generate_forecast(
-            data=data_for_forecast,
-            target_column="value",
-            model_type=forecast_request.model_type,
-            forecast_periods=forecast_request.periods
+        # Use the forecast service, in the worker pool
+        forecast_result = await forecast_jobs.run(
+            forecast_request.dataset_id, data_for_forecast, "value", forecast_request.model_type, forecast_request.periods
         )
         
         # Save forecast to database
@@ -287,8 +484,9 @@ async def create_forecast(
         )
         
         db.add(db_forecast)
-        db.commit()
-        db.refresh(db_forecast)
+        await db.execute(version_bump(db_forecast.dataset_id))
+        await db.commit()
+        await db.refresh(db_forecast)
         
         return {
             "forecast_id": db_forecast.id,
@@ -301,3 +499,161 @@ async def create_forecast(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating forecast: {str(e)}")
+
+
+@router.get("/rollups/{dataset_id}", response_model=List[schemas.RollupBucket])
+async def get_rollups(
+    dataset_id: int,
+    bucket: str = Query("hour", description="Bucket size: minute, hour, day"),
+    start: Optional[datetime] = Query(None, description="First bucket start to include"),
+    end: Optional[datetime] = Query(None, description="Last bucket start to include"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get pre-aggregated per-bucket statistics for a dataset"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if bucket not in ROLLUP_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unsupported bucket '{bucket}'")
+    
+    return await run_in_session(rollup_service.query, dataset_id, ROLLUP_BUCKETS[bucket], start, end)
+
+
+@router.post("/rollups/{dataset_id}/rebuild", response_model=Dict[str, Any])
+async def rebuild_rollups(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Recompute a dataset's rollups from its raw data points"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    folded = await run_in_session(rollup_service.rebuild, dataset_id)
+    
+    return {"dataset_id": dataset_id, "points_folded": folded}
+
+
+@router.get("/sketches/{dataset_id}", response_model=schemas.SketchResult)
+async def get_dataset_sketches(
+    dataset_id: int,
+    response: Response,
+    start: Optional[datetime] = Query(None, description="Range start, rounded down to the day bucket"),
+    end: Optional[datetime] = Query(None, description="Range end (inclusive of its day bucket)"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    quantiles: str = Query("0.5,0.95,0.99", description="Comma-separated quantiles in [0, 1]"),
+    top: int = Query(10, ge=1, le=64, description="Number of heavy hitters per column"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get approximate quantiles, distinct counts and top values per column"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    try:
+        quantile_values = [float(q) for q in quantiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Quantiles must be numbers")
+    if any(not 0 <= q <= 1 for q in quantile_values):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    column_names = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    
+    etag = dataset_etag(dataset)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    return await run_in_session(
+        sketch_service.query, dataset_id, start, end, column_names, quantile_values, top
+    )
+
+
+@router.post("/sketches/{dataset_id}/rebuild", response_model=Dict[str, Any])
+async def rebuild_dataset_sketches(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Recompute a dataset's sketches from its raw data points"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    folded = await run_in_session(sketch_service.rebuild, dataset_id)
+    
+    return {"dataset_id": dataset_id, "points_folded": folded}
+
+
+@router.get("/aggregate/{dataset_id}", response_model=schemas.AggregateResult)
+async def aggregate_dataset(
+    dataset_id: int,
+    interval: str = Query("hour", description="Bucket width: minute, hour, day or <n>s/m/h/d/w, e.g. 15m"),
+    start: Optional[datetime] = Query(None, description="Range start (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Range end (exclusive)"),
+    aggregates: str = Query("count,avg", description="Comma-separated: count, sum, avg, min, max, stddev"),
+    columns: str = Query("value", description="Comma-separated columns: value and/or numeric meta_data keys"),
+    where: Optional[List[str]] = Query(None, description="Filters such as region=North or temperature>30"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get per-bucket aggregates of a dataset computed by the database"""
+    # Check if dataset exists and user has access
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    aggregate_names = [a.strip() for a in aggregates.split(",") if a.strip()]
+    column_names = list(dict.fromkeys(c.strip() for c in columns.split(",") if c.strip()))
+    try:
+        bucket_seconds = aggregation_service.parse_interval(interval)
+        predicates = meta_query_service.parse_predicates(where or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Cached per dataset version, so new points invalidate old entries
+    cache_key = redis_service.get_cache_key(
+        "aggregate",
+        f"{dataset_id}_{dataset.version}_{bucket_seconds}_{start}_{end}_{','.join(aggregate_names)}_{','.join(column_names)}"
+        f"_{'&'.join(where or [])}"
+    )
+    cached = await redis_service.get(cache_key)
+    if cached:
+        return cached
+    
+    try:
+        result = await run_in_session(
+            aggregation_service.aggregate,
+            dataset_id,
+            bucket_seconds,
+            start,
+            end,
+            aggregate_names,
+            column_names,
+            predicates,
+        )
+    except (ValueError, NotImplementedError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    await redis_service.set(cache_key, result, expire=3600)
+    
+    return result
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from ...core.database import get_db
+from ...core.database import get_async_db
 from ...models import models, schemas
 from ...core.security import get_password_hash, verify_password, create_access_token
 from ...core.dependencies import get_current_user
@@ -12,12 +13,15 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=schemas.User)
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(models.User).filter(
-        (models.User.email == user.email) | (models.User.username == user.username)
-    ).first()
+    result = await db.execute(
+        select(models.User).where(
+            (models.User.email == user.email) | (models.User.username == user.username)
+        )
+    )
+    existing_user = result.scalars().first()
     
     if existing_user:
         raise HTTPException(
@@ -36,19 +40,22 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 
 @router.post("/login", response_model=schemas.Token)
-async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Authenticate user and return access token"""
     # Try to find user by username or email
-    user = db.query(models.User).filter(
-        (models.User.username == form_data.username) | (models.User.email == form_data.username)
-    ).first()
+    result = await db.execute(
+        select(models.User).where(
+            (models.User.username == form_data.username) | (models.User.email == form_data.username)
+        )
+    )
+    user = result.scalars().first()
     
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
@@ -3,29 +3,53 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from ...core.database import get_db
 from ...models import models, schemas
-from ...core.dependencies import get_current_user
+from ...core.dependencies import get_admin_user, get_current_user
 from ...services.cache import redis_service
 
 router = APIRouter()
 
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ...core.database import get_db
+from ...core.database import get_async_db, run_in_session, SessionLocal
+from ...core.pagination import encode_cursor, decode_cursor
+from ...core.timeutils import naive_utc
+from ...core.versioning import dataset_etag, etag_matches
 from ...models import models, schemas
 from ...core.dependencies import get_current_user
 from ...services.cache import redis_service
+from ...services.ingest import ingest_service, SUPPORTED_FORMATS
+from ...services.segments import segment_store
+from ...services.schema_registry import schema_registry
+from ...services.rollups import rollup_service
+from ...services.retention import retention_service
+from ...services.meta_query import meta_query_service
+from ...services.statistics import statistics_service
+from ...services.sketches import sketch_service
+from ...services.summaries import summary_service
+from ...services.model_cache import model_cache
+from ...services.downsample import downsample_service, DOWNSAMPLE_METHODS
+from ...services.export import export_service
+from ...services.write_buffer import write_buffer
 from datetime import datetime
+import asyncio
+import json
+import logging
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 @router.get("/", response_model=List[dict])
 async def get_datasets(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get all datasets - returning mock data for now"""
     # Return mock datasets data for frontend testing
@@ -109,11 +133,13 @@ async def get_datasets(
 @router.get("/{dataset_id}", response_model=schemas.Dataset)
 async def get_dataset(
     dataset_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get a specific dataset"""
-    dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    dataset = await db.get(models.Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
@@ -121,25 +147,32 @@ async def get_dataset(
     if not dataset.is_public and dataset.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    etag = dataset_etag(dataset)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return dataset
 
 
 @router.post("/", response_model=schemas.Dataset)
 async def create_dataset(
     dataset: schemas.DatasetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a new dataset"""
-    db_dataset = models.Dataset(
-        **dataset.dict(),
-        owner_id=current_user.id
-    )
-    
+    return await run_in_session(_create_dataset, dataset.dict(), current_user.id)
+
+
+def _create_dataset(db: Session, values: dict, owner_id: int) -> models.Dataset:
+    db_dataset = models.Dataset(**values, owner_id=owner_id)
     db.add(db_dataset)
+    db.flush()
+    # Every point of a new dataset goes through the rollup write path
+    rollup_service.mark_complete(db, db_dataset.id)
     db.commit()
     db.refresh(db_dataset)
-    
     return db_dataset
 
 
@@ -147,11 +180,11 @@ async def create_dataset(
 async def update_dataset(
     dataset_id: int,
     dataset_update: schemas.DatasetUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Update a dataset"""
-    dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    dataset = await db.get(models.Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
@@ -162,9 +195,10 @@ async def update_dataset(
     # Update fields
     for field, value in dataset_update.dict(exclude_unset=True).items():
         setattr(dataset, field, value)
+    dataset.version = models.Dataset.version + 1
     
-    db.commit()
-    db.refresh(dataset)
+    await db.commit()
+    await db.refresh(dataset)
     
     return dataset
 
@@ -172,11 +206,11 @@ async def update_dataset(
 @router.delete("/{dataset_id}")
 async def delete_dataset(
     dataset_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Delete a dataset"""
-    dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    dataset = await db.get(models.Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
@@ -184,74 +218,638 @@ async def delete_dataset(
     if dataset.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    db.delete(dataset)
-    db.commit()
+    await db.close()
+    await run_in_session(_delete_dataset, dataset_id)
+    
+    await asyncio.to_thread(segment_store.remove_files, dataset_id)
     
     return {"message": "Dataset deleted successfully"}
 
 
+def _delete_dataset(db: Session, dataset_id: int) -> None:
+    """Delete a dataset and everything derived from it in one transaction"""
+    segment_store.drop_dataset(db, dataset_id)
+    schema_registry.drop_dataset(db, dataset_id)
+    rollup_service.drop_dataset(db, dataset_id)
+    retention_service.drop_dataset(db, dataset_id)
+    meta_query_service.drop_dataset(db, dataset_id)
+    statistics_service.drop_dataset(db, dataset_id)
+    sketch_service.drop_dataset(db, dataset_id)
+    model_cache.drop_dataset(db, dataset_id)
+    dataset = db.get(models.Dataset, dataset_id)
+    if dataset is not None:
+        db.delete(dataset)
+    db.commit()
+
+
 @router.get("/{dataset_id}/data", response_model=List[schemas.DataPoint])
 async def get_dataset_data(
     dataset_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    after_ts: Optional[datetime] = Query(None, description="Keyset: return points after this timestamp"),
+    after_id: Optional[int] = Query(None, description="Keyset: id of the last point seen; required with after_ts"),
+    start: Optional[datetime] = Query(None, description="Only include points at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only include points at or before this time"),
+    order: str = Query("asc", description="Sort order by (timestamp, id): asc or desc"),
+    latest: Optional[int] = Query(None, ge=1, le=1000, description="Return only the newest N points in range"),
+    fields: Optional[str] = Query(None, description="Comma-separated meta_data keys to return (default: all)"),
+    where: Optional[List[str]] = Query(None, description="Filters such as region=North or temperature>30"),
+    layout: str = Query("rows", description="Response layout: rows (list of points) or columns (arrays per column)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get data points for a dataset"""
+    """Get data points for a dataset, ordered by (timestamp, id)"""
     # Check if dataset exists and user has access
-    dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    dataset = await db.get(models.Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     if not dataset.is_public and dataset.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get data points
-    data_points = db.query(models.DataPoint).filter(
-        models.DataPoint.dataset_id == dataset_id
-    ).offset(skip).limit(limit).all()
+    if layout not in ("rows", "columns"):
+        raise HTTPException(status_code=400, detail=f"Unsupported layout '{layout}'")
+    
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Unsupported order '{order}'")
+    
+    if latest is not None and (cursor or after_ts is not None or skip):
+        raise HTTPException(status_code=400, detail="latest cannot be combined with cursor, after_ts or skip")
+    
+    if (after_ts is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_ts and after_id must be given together")
+    
+    try:
+        keys = meta_query_service.parse_fields(fields) if fields is not None else None
+        predicates = meta_query_service.parse_predicates(where or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Unchanged since the client's copy: answer before touching data_points
+    etag = dataset_etag(dataset)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after_ts, after_id = position
+    
+    # Get data points (plain rows for the columnar layout or a projection, no ORM entities)
+    if keys is not None:
+        query = select(
+            models.DataPoint.id, models.DataPoint.dataset_id, models.DataPoint.timestamp, models.DataPoint.value,
+            *meta_query_service.projection(keys),
+        )
+    elif layout == "columns":
+        query = select(
+            models.DataPoint.id, models.DataPoint.timestamp, models.DataPoint.value, models.DataPoint.meta_data
+        )
+    else:
+        query = select(models.DataPoint)
+    query = query.where(models.DataPoint.dataset_id == dataset_id)
+    if predicates:
+        try:
+            query = query.where(*meta_query_service.where_clauses(db.get_bind().dialect.name, predicates))
+        except NotImplementedError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if start is not None:
+        query = query.where(models.DataPoint.timestamp >= naive_utc(start))
+    if end is not None:
+        query = query.where(models.DataPoint.timestamp <= naive_utc(end))
+    
+    # Descending reads walk the (dataset_id, timestamp, id) index backwards
+    descending = order == "desc" or latest is not None
+    if descending:
+        query = query.order_by(models.DataPoint.timestamp.desc(), models.DataPoint.id.desc())
+    else:
+        query = query.order_by(models.DataPoint.timestamp, models.DataPoint.id)
+    if after_ts is not None:
+        after_ts = naive_utc(after_ts)
+        position = tuple_(models.DataPoint.timestamp, models.DataPoint.id)
+        query = query.where(
+            position < tuple_(after_ts, after_id) if descending else position > tuple_(after_ts, after_id)
+        )
+    elif skip:
+        query = query.offset(skip)
+    
+    result = await db.execute(query.limit(latest or limit))
+    data_points = result.all() if layout == "columns" or keys is not None else result.scalars().all()
+    
+    headers = {"ETag": etag}
+    if latest is not None:
+        if order == "asc":
+            data_points = data_points[::-1]
+    elif len(data_points) == limit:
+        last = data_points[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.timestamp, last.id)
+    
+    if keys is not None:
+        data_points = [
+            {
+                "id": row.id,
+                "dataset_id": row.dataset_id,
+                "timestamp": row.timestamp,
+                "value": row.value,
+                "meta_data": meta_query_service.projected_meta(row, keys),
+            }
+            for row in data_points
+        ]
+    
+    if layout == "columns":
+        # Returned as-is: skips per-row response_model validation
+        return Response(
+            content=json.dumps(_column_layout(data_points, keys), separators=(",", ":")),
+            media_type="application/json",
+            headers=headers,
+        )
+    
+    response.headers.update(headers)
     
     return data_points
 
 
+def _column_layout(rows, keys: Optional[List[str]] = None) -> dict:
+    """Turn (id, timestamp, value, meta_data) rows into one array per column"""
+    if keys is not None:
+        meta = [row["meta_data"] or {} for row in rows]
+        timestamps = [row["timestamp"] for row in rows]
+        values = [row["value"] for row in rows]
+    else:
+        meta = [row.meta_data or {} for row in rows]
+        timestamps = [row.timestamp for row in rows]
+        values = [row.value for row in rows]
+    columns = {
+        "timestamp": [ts.isoformat() for ts in timestamps],
+        "value": values,
+    }
+    for key in keys if keys is not None else dict.fromkeys(key for m in meta for key in m):
+        # meta_data keys shadowing a core column get a prefix instead of overwriting it
+        name = f"meta_{key}" if key in ("timestamp", "value") else key
+        columns[name] = [m.get(key) for m in meta]
+    return columns
+
+
+@router.get("/{dataset_id}/series", response_model=schemas.Series)
+async def get_dataset_series(
+    dataset_id: int,
+    start: Optional[datetime] = Query(None, description="Only include points at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only include points at or before this time"),
+    max_points: int = Query(1000, ge=3, le=10000, description="Upper bound on returned points"),
+    method: str = Query("lttb", description="Downsampling method: lttb, minmax"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get a dataset series downsampled for charting"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported downsampling method '{method}'")
+    
+    return await run_in_session(downsample_service.series, dataset_id, start, end, max_points, method)
+
+
 @router.post("/{dataset_id}/data", response_model=schemas.DataPoint)
 async def add_data_point(
     dataset_id: int,
     data_point: schemas.DataPointCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Add a data point to a dataset"""
     # Check if dataset exists and user has access
-    dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    dataset = await db.get(models.Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     if dataset.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Parse timestamp if provided as string
+    # Parse timestamp if provided as string; stored as naive UTC like every other write path
     timestamp = None
     if data_point.timestamp:
-        from datetime import datetime
         try:
-            timestamp = datetime.fromisoformat(data_point.timestamp.replace('Z', '+00:00'))
-        except:
-            timestamp = datetime.now()
+            timestamp = naive_utc(datetime.fromisoformat(data_point.timestamp.replace('Z', '+00:00')))
+        except ValueError:
+            timestamp = datetime.utcnow()
     else:
-        timestamp = datetime.now()
+        timestamp = datetime.utcnow()
+    
+    point = {
+        "dataset_id": dataset_id,
+        "timestamp": timestamp,
+        "value": data_point.value,
+        "meta_data": data_point.meta_data,
+    }
+    
+    if write_buffer.enabled:
+        # Group commit: acknowledged once the shared batch is durable. Hand the
+        # request's connection back first so waiting writers don't pin the pool.
+        await db.close()
+        return await write_buffer.submit(point)
     
     # Create data point
-    db_data_point = models.DataPoint(
-        dataset_id=dataset_id,
-        timestamp=timestamp,
-        value=data_point.value,
-        meta_data=data_point.meta_data
+    await db.close()
+    rows = await run_in_session(_write_point, point)
+    
+    ingest_service.schedule_maintenance([dataset_id])
+    
+    return rows[0]
+
+
+@router.get("/{dataset_id}/export")
+async def export_dataset(
+    dataset_id: int,
+    format: str = Query("csv", description="Export format: csv, ndjson, arrow, parquet"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Download all data points of a dataset as a streamed file"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    try:
+        export_service.check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = export_service.filename(dataset, format)
+    return StreamingResponse(
+        export_service.stream(dataset_id, format),
+        media_type=export_service.media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.post("/{dataset_id}/bulk-import", response_model=schemas.BulkImportResult)
+async def bulk_import_data(
+    dataset_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, description="Import format: csv, ndjson, parquet, arrow (detected if omitted)"),
+    timestamp_column: str = Query("timestamp", description="Column holding the point timestamp"),
+    value_column: str = Query("value", description="Column holding the numeric value"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Bulk import data points from a CSV, NDJSON, Parquet or Arrow upload"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
     
-    db.add(db_data_point)
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "read"):
+            raise HTTPException(status_code=400, detail="Multipart import requires a 'file' field")
+        data_format = format or ingest_service.detect_format(upload.content_type, upload.filename)
+
+        async def chunks():
+            while True:
+                chunk = await upload.read(1024 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+    else:
+        data_format = format or ingest_service.detect_format(content_type)
+        chunks = request.stream
+    
+    if data_format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format '{data_format}'")
+    
+    # The import writes on its own session in a worker thread
+    await db.close()
+    try:
+        result = await ingest_service.import_stream(
+            dataset_id,
+            chunks(),
+            data_format=data_format,
+            timestamp_column=timestamp_column,
+            value_column=value_column,
+        )
+    except ValueError as e:
+        # Parse and validation errors (pandas, JSON and Arrow errors included)
+        raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
+    except Exception:
+        logger.exception("Bulk import into dataset %s failed", dataset_id)
+        raise HTTPException(status_code=500, detail="Import failed")
+    
+    await asyncio.to_thread(ingest_service.maintain, [dataset_id])
+    
+    return {"dataset_id": dataset_id, "format": data_format, **result}
+
+
+@router.get("/{dataset_id}/segments", response_model=List[schemas.DataSegment])
+async def get_dataset_segments(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """List the sealed columnar segments of a dataset"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    result = await db.execute(
+        select(models.DataSegment).where(
+            models.DataSegment.dataset_id == dataset_id
+        ).order_by(models.DataSegment.first_point_id)
+    )
+    return result.scalars().all()
+
+
+@router.post("/{dataset_id}/segments/seal", response_model=List[schemas.DataSegment])
+async def seal_dataset_segments(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Seal every buffered data point of a dataset into segments"""
+    if not segment_store.enabled:
+        raise HTTPException(status_code=400, detail="Segment storage is disabled")
+    
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # With compaction on, only points already folded into the statistics are sealed
+    await run_in_session(summary_service.fold, dataset_id)
+    sealed = []
+    while True:
+        segment = await run_in_session(segment_store.seal, dataset_id)
+        if segment is None:
+            break
+        sealed.append(segment)
+    
+    return sealed
+
+
+def _write_point(db: Session, point: dict) -> List[dict]:
+    rows = ingest_service.write_points(db, [point])
     db.commit()
-    db.refresh(db_data_point)
+    return rows
+
+
+def _backfill_field(field_id: int):
+    """Run a field backfill with its own session (called as a background task)"""
+    db = SessionLocal()
+    try:
+        schema_registry.backfill(db, field_id)
+    finally:
+        db.close()
+
+
+@router.get("/{dataset_id}/fields", response_model=List[schemas.DatasetField])
+async def get_dataset_fields(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """List the meta_data keys promoted to typed storage"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await run_in_session(schema_registry.list_fields, dataset_id)
+
+
+@router.post("/{dataset_id}/fields", response_model=schemas.DatasetField)
+async def promote_dataset_field(
+    dataset_id: int,
+    field: schemas.DatasetFieldCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Promote a numeric meta_data key to typed storage and backfill it"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    try:
+        db_field = await run_in_session(schema_registry.promote, dataset_id, field.name, field.dtype)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if db_field.backfill_status in ("pending", "failed"):
+        background_tasks.add_task(_backfill_field, db_field.id)
+    
+    return db_field
+
+
+@router.delete("/{dataset_id}/fields/{name}")
+async def demote_dataset_field(
+    dataset_id: int,
+    name: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Drop the typed storage of a promoted meta_data key"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not await run_in_session(_demote_field, dataset_id, name):
+        raise HTTPException(status_code=404, detail="Field not found")
+    
+    return {"message": "Field demoted successfully"}
+
+
+def _demote_field(db: Session, dataset_id: int, name: str) -> bool:
+    db_field = schema_registry.get_field(db, dataset_id, name)
+    if db_field is None:
+        return False
+    schema_registry.demote(db, db_field)
+    return True
+
+
+@router.get("/{dataset_id}/indexes", response_model=List[schemas.DatasetIndex])
+async def get_dataset_indexes(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """List the meta_data expression indexes registered for a dataset"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await run_in_session(meta_query_service.list_indexes, dataset_id)
+
+
+@router.post("/{dataset_id}/indexes", response_model=schemas.DatasetIndex)
+async def create_dataset_index(
+    dataset_id: int,
+    index: schemas.DatasetIndexCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_admin_user)
+):
+    """Index a meta_data key so ``where`` filters on it can seek instead of scan"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    try:
+        return await run_in_session(meta_query_service.create_index, dataset_id, index.key, index.kind)
+    except (ValueError, NotImplementedError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{dataset_id}/indexes/{key}")
+async def delete_dataset_index(
+    dataset_id: int,
+    key: str,
+    kind: str = Query("text", description="Index kind: text or number"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_admin_user)
+):
+    """Unregister a meta_data expression index"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not await run_in_session(_drop_index, dataset_id, key, kind):
+        raise HTTPException(status_code=404, detail="Index not found")
+    
+    return {"message": "Index dropped successfully"}
+
+
+def _drop_index(db: Session, dataset_id: int, key: str, kind: str) -> bool:
+    entries = meta_query_service.list_indexes(db, dataset_id)
+    entry = next((e for e in entries if e.key == key and e.kind == kind), None)
+    if entry is None:
+        return False
+    meta_query_service.drop_index(db, entry)
+    return True
+
+
+@router.get("/{dataset_id}/retention", response_model=schemas.RetentionPolicy)
+async def get_retention_policy(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get the retention policy of a dataset"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if not dataset.is_public and dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    policy = await run_in_session(retention_service.get_policy, dataset_id)
+    if not policy:
+        raise HTTPException(status_code=404, detail="No retention policy set")
+    
+    return policy
+
+
+@router.put("/{dataset_id}/retention", response_model=schemas.RetentionPolicy)
+async def set_retention_policy(
+    dataset_id: int,
+    policy: schemas.RetentionPolicyCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Create or replace the retention policy of a dataset"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    try:
+        return await run_in_session(
+            retention_service.set_policy,
+            dataset_id,
+            policy.raw_retention_days,
+            policy.rollup_bucket,
+            policy.rollup_retention_days,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{dataset_id}/retention")
+async def delete_retention_policy(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Remove the retention policy of a dataset (keep raw points forever)"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not await run_in_session(_delete_retention_policy, dataset_id):
+        raise HTTPException(status_code=404, detail="No retention policy set")
+    
+    return {"message": "Retention policy deleted successfully"}
+
+
+def _delete_retention_policy(db: Session, dataset_id: int) -> bool:
+    policy = retention_service.get_policy(db, dataset_id)
+    if policy is None:
+        return False
+    retention_service.delete_policy(db, policy)
+    return True
+
+
+@router.post("/{dataset_id}/retention/compact", response_model=schemas.CompactionResult)
+async def compact_dataset(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Apply the retention policy now instead of waiting for the compactor"""
+    dataset = await db.get(models.Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    policy = await run_in_session(retention_service.get_policy, dataset_id)
+    if not policy:
+        raise HTTPException(status_code=404, detail="No retention policy set")
     
-    return db_data_point
+    return await run_in_session(retention_service.compact_dataset, dataset_id)
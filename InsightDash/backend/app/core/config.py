@@ -3,6 +3,9 @@ from typing import List, Optional
 from pydantic import field_validator
 
 
+SQLITE_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
 class Settings(BaseSettings):
     # Database - Using SQLite for development
     database_url: str = "sqlite:///./insightdash.db"
@@ -12,6 +15,20 @@ class Settings(BaseSettings):
     postgres_password: Optional[str] = None
     postgres_db: Optional[str] = None
     
+    # Connection pool
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    
+    # SQLite tuning (ignored for other databases)
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_busy_timeout_ms: int = 5000
+    
     # Redis
     redis_url: str = "redis://localhost:6379/0"
     
@@ -29,6 +46,65 @@ class Settings(BaseSettings):
     app_name: str = "InsightDash API"
     version: str = "1.0.0"
     
+    # Bulk ingestion
+    bulk_import_chunk_rows: int = 20000
+    bulk_import_commit_rows: int = 200000
+    
+    # Export
+    export_batch_rows: int = 10000
+    
+    # Group commit for single-point ingestion
+    group_commit_enabled: bool = False
+    group_commit_max_points: int = 500
+    group_commit_max_delay_ms: int = 20
+    
+    # Columnar segment storage
+    segment_storage_enabled: bool = False
+    segment_storage_path: str = "./data/segments"
+    segment_seal_rows: int = 50000
+    # Delete sealed points from data_points so it only holds the unsealed buffer.
+    # Row-level reads (data endpoint, export, raw aggregation, rebuilds) then
+    # only see the buffer; series and forecast reads see everything.
+    segment_compact_sealed: bool = False
+    
+    # Promoted meta_data fields
+    field_backfill_batch_rows: int = 50000
+    
+    # Incremental dataset statistics
+    statistics_max_columns: int = 32
+    
+    # Quantile / distinct / top-k sketches per column and day
+    sketches_enabled: bool = True
+    sketch_max_columns: int = 16
+    sketch_kll_k: int = 200
+    sketch_hll_precision: int = 12
+    sketch_top_k: int = 64
+    
+    # Forecast worker processes (0 fits in the event loop's thread pool)
+    forecast_workers: int = 2
+    forecast_batch_max_items: int = 1000
+    forecast_batch_concurrency: int = 4  # Batch items fitting or queued for the pool at once
+    forecast_batch_load_series: int = 50  # Series loaded per query while a batch streams
+    
+    # Fitted-model cache: forecasts after an append update the stored state
+    forecast_model_cache_enabled: bool = True
+    forecast_arima_refit_ratio: float = 0.25  # Refit ARIMA once new points exceed this share of the fit
+    
+    # Automatic ARIMA order search
+    forecast_arima_max_p: int = 3
+    forecast_arima_max_d: int = 2
+    forecast_arima_max_q: int = 3
+    forecast_arima_seasonal_period: int = 0  # e.g. 7 for weekly cycles in daily data; 0 disables
+    forecast_arima_criterion: str = "aic"  # aic or bic
+    forecast_arima_time_budget_seconds: float = 20.0
+    forecast_arima_maxiter: int = 50  # Optimizer iterations per candidate fit
+    forecast_arima_workers: int = 0  # Parallel candidate fits with FORECAST_WORKERS=0; 0 uses every core
+    
+    # Retention compaction
+    retention_enabled: bool = True
+    retention_compact_interval_seconds: int = 3600
+    retention_delete_batch_rows: int = 10000
+    
     # Optional external services
     supabase_url: Optional[str] = None
     supabase_key: Optional[str] = None
@@ -40,6 +116,22 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in v.split(',')]
         return v
     
+    @field_validator('sqlite_synchronous')
+    @classmethod
+    def check_sqlite_synchronous(cls, v):
+        # Interpolated into a PRAGMA statement, so only the known modes pass
+        mode = str(v).strip().upper()
+        if mode not in SQLITE_SYNCHRONOUS_MODES:
+            raise ValueError(f"sqlite_synchronous must be one of {', '.join(SQLITE_SYNCHRONOUS_MODES)}")
+        return mode
+    
+    @field_validator('sqlite_mmap_size', 'sqlite_busy_timeout_ms')
+    @classmethod
+    def check_non_negative(cls, v):
+        if v < 0:
+            raise ValueError("must not be negative")
+        return v
+    
     @property
     def origins_list(self) -> List[str]:
         if isinstance(self.allowed_origins, str):
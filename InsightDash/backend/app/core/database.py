@@ -1,17 +1,195 @@
-from sqlalchemy import create_engine
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .config import settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .config import SQLITE_SYNCHRONOUS_MODES, settings
+
+
+class PoolStats:
+    """Running counters of how long callers waited for a pooled connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """Times every checkout from the underlying queue pool"""
+
+    stats: PoolStats  # On the class: engine.dispose() recreates pools
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    stats = PoolStats()
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+
+def _async_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver"""
+    scheme, sep, rest = url.partition("://")
+    driver = {
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+        "sqlite": "sqlite+aiosqlite",
+    }.get(scheme, scheme)
+    return f"{driver}{sep}{rest}"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
 
-engine = create_engine(settings.database_url, echo=settings.debug)
+def _engine_options(url: str, pool_class) -> Dict[str, Any]:
+    """Pool and logging options for an engine on ``url``"""
+    options: Dict[str, Any] = {"echo": settings.db_echo}
+    if _is_memory_sqlite(url):
+        # In-memory SQLite needs SQLAlchemy's single-connection pool
+        return options
+    options.update(
+        poolclass=pool_class,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.sqlite_wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        # Settings can be reassigned after validation; never interpolate an unknown mode
+        synchronous = str(settings.sqlite_synchronous).upper()
+        if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+            raise ValueError(f"Unsupported sqlite_synchronous '{settings.sqlite_synchronous}'")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    finally:
+        cursor.close()
+
+
+def _configure_sqlite(sync_engine: Engine) -> None:
+    if sync_engine.dialect.name == "sqlite" and not _is_memory_sqlite(str(sync_engine.url)):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+
+# Sync engine for migrations, create_all and background workers
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url, TimedQueuePool))
+_configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by request handlers
+_async_database_url = _async_url(settings.database_url)
+async_engine = create_async_engine(
+    _async_database_url, **_engine_options(_async_database_url, TimedAsyncQueuePool)
+)
+_configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+def pool_status() -> Dict[str, Any]:
+    """Current occupancy and checkout wait counters of both engine pools"""
+    status = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        entry: Dict[str, Any] = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        if isinstance(pool, _TimedPoolMixin):
+            entry.update(pool.stats.snapshot())
+        status[name] = entry
+    return status
+
+
+def dialect_insert(db, table):
+    """INSERT construct supporting ON CONFLICT clauses for the session's dialect"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {dialect}")
+    return insert(table)
+
+
+async def run_in_session(func: Callable[..., Any], *args: Any) -> Any:
+    """Run ``func(db, *args)`` in a worker thread with its own sync session"""
+    def call():
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    return await asyncio.to_thread(call)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from .database import get_db
+from .database import get_async_db
 from .security import verify_token
 from ..models import models
 
@@ -11,7 +12,7 @@ security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> models.User:
     """Get current authenticated user"""
     credentials_exception = HTTPException(
@@ -32,7 +33,8 @@ async def get_current_user(
     except Exception:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == username).first()
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
     
@@ -58,7 +60,7 @@ async def get_admin_user(current_user: models.User = Depends(get_current_user))
 
 async def get_optional_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[models.User]:
     """Get current user if authenticated, otherwise None"""
     if not credentials:
@@ -73,7 +75,8 @@ async def get_optional_user(
         if username is None:
             return None
             
-        user = db.query(models.User).filter(models.User.username == username).first()
+        result = await db.execute(select(models.User).where(models.User.username == username))
+        user = result.scalar_one_or_none()
         return user
         
     except Exception:
@@ -0,0 +1,20 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(timestamp: datetime, point_id: int) -> str:
+    """Encode the (timestamp, id) position of the last row on a page"""
+    payload = json.dumps({"ts": timestamp.isoformat(), "id": point_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Decode a cursor produced by encode_cursor, or None if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["ts"]), int(payload["id"])
+    except Exception:
+        return None
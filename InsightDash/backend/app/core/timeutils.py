@@ -0,0 +1,9 @@
+from datetime import datetime
+from typing import Optional
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert aware values to match"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.replace(tzinfo=None) - value.utcoffset()
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from sqlalchemy import update
+
+from ..models import models
+
+
+def version_bump(dataset_id: int):
+    """UPDATE statement incrementing a dataset's version"""
+    return (
+        update(models.Dataset)
+        .where(models.Dataset.id == dataset_id)
+        .values(version=models.Dataset.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def dataset_etag(dataset: models.Dataset) -> str:
+    """Entity tag for any response derived from a dataset's current version"""
+    return f'"{dataset.id}-{dataset.version or 0}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
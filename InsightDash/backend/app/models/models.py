@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -33,6 +33,7 @@ class Dataset(Base):
     data_type = Column(String, default="time_series")  # time_series, categorical, etc.
     owner_id = Column(Integer, ForeignKey("users.id"))
     is_public = Column(Boolean, default=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped by every mutation; used as ETag
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -53,6 +54,161 @@ class DataPoint(Base):
     
     # Relationships
     dataset = relationship("Dataset", back_populates="data_points")
+    
+    __table_args__ = (
+        Index("ix_data_points_dataset_id_timestamp", "dataset_id", "timestamp", "id"),
+        Index("ix_data_points_dataset_id_id", "dataset_id", "id"),
+    )
+
+
+class DataSegment(Base):
+    __tablename__ = "data_segments"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), index=True)
+    path = Column(String, nullable=False)  # Compressed column file, relative to segment_storage_path
+    row_count = Column(Integer, nullable=False)
+    first_point_id = Column(Integer, nullable=False)
+    last_point_id = Column(Integer, nullable=False)  # Sealing watermark
+    min_timestamp = Column(DateTime(timezone=True))
+    max_timestamp = Column(DateTime(timezone=True))
+    columns = Column(JSON)  # Numeric meta_data keys stored in the segment
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    dataset = relationship("Dataset")
+    
+    __table_args__ = (
+        # Two processes sealing the same range: the second commit fails
+        UniqueConstraint("dataset_id", "first_point_id", name="uq_data_segments_dataset_id_first_point_id"),
+    )
+
+
+class DatasetField(Base):
+    __tablename__ = "dataset_fields"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), index=True)
+    name = Column(String, nullable=False)  # meta_data key
+    dtype = Column(String, default="float")  # float, int
+    backfill_status = Column(String, default="pending")  # pending, running, complete, failed
+    backfilled_through = Column(Integer, default=0)  # Highest data point id copied into data_point_fields
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    dataset = relationship("Dataset")
+    
+    __table_args__ = (
+        UniqueConstraint("dataset_id", "name", name="uq_dataset_fields_dataset_id_name"),
+    )
+
+
+class DataPointField(Base):
+    __tablename__ = "data_point_fields"
+    
+    data_point_id = Column(Integer, ForeignKey("data_points.id"), primary_key=True)
+    field_id = Column(Integer, ForeignKey("dataset_fields.id"), primary_key=True)
+    timestamp = Column(DateTime(timezone=True))  # Copied from the data point for index-only reads
+    value = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_data_point_fields_field_id_timestamp", "field_id", "timestamp"),
+    )
+
+
+class DataRollup(Base):
+    __tablename__ = "data_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=False)
+    bucket_seconds = Column(Integer, nullable=False)  # 60, 3600, 86400
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0.0)
+    min = Column(Float)
+    max = Column(Float)
+    sum_sq = Column(Float, nullable=False, default=0.0)  # For variance / stddev
+    
+    __table_args__ = (
+        UniqueConstraint("dataset_id", "bucket_seconds", "bucket_start", name="uq_data_rollups_bucket"),
+    )
+
+
+class RollupCoverage(Base):
+    __tablename__ = "rollup_coverage"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), unique=True, nullable=False)  # Rollups include every point
+    verified_at = Column(DateTime(timezone=True), server_default=func.now())  # Dataset creation or last rebuild
+
+
+class RetentionPolicy(Base):
+    __tablename__ = "retention_policies"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), unique=True, nullable=False)
+    raw_retention_days = Column(Integer, nullable=False)  # Raw points older than this are compacted away
+    rollup_bucket = Column(String, default="hour")  # minute, hour, day - finest rollup kept past the raw window
+    rollup_retention_days = Column(Integer)  # Optional cap on how long rollups are kept
+    last_compacted_at = Column(DateTime(timezone=True))
+    points_compacted = Column(Integer, default=0)  # Raw points removed so far
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    dataset = relationship("Dataset")
+
+
+class DatasetIndex(Base):
+    __tablename__ = "dataset_indexes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), index=True)
+    key = Column(String, nullable=False)  # meta_data key
+    kind = Column(String, default="text")  # text, number
+    index_name = Column(String, nullable=False)  # Partial expression index on this dataset's data_points
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    dataset = relationship("Dataset")
+    
+    __table_args__ = (
+        UniqueConstraint("dataset_id", "key", "kind", name="uq_dataset_indexes_dataset_id_key_kind"),
+    )
+
+
+class DatasetStatistics(Base):
+    __tablename__ = "dataset_statistics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), unique=True, nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)  # Points folded in so far
+    columns = Column(JSON)  # "value" followed by numeric meta_data keys
+    moments = Column(JSON)  # Pairwise n/mean/m2/comoment matrices plus per-column min/max
+    folded_through = Column(Integer, nullable=False, default=0)  # Last data point id folded into statistics and sketches
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    dataset = relationship("Dataset")
+
+
+class DataSketch(Base):
+    __tablename__ = "data_sketches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=False)
+    column_name = Column(String, nullable=False)  # "value" or a meta_data key
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # Day bucket
+    count = Column(Integer, nullable=False, default=0)  # Non-null values folded in
+    quantiles = Column(JSON)  # KLL sketch state, numeric values only
+    distinct = Column(Text)  # HyperLogLog registers, base64
+    top = Column(JSON)  # Space-Saving summary
+    
+    __table_args__ = (
+        UniqueConstraint("dataset_id", "column_name", "bucket_start", name="uq_data_sketches_dataset_column_bucket"),
+        Index("ix_data_sketches_dataset_id_bucket_start", "dataset_id", "bucket_start"),
+    )
 
 
 class Dashboard(Base):
@@ -87,3 +243,39 @@ class Forecast(Base):
     
     # Relationships
     dataset = relationship("Dataset")
+
+
+class FittedModel(Base):
+    __tablename__ = "fitted_models"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=False)
+    target_column = Column(String, nullable=False)
+    model_type = Column(String, nullable=False)
+    state = Column(JSON, nullable=False)  # Fitted parameters and filter state, see ForecastService
+    point_count = Column(Integer, nullable=False, default=0)  # Observations folded into the state
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("dataset_id", "target_column", "model_type", name="uq_fitted_models_dataset_target_model"),
+    )
+
+
+class ForecastJob(Base):
+    __tablename__ = "forecast_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    target_column = Column(String, nullable=False)
+    model_type = Column(String, nullable=False)
+    forecast_periods = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed
+    forecast_id = Column(Integer, ForeignKey("forecasts.id"))
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    
+    # Relationships
+    forecast = relationship("Forecast")
@@ -69,6 +69,7 @@ class DatasetUpdate(BaseModel):
 class Dataset(DatasetBase):
     id: int
     owner_id: int
+    version: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -100,6 +101,153 @@ class DataPoint(BaseModel):
         from_attributes = True
 
 
+class BulkImportResult(BaseModel):
+    dataset_id: int
+    format: str
+    rows_imported: int
+    rows_rejected: int
+    batches: int
+    transactions: int
+
+
+class DataSegment(BaseModel):
+    id: int
+    dataset_id: int
+    row_count: int
+    first_point_id: int
+    last_point_id: int
+    min_timestamp: Optional[datetime] = None
+    max_timestamp: Optional[datetime] = None
+    columns: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class DatasetFieldCreate(BaseModel):
+    name: str
+    dtype: str = "float"
+
+
+class DatasetField(BaseModel):
+    id: int
+    dataset_id: int
+    name: str
+    dtype: str
+    backfill_status: str
+    backfilled_through: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class DatasetIndexCreate(BaseModel):
+    key: str
+    kind: str = "text"
+
+
+class DatasetIndex(BaseModel):
+    id: int
+    dataset_id: int
+    key: str
+    kind: str
+    index_name: str
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class RollupBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    sum: float
+    min: Optional[float] = None
+    max: Optional[float] = None
+    avg: Optional[float] = None
+    stddev: Optional[float] = None
+
+
+class AggregateBucket(BaseModel):
+    bucket_start: datetime
+    columns: Dict[str, Dict[str, Any]]  # column -> aggregate -> value
+
+
+class AggregateResult(BaseModel):
+    dataset_id: int
+    bucket_seconds: int
+    source: str  # raw, rollups
+    buckets: List[AggregateBucket]
+
+
+class SeriesPoint(BaseModel):
+    timestamp: datetime
+    value: float
+
+
+class Series(BaseModel):
+    dataset_id: int
+    method: str
+    total_points: int
+    points: List[SeriesPoint]
+
+
+class RetentionPolicyBase(BaseModel):
+    raw_retention_days: int
+    rollup_bucket: str = "hour"
+    rollup_retention_days: Optional[int] = None
+
+
+class RetentionPolicyCreate(RetentionPolicyBase):
+    pass
+
+
+class RetentionPolicy(RetentionPolicyBase):
+    id: int
+    dataset_id: int
+    last_compacted_at: Optional[datetime] = None
+    points_compacted: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CompactionResult(BaseModel):
+    dataset_id: int
+    raw_cutoff: datetime
+    points_deleted: int
+    rollups_deleted: int
+    segments_deleted: int
+    sketches_deleted: int = 0
+
+
+class HeavyHitter(BaseModel):
+    item: str
+    count: int  # Upper bound
+    lower_bound: int
+
+
+class ColumnSketch(BaseModel):
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    quantiles: Dict[str, Optional[float]]
+    distinct: int  # HyperLogLog estimate
+    top: List[HeavyHitter]
+
+
+class SketchResult(BaseModel):
+    dataset_id: int
+    bucket_seconds: int
+    bucket_count: int
+    columns: Dict[str, ColumnSketch]
+
+
 # Dashboard Schemas
 class DashboardBase(BaseModel):
     name: str
@@ -158,6 +306,41 @@ class Forecast(ForecastBase):
         from_attributes = True
 
 
+class ForecastBatchItem(BaseModel):
+    dataset_id: int
+    target_column: str = "value"
+    model_type: str = "arima"
+    periods: int = 30
+
+
+class ForecastBatchRequest(BaseModel):
+    items: List[ForecastBatchItem]
+
+
+class ForecastJobCreate(BaseModel):
+    target_column: str = "value"
+    model_type: str = "arima"
+    periods: int = 30
+
+
+class ForecastJob(BaseModel):
+    id: int
+    dataset_id: int
+    target_column: str
+    model_type: str
+    forecast_periods: int
+    status: str  # queued, running, completed, failed
+    forecast_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    forecast: Optional[Forecast] = None
+    
+    class Config:
+        from_attributes = True
+
+
 # WebSocket Schemas
 class WebSocketMessage(BaseModel):
     type: str  # data_update, forecast_complete, etc.
@@ -0,0 +1,201 @@
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.orm import Session
+
+from ..core.timeutils import naive_utc
+from ..models import models
+from .meta_query import Predicate, meta_query_service
+from .rollups import ROLLUP_BUCKETS, rollup_service
+
+
+AGGREGATES = ("count", "sum", "avg", "min", "max", "stddev")
+
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_INTERVAL_PATTERN = re.compile(r"^(\d+)([smhdw])$")
+_EPOCH = datetime(1970, 1, 1)
+
+
+class AggregationService:
+    """Time-bucketed aggregates computed by the database"""
+
+    def parse_interval(self, interval: str) -> int:
+        """Bucket width in seconds from ``minute``/``hour``/``day`` or e.g. ``15m``"""
+        interval = interval.strip().lower()
+        if interval in ROLLUP_BUCKETS:
+            return ROLLUP_BUCKETS[interval]
+        match = _INTERVAL_PATTERN.match(interval)
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"Invalid interval '{interval}'")
+        return int(match.group(1)) * _INTERVAL_UNITS[match.group(2)]
+
+    def aggregate(
+        self,
+        db: Session,
+        dataset_id: int,
+        bucket_seconds: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        aggregates: Sequence[str] = ("count", "avg"),
+        columns: Sequence[str] = ("value",),
+        predicates: Sequence[Predicate] = (),
+    ) -> Dict[str, Any]:
+        """Aggregate ``columns`` per bucket over ``[start, end)`` for points matching ``predicates``"""
+        unknown = [a for a in aggregates if a not in AGGREGATES]
+        if unknown:
+            raise ValueError(f"Unsupported aggregates: {', '.join(unknown)}")
+        if not columns:
+            raise ValueError("At least one column is required")
+        for column in columns:
+            if column != "value":
+                # Inlined into the JSON path of the extraction
+                meta_query_service.validate_key(column)
+        start, end = naive_utc(start), naive_utc(end)
+
+        rollup_seconds = None if predicates else self._rollup_source(
+            db, dataset_id, bucket_seconds, start, end, columns
+        )
+        if rollup_seconds is not None:
+            rows = self._rollup_rows(db, dataset_id, bucket_seconds, rollup_seconds, start, end)
+            source = "rollups"
+        else:
+            rows = self._raw_rows(db, dataset_id, bucket_seconds, start, end, columns, predicates)
+            source = "raw"
+
+        buckets = []
+        for row in rows:
+            values = {}
+            for i, column in enumerate(columns):
+                count, total, low, high, total_sq = row[1 + 5 * i: 6 + 5 * i]
+                values[column] = self._finish(aggregates, count or 0, total, low, high, total_sq)
+            buckets.append({"bucket_start": _EPOCH + timedelta(seconds=int(row[0])), "columns": values})
+
+        return {
+            "dataset_id": dataset_id,
+            "bucket_seconds": bucket_seconds,
+            "source": source,
+            "buckets": buckets,
+        }
+
+    def _rollup_source(
+        self,
+        db: Session,
+        dataset_id: int,
+        bucket_seconds: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        columns: Sequence[str],
+    ) -> Optional[int]:
+        """Largest rollup size the request can be answered from, if any"""
+        if list(columns) != ["value"]:
+            return None
+        # Points loaded before rollups existed are only in data_points
+        if not rollup_service.is_complete(db, dataset_id):
+            return None
+        for size in sorted(ROLLUP_BUCKETS.values(), reverse=True):
+            if bucket_seconds % size:
+                continue
+            if all(bound is None or self._epoch_seconds(bound) % size == 0 for bound in (start, end)):
+                return size
+        return None
+
+    def _bucket_expression(self, db: Session, column: Any, bucket_seconds: int):
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            epoch = cast(func.strftime("%s", column), BigInteger)
+        elif dialect == "postgresql":
+            epoch = cast(func.floor(func.extract("epoch", column)), BigInteger)
+        else:
+            raise NotImplementedError(f"Bucketed aggregation is not supported on {dialect}")
+        return ((epoch // bucket_seconds) * bucket_seconds).label("bucket")
+
+    def _raw_rows(
+        self,
+        db: Session,
+        dataset_id: int,
+        bucket_seconds: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        columns: Sequence[str],
+        predicates: Sequence[Predicate] = (),
+    ) -> List[Any]:
+        dialect = db.get_bind().dialect.name
+        bucket = self._bucket_expression(db, models.DataPoint.timestamp, bucket_seconds)
+        selected = [bucket]
+        for column in columns:
+            if column == "value":
+                expr = models.DataPoint.value
+            else:
+                # Non-numeric values of the key are left out instead of failing the query
+                expr = meta_query_service.expression(dialect, column, "number")
+            selected.extend([
+                func.count(expr), func.sum(expr), func.min(expr), func.max(expr), func.sum(expr * expr),
+            ])
+
+        query = select(*selected).where(models.DataPoint.dataset_id == dataset_id)
+        if predicates:
+            query = query.where(*meta_query_service.where_clauses(dialect, predicates))
+        if start is not None:
+            query = query.where(models.DataPoint.timestamp >= start)
+        if end is not None:
+            query = query.where(models.DataPoint.timestamp < end)
+        return db.execute(query.group_by(bucket).order_by(bucket)).all()
+
+    def _rollup_rows(
+        self,
+        db: Session,
+        dataset_id: int,
+        bucket_seconds: int,
+        rollup_seconds: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+    ) -> List[Any]:
+        rollup = models.DataRollup
+        bucket = self._bucket_expression(db, rollup.bucket_start, bucket_seconds)
+        query = select(
+            bucket,
+            func.sum(rollup.count), func.sum(rollup.sum), func.min(rollup.min), func.max(rollup.max),
+            func.sum(rollup.sum_sq),
+        ).where(
+            rollup.dataset_id == dataset_id,
+            rollup.bucket_seconds == rollup_seconds,
+        )
+        if start is not None:
+            query = query.where(rollup.bucket_start >= start)
+        if end is not None:
+            query = query.where(rollup.bucket_start < end)
+        return db.execute(query.group_by(bucket).order_by(bucket)).all()
+
+    def _finish(
+        self,
+        aggregates: Sequence[str],
+        count: int,
+        total: Optional[float],
+        low: Optional[float],
+        high: Optional[float],
+        total_sq: Optional[float],
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for name in aggregates:
+            if name == "count":
+                result[name] = count
+            elif name == "sum":
+                result[name] = total
+            elif name == "avg":
+                result[name] = total / count if count else None
+            elif name == "min":
+                result[name] = low
+            elif name == "max":
+                result[name] = high
+            elif name == "stddev":
+                result[name] = rollup_service.stddev(count, total, total_sq)
+        return result
+
+    def _epoch_seconds(self, value: datetime) -> float:
+        return (value - _EPOCH).total_seconds()
+
+
+# Singleton instance
+aggregation_service = AggregationService()
@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.timeutils import naive_utc
+from ..models import models
+from .segments import segment_store
+
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+class DownsampleService:
+    """Server-side reduction of long series to a chart-sized number of points"""
+
+    def load_series(
+        self,
+        db: Session,
+        dataset_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps (int64 ns) and values of a dataset, sorted by time"""
+        start, end = naive_utc(start), naive_utc(end)
+        if segment_store.enabled:
+            columns = segment_store.read(db, dataset_id, start, end, columns=[])
+            return np.asarray(columns["timestamp"]), np.asarray(columns["value"])
+
+        query = select(models.DataPoint.timestamp, models.DataPoint.value).where(
+            models.DataPoint.dataset_id == dataset_id
+        )
+        if start is not None:
+            query = query.where(models.DataPoint.timestamp >= start)
+        if end is not None:
+            query = query.where(models.DataPoint.timestamp <= end)
+        rows = db.execute(query.order_by(models.DataPoint.timestamp, models.DataPoint.id)).all()
+
+        timestamps = pd.to_datetime([r.timestamp for r in rows], utc=True).tz_localize(None)
+        values = np.fromiter((r.value for r in rows), dtype=np.float64, count=len(rows))
+        return timestamps.asi8.astype(np.int64), values
+
+    def lttb(self, x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+        """Largest-Triangle-Three-Buckets: indices of the points to keep"""
+        n = len(x)
+        if max_points >= n or max_points < 3:
+            return np.arange(n)
+
+        x = np.asarray(x, dtype=np.float64)
+        x = x - x[0]  # keep ns offsets exact enough in float64
+        y = np.asarray(y, dtype=np.float64)
+        edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+        cum_x = np.concatenate(([0.0], np.cumsum(x)))
+        cum_y = np.concatenate(([0.0], np.cumsum(y)))
+
+        selected = np.empty(max_points, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        a = 0
+        for i in range(max_points - 2):
+            lo, hi = edges[i], edges[i + 1]
+            if i + 2 < len(edges):
+                next_lo, next_hi = edges[i + 1], edges[i + 2]
+                avg_x = (cum_x[next_hi] - cum_x[next_lo]) / (next_hi - next_lo)
+                avg_y = (cum_y[next_hi] - cum_y[next_lo]) / (next_hi - next_lo)
+            else:
+                avg_x, avg_y = x[n - 1], y[n - 1]
+            area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+            a = lo + int(np.argmax(area))
+            selected[i + 1] = a
+        return selected
+
+    def minmax(self, x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+        """Indices of the min and max point of ``max_points / 2`` equal-count buckets"""
+        n = len(y)
+        if max_points >= n or max_points < 2:
+            return np.arange(n)
+
+        y = np.asarray(y, dtype=np.float64)
+        edges = np.linspace(0, n, max_points // 2 + 1).astype(np.int64)
+        selected = np.empty(2 * (len(edges) - 1), dtype=np.int64)
+        for i in range(len(edges) - 1):
+            lo, hi = edges[i], edges[i + 1]
+            bucket = y[lo:hi]
+            selected[2 * i] = lo + int(np.argmin(bucket))
+            selected[2 * i + 1] = lo + int(np.argmax(bucket))
+        return np.unique(selected)
+
+    def series(
+        self,
+        db: Session,
+        dataset_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_points: int = 1000,
+        method: str = "lttb",
+    ) -> Dict[str, Any]:
+        """Load a dataset series and downsample it to at most ``max_points``"""
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"Unsupported downsampling method '{method}'")
+
+        timestamps, values = self.load_series(db, dataset_id, start, end)
+        keep = ~np.isnan(values)
+        if not keep.all():
+            timestamps, values = timestamps[keep], values[keep]
+
+        reduce = self.lttb if method == "lttb" else self.minmax
+        index = reduce(timestamps, values, max_points)
+        picked = pd.to_datetime(timestamps[index]).to_pydatetime()
+
+        return {
+            "dataset_id": dataset_id,
+            "method": method,
+            "total_points": int(len(values)),
+            "points": [
+                {"timestamp": ts, "value": value}
+                for ts, value in zip(picked, values[index].tolist())
+            ],
+        }
+
+
+# Singleton instance
+downsample_service = DownsampleService()
@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+from typing import Iterator, List
+
+from sqlalchemy import Text, cast, select
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet support is optional
+    pa = pq = None
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after every batch"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExportService:
+    """Streams a dataset's points out in a file format"""
+
+    def check_format(self, data_format: str) -> None:
+        """Raise ValueError unless ``data_format`` can be exported here"""
+        if data_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{data_format}'")
+        if data_format in COLUMNAR_FORMATS and pa is None:
+            raise ValueError(f"{data_format} export requires pyarrow")
+
+    def media_type(self, data_format: str) -> str:
+        return EXPORT_FORMATS[data_format][0]
+
+    def filename(self, dataset: models.Dataset, data_format: str) -> str:
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in dataset.name) or f"dataset_{dataset.id}"
+        return f"{name}.{EXPORT_FORMATS[data_format][1]}"
+
+    def stream(self, dataset_id: int, data_format: str) -> Iterator[bytes]:
+        """Yield the encoded export of a dataset chunk by chunk"""
+        self.check_format(data_format)
+
+        if data_format in COLUMNAR_FORMATS:
+            encode = self._columnar_encoder(data_format)
+        else:
+            encode = self._encode_csv if data_format == "csv" else self._encode_ndjson
+        db = SessionLocal()
+        try:
+            # meta_data is selected as its stored JSON text so it can be
+            # written out without a decode/encode round trip per row.
+            result = db.connection().execute(
+                select(
+                    models.DataPoint.timestamp,
+                    models.DataPoint.value,
+                    cast(models.DataPoint.meta_data, Text).label("meta_data"),
+                )
+                .where(models.DataPoint.dataset_id == dataset_id)
+                .order_by(models.DataPoint.timestamp, models.DataPoint.id)
+                .execution_options(yield_per=settings.export_batch_rows)
+            )
+            if data_format == "csv":
+                yield b"timestamp,value,meta_data\r\n"
+            for partition in result.partitions():
+                yield encode(partition)
+            if data_format in COLUMNAR_FORMATS:
+                yield encode(None)
+        finally:
+            db.close()
+
+    def _encode_csv(self, rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            (row.timestamp.isoformat(), repr(row.value), self._meta_text(row.meta_data) or "")
+            for row in rows
+        )
+        return buffer.getvalue().encode()
+
+    def _encode_ndjson(self, rows) -> bytes:
+        return "".join(
+            f'{{"timestamp": "{row.timestamp.isoformat()}", "value": {json.dumps(row.value)}, '
+            f'"meta_data": {self._meta_text(row.meta_data) or "null"}}}\n'
+            for row in rows
+        ).encode()
+
+    def _columnar_encoder(self, data_format: str):
+        """Encoder turning partitions into Arrow IPC / Parquet bytes; ``None`` closes the stream"""
+        schema = pa.schema([
+            ("timestamp", pa.timestamp("us")),
+            ("value", pa.float64()),
+            ("meta_data", pa.string()),
+        ])
+        sink = _ChunkSink()
+        if data_format == "arrow":
+            writer = pa.ipc.new_stream(sink, schema)
+        else:
+            writer = pq.ParquetWriter(sink, schema)
+
+        def encode(rows) -> bytes:
+            if rows is None:
+                writer.close()
+                return sink.drain()
+            timestamps, values, meta = zip(*rows) if rows else ((), (), ())
+            batch = pa.record_batch([
+                pa.array(timestamps, type=pa.timestamp("us")),
+                pa.array(values, type=pa.float64()),
+                pa.array([self._meta_text(m) for m in meta], type=pa.string()),
+            ], schema=schema)
+            if data_format == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_batch(batch, row_group_size=len(rows))
+            return sink.drain()
+
+        return encode
+
+    def _meta_text(self, text):
+        return None if text is None or text == "null" else text
+
+
+# Singleton instance
+export_service = ExportService()
@@ -1,11 +1,49 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
+from scipy.stats import norm
 from statsmodels.tsa.arima.model import ARIMA
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from typing import Dict, List, Any, Tuple
+from statsmodels.tsa.seasonal import STL
+from statsmodels.tsa.stattools import kpss
+from typing import Dict, List, Any, Optional, Tuple, Union
+import itertools
 import json
+import math
+import multiprocessing
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
+from ..core.config import settings
+
+
+def _fit_arima_candidate(
+    values: np.ndarray,
+    order: Tuple[int, int, int],
+    seasonal_order: Tuple[int, int, int, int],
+    trend: str,
+    maxiter: int,
+) -> Optional[Dict[str, Any]]:
+    """Fit one ARIMA candidate; module level so search workers can run it"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = ARIMA(values, order=order, seasonal_order=seasonal_order, trend=trend)
+            fitted = model.fit(method_kwargs={"maxiter": maxiter})
+    except Exception:
+        return None
+    if not np.isfinite(fitted.aic):
+        return None
+    return {
+        "order": order,
+        "seasonal_order": seasonal_order,
+        "trend": trend,
+        "aic": float(fitted.aic),
+        "bic": float(fitted.bic),
+        "params": fitted.params.tolist(),
+    }
 
 
 class ForecastService:
@@ -17,15 +55,18 @@ class ForecastService:
             "arima": self._arima_forecast,
             "moving_average": self._moving_average_forecast
         }
+        self._search_pool: Optional[ProcessPoolExecutor] = None
+        self._search_pool_lock = threading.Lock()
     
     def generate_forecast(
         self, 
-        data: List[Dict[str, Any]], 
+        data: Union[List[Dict[str, Any]], Dict[str, Any]], 
         target_column: str, 
         model_type: str = "arima",
-        forecast_periods: int = 30
+        forecast_periods: int = 30,
+        state: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Generate forecast for given data"""
+        """Generate forecast for given data; ``state`` is an earlier ``model_state`` to update"""
         try:
             df = pd.DataFrame(data)
             
@@ -47,7 +88,7 @@ class ForecastService:
             if model_type not in self.models:
                 model_type = "arima"  # Default fallback
             
-            forecast_result = self.models[model_type](target_series, forecast_periods)
+            forecast_result = self.models[model_type](target_series, forecast_periods, state=state)
             
             return {
                 "model_type": model_type,
@@ -55,165 +96,532 @@ class ForecastService:
                 "forecast_data": forecast_result["predictions"],
                 "confidence_interval": forecast_result.get("confidence_interval"),
                 "accuracy_metrics": forecast_result.get("accuracy_metrics"),
-                "forecast_dates": forecast_result.get("forecast_dates")
+                "forecast_dates": forecast_result.get("forecast_dates"),
+                "model_state": forecast_result.get("state")
             }
             
         except Exception as e:
             raise Exception(f"Forecast generation failed: {str(e)}")
     
-    def _arima_forecast(self, series: pd.Series, periods: int) -> Dict[str, Any]:
-        """ARIMA model forecasting"""
+    def _arima_forecast(
+        self, series: pd.Series, periods: int, state: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """ARIMA model forecasting with an automatically selected order"""
+        values = series.to_numpy(dtype=np.float64)
+        n = self._reusable_prefix(state, series, "arima")
+        if n and len(values) - n <= settings.forecast_arima_refit_ratio * state["fitted_n"]:
+            try:
+                return self._arima_update(series, values, periods, state, n)
+            except Exception:
+                pass  # Refit from scratch below
+        
         try:
-            # Auto-detect ARIMA parameters (simplified)
-            model = ARIMA(series, order=(1, 1, 1))
-            fitted_model = model.fit()
-            
-            # Generate forecast
-            forecast = fitted_model.forecast(steps=periods)
-            conf_int = fitted_model.get_forecast(steps=periods).conf_int()
-            
-            # Generate future dates
-            last_date = series.index[-1] if hasattr(series.index, 'dtype') else datetime.now()
-            if isinstance(last_date, str):
-                last_date = pd.to_datetime(last_date)
-            
-            future_dates = pd.date_range(
-                start=last_date + timedelta(days=1),
-                periods=periods,
-                freq='D'
-            )
-            
-            # Calculate accuracy on training data
-            fitted_values = fitted_model.fittedvalues
-            rmse = np.sqrt(mean_squared_error(series[1:], fitted_values))
-            mae = mean_absolute_error(series[1:], fitted_values)
-            
-            return {
-                "predictions": forecast.tolist(),
-                "confidence_interval": {
-                    "lower": conf_int.iloc[:, 0].tolist(),
-                    "upper": conf_int.iloc[:, 1].tolist()
-                },
-                "accuracy_metrics": {
-                    "rmse": rmse,
-                    "mae": mae,
-                    "aic": fitted_model.aic
-                },
-                "forecast_dates": future_dates.strftime('%Y-%m-%d').tolist()
-            }
-            
+            return self._arima_fit(series, values, periods)
         except Exception as e:
             # Fallback to linear regression if ARIMA fails
-            return self._linear_regression_forecast(series, periods)
+            result = self._linear_regression_forecast(series, periods)
+            result["accuracy_metrics"]["fallback"] = "linear_regression"
+            return result
     
-    def _linear_regression_forecast(self, series: pd.Series, periods: int) -> Dict[str, Any]:
-        """Linear regression forecasting"""
-        try:
-            # Prepare data
-            X = np.arange(len(series)).reshape(-1, 1)
-            y = series.values
-            
-            # Fit model
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Generate forecast
-            future_X = np.arange(len(series), len(series) + periods).reshape(-1, 1)
-            predictions = model.predict(future_X)
-            
-            # Calculate confidence interval (simplified)
-            residuals = y - model.predict(X)
-            std_error = np.std(residuals)
-            confidence_interval = {
-                "lower": (predictions - 1.96 * std_error).tolist(),
-                "upper": (predictions + 1.96 * std_error).tolist()
-            }
-            
-            # Generate future dates
-            last_date = series.index[-1] if hasattr(series.index, 'dtype') else datetime.now()
-            if isinstance(last_date, str):
-                last_date = pd.to_datetime(last_date)
-            
-            future_dates = pd.date_range(
-                start=last_date + timedelta(days=1),
-                periods=periods,
-                freq='D'
+    def _arima_fit(self, series: pd.Series, values: np.ndarray, periods: int) -> Dict[str, Any]:
+        search = self._arima_order_search(values)
+        best = search["best"]
+        if best is None:
+            raise ValueError("No ARIMA candidate could be fitted")
+        
+        # Re-apply the winning parameters instead of fitting a second time
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = ARIMA(
+                values, order=best["order"], seasonal_order=best["seasonal_order"], trend=best["trend"]
+            )
+            fitted_model = model.filter(np.asarray(best["params"]))
+            prediction = fitted_model.get_forecast(steps=periods)
+        conf_int = np.asarray(prediction.conf_int())
+        
+        # Calculate accuracy on training data, past the differencing burn-in
+        _, d, _ = best["order"]
+        _, D, _, m = best["seasonal_order"]
+        burn_in = min(d + D * m, len(values) - 1)
+        errors = values[burn_in:] - np.asarray(fitted_model.fittedvalues)[burn_in:]
+        
+        state = {
+            "kind": "arima",
+            **self._fingerprint(series),
+            "fitted_n": len(values),
+            "order": list(best["order"]),
+            "seasonal_order": list(best["seasonal_order"]),
+            "trend": best["trend"],
+            "params": list(best["params"]),
+            "predicted_state": fitted_model.predicted_state[:, -1].tolist(),
+            "predicted_state_cov": fitted_model.predicted_state_cov[:, :, -1].tolist(),
+            "llf": float(fitted_model.llf),
+            "df_model": int(fitted_model.df_model),
+            "nobs_effective": int(fitted_model.nobs_effective),
+            "sse": float(errors @ errors),
+            "sae": float(np.abs(errors).sum()),
+            "errors": len(errors),
+        }
+        result = self._arima_result(series, periods, np.asarray(prediction.predicted_mean), conf_int, state)
+        result["accuracy_metrics"].update({
+            "criterion": search["criterion"],
+            "candidates_evaluated": search["evaluated"],
+            "search_seconds": search["seconds"],
+            "fit": "full",
+        })
+        return result
+    
+    def _arima_update(
+        self, series: pd.Series, values: np.ndarray, periods: int, state: Dict[str, Any], n: int
+    ) -> Dict[str, Any]:
+        """Filter the points after ``n`` and the forecast horizon from the cached state"""
+        tail = values[n:]
+        k = len(tail)
+        endog = np.concatenate([tail, np.full(periods, np.nan)])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            # ARIMA does not offset its own trend regressor when extended, so
+            # the trend goes in as exog counting on from the fitted span
+            model = ARIMA(
+                endog,
+                exog=_trend_exog(state["trend"], n + 1, k + periods),
+                order=tuple(state["order"]),
+                seasonal_order=tuple(state["seasonal_order"]),
+                trend="n",
+            )
+            model.ssm.initialize_known(
+                np.asarray(state["predicted_state"]), np.asarray(state["predicted_state_cov"])
             )
+            filtered = model.filter(np.asarray(state["params"]))
+        
+        forecast = filtered.forecasts[0, k:]
+        half_width = norm.ppf(0.975) * np.sqrt(filtered.forecasts_error_cov[0, 0, k:])
+        errors = tail - filtered.forecasts[0, :k]
+        
+        state = {
+            **state,
+            **self._fingerprint(series),
+            "predicted_state": filtered.predicted_state[:, k].tolist(),
+            "predicted_state_cov": filtered.predicted_state_cov[:, :, k].tolist(),
+            "llf": state["llf"] + float(filtered.llf),
+            "nobs_effective": state["nobs_effective"] + k,
+            "sse": state["sse"] + float(errors @ errors),
+            "sae": state["sae"] + float(np.abs(errors).sum()),
+            "errors": state["errors"] + k,
+        }
+        conf_int = np.column_stack([forecast - half_width, forecast + half_width])
+        result = self._arima_result(series, periods, forecast, conf_int, state)
+        result["accuracy_metrics"]["fit"] = "incremental"
+        return result
+    
+    def _arima_result(
+        self, series: pd.Series, periods: int, forecast: np.ndarray, conf_int: np.ndarray, state: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        errors = max(state["errors"], 1)
+        llf, df_model = state["llf"], state["df_model"]
+        return {
+            "predictions": forecast.tolist(),
+            "confidence_interval": {
+                "lower": conf_int[:, 0].tolist(),
+                "upper": conf_int[:, 1].tolist()
+            },
+            "accuracy_metrics": {
+                "rmse": math.sqrt(state["sse"] / errors),
+                "mae": state["sae"] / errors,
+                "aic": -2 * llf + 2 * df_model,
+                "bic": -2 * llf + math.log(max(state["nobs_effective"], 1)) * df_model,
+                "order": state["order"],
+                "seasonal_order": state["seasonal_order"]
+            },
+            "forecast_dates": self._future_dates(series, periods),
+            "state": state
+        }
+    
+    def _arima_order_search(self, values: np.ndarray) -> Dict[str, Any]:
+        """Choose ARIMA (p, d, q)(P, D, Q, m) by information criterion"""
+        started = time.monotonic()
+        deadline = started + settings.forecast_arima_time_budget_seconds
+        criterion = "bic" if settings.forecast_arima_criterion == "bic" else "aic"
+        
+        m = settings.forecast_arima_seasonal_period
+        seasonal = m > 1 and len(values) >= 3 * m
+        D = self._seasonal_differences(values, m) if seasonal else 0
+        d = self._differences(values[m:] - values[:-m] if D else values)
+        max_seasonal = 1 if seasonal else 0
+        # Drift survives one difference; anything more would be differenced away
+        trend = {0: "c", 1: "t"}.get(d + D, "n")
+        usable = len(values) - d - D * m
+        
+        best = None
+        evaluated = 0
+        max_order = settings.forecast_arima_max_p + settings.forecast_arima_max_q + 2 * max_seasonal
+        for total in range(max_order + 1):
+            candidates = [
+                ((p, d, q), (P, D, Q, m if P or D or Q else 0), trend)
+                for p, q, P, Q in itertools.product(
+                    range(settings.forecast_arima_max_p + 1),
+                    range(settings.forecast_arima_max_q + 1),
+                    range(max_seasonal + 1),
+                    range(max_seasonal + 1),
+                )
+                if p + q + P + Q == total and p + q + (P + Q) * m < usable // 2
+            ]
+            if not candidates:
+                continue
             
-            # Calculate accuracy metrics
-            y_pred = model.predict(X)
-            rmse = np.sqrt(mean_squared_error(y, y_pred))
-            mae = mean_absolute_error(y, y_pred)
-            r2 = model.score(X, y)
+            results = self._fit_candidates(values, candidates, deadline)
+            evaluated += len(results)
+            fitted = [r for r in results if r is not None]
+            round_best = min(fitted, key=lambda r: r[criterion]) if fitted else None
+            if round_best is not None and (best is None or round_best[criterion] < best[criterion]):
+                best = round_best
+            elif best is not None:
+                break
+            if time.monotonic() >= deadline:
+                break
+        
+        return {
+            "best": best,
+            "criterion": criterion,
+            "evaluated": evaluated,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    
+    def _differences(self, values: np.ndarray) -> int:
+        """Number of differences until KPSS no longer rejects stationarity"""
+        d = 0
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            while d < settings.forecast_arima_max_d and len(values) > 10:
+                try:
+                    p_value = kpss(values, regression="c", nlags="auto")[1]
+                except Exception:
+                    break
+                if p_value >= 0.05:
+                    break
+                values = np.diff(values)
+                d += 1
+        return d
+    
+    def _seasonal_differences(self, values: np.ndarray, m: int) -> int:
+        """One seasonal difference when the STL seasonal strength is at least 0.64"""
+        try:
+            decomposition = STL(values, period=m).fit()
+        except Exception:
+            return 0
+        resid = decomposition.resid
+        spread = np.var(resid + decomposition.seasonal)
+        strength = max(0.0, 1 - np.var(resid) / spread) if spread > 0 else 0.0
+        return 1 if strength >= 0.64 else 0
+    
+    def _fit_candidates(
+        self, values: np.ndarray, candidates: List[Tuple[Any, ...]], deadline: float
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Fit a round of candidates, dropping any not finished by the deadline"""
+        maxiter = settings.forecast_arima_maxiter
+        pool = self._pool()
+        if pool is None:
+            results = []
+            for candidate in candidates:
+                if time.monotonic() >= deadline:
+                    break
+                results.append(_fit_arima_candidate(values, *candidate, maxiter))
+            return results
+        
+        futures = [pool.submit(_fit_arima_candidate, values, *candidate, maxiter) for candidate in candidates]
+        done, pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future in pending:
+            # Only drops fits that have not started yet
+            future.cancel()
+        results = []
+        for future in done:
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+            except Exception:
+                results.append(None)
+        return results
+    
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Shut down a broken pool so the next search starts a fresh one"""
+        with self._search_pool_lock:
+            if self._search_pool is pool:
+                self._search_pool = None
+        # Reaps the surviving workers without waiting on them
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool for candidate fits, or None to fit them one by one"""
+        if multiprocessing.parent_process() is not None:
+            return None
+        workers = settings.forecast_arima_workers or os.cpu_count() or 1
+        if workers <= 1:
+            return None
+        with self._search_pool_lock:
+            if self._search_pool is None:
+                self._search_pool = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._search_pool
+    
+    def _linear_regression_forecast(
+        self, series: pd.Series, periods: int, state: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Linear regression forecasting"""
+        try:
+            y = series.to_numpy(dtype=np.float64)
+            n = self._reusable_prefix(state, series, "linear_regression")
+            moments = None
+            if n:
+                moments = merge_regression_moments(
+                    state["moments"], regression_moments(np.arange(n, len(y)), y[n:])
+                )
+            fit = linear_regression_forecast(y, periods, moments=moments)
             
             return {
-                "predictions": predictions.tolist(),
-                "confidence_interval": confidence_interval,
+                "predictions": fit["predictions"].tolist(),
+                "confidence_interval": {
+                    "lower": fit["lower"].tolist(),
+                    "upper": fit["upper"].tolist()
+                },
                 "accuracy_metrics": {
-                    "rmse": rmse,
-                    "mae": mae,
-                    "r2_score": r2
+                    "rmse": float(fit["rmse"]),
+                    "mae": float(fit["mae"]),
+                    "r2_score": float(fit["r2"]),
+                    "fit": "incremental" if n else "full"
                 },
-                "forecast_dates": future_dates.strftime('%Y-%m-%d').tolist()
+                "forecast_dates": self._future_dates(series, periods),
+                "state": {"kind": "linear_regression", **self._fingerprint(series), "moments": fit["moments"]}
             }
             
         except Exception as e:
             raise Exception(f"Linear regression forecast failed: {str(e)}")
     
-    def _moving_average_forecast(self, series: pd.Series, periods: int, window: int = 7) -> Dict[str, Any]:
+    def _moving_average_forecast(
+        self, series: pd.Series, periods: int, window: int = 7, state: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """Moving average forecasting"""
         try:
-            # Calculate moving average
-            ma = series.rolling(window=window).mean()
-            last_ma = ma.iloc[-1]
-            
-            # Simple forecast: extend last moving average
-            predictions = [last_ma] * periods
-            
-            # Simple confidence interval
-            std_dev = series.rolling(window=window).std().iloc[-1]
-            confidence_interval = {
-                "lower": [last_ma - 1.96 * std_dev] * periods,
-                "upper": [last_ma + 1.96 * std_dev] * periods
-            }
-            
-            # Generate future dates
-            last_date = series.index[-1] if hasattr(series.index, 'dtype') else datetime.now()
-            if isinstance(last_date, str):
-                last_date = pd.to_datetime(last_date)
-            
-            future_dates = pd.date_range(
-                start=last_date + timedelta(days=1),
-                periods=periods,
-                freq='D'
-            )
-            
-            # Calculate accuracy metrics
-            ma_aligned = ma.dropna()
-            series_aligned = series.loc[ma_aligned.index]
-            
-            # Ensure both series have the same length
-            min_length = min(len(ma_aligned), len(series_aligned))
-            ma_aligned = ma_aligned.iloc[:min_length]
-            series_aligned = series_aligned.iloc[:min_length]
-            
-            rmse = np.sqrt(mean_squared_error(series_aligned, ma_aligned))
-            mae = mean_absolute_error(series_aligned, ma_aligned)
+            values = series.to_numpy(dtype=np.float64)
+            n = self._reusable_prefix(state, series, "moving_average")
+            if n and state.get("window") == window:
+                # Windows ending at each new point, seeded with the cached tail
+                extended = np.concatenate([np.asarray(state["tail"], dtype=np.float64), values[n:]])
+                fit = moving_average_forecast(extended, periods, window)
+                # The first window was already counted
+                sse = state["sse"] + fit["sse"] - fit["first_error"] ** 2
+                sae = state["sae"] + fit["sae"] - abs(fit["first_error"])
+                count = state["errors"] + fit["errors"] - 1
+            else:
+                n = 0
+                fit = moving_average_forecast(values, periods, window)
+                sse, sae, count = float(fit["sse"]), float(fit["sae"]), int(fit["errors"])
             
             return {
-                "predictions": predictions,
-                "confidence_interval": confidence_interval,
+                "predictions": fit["predictions"].tolist(),
+                "confidence_interval": {
+                    "lower": fit["lower"].tolist(),
+                    "upper": fit["upper"].tolist()
+                },
                 "accuracy_metrics": {
-                    "rmse": rmse,
-                    "mae": mae,
-                    "window_size": window
+                    "rmse": math.sqrt(sse / count),
+                    "mae": sae / count,
+                    "window_size": window,
+                    "fit": "incremental" if n else "full"
                 },
-                "forecast_dates": future_dates.strftime('%Y-%m-%d').tolist()
+                "forecast_dates": self._future_dates(series, periods),
+                "state": {
+                    "kind": "moving_average",
+                    **self._fingerprint(series),
+                    "window": window,
+                    "tail": values[-window:].tolist(),
+                    "sse": float(sse),
+                    "sae": float(sae),
+                    "errors": int(count),
+                }
             }
             
         except Exception as e:
             raise Exception(f"Moving average forecast failed: {str(e)}")
+    
+    def _future_dates(self, series: pd.Series, periods: int) -> List[str]:
+        last_date = series.index[-1] if hasattr(series.index, 'dtype') else datetime.now()
+        if isinstance(last_date, str):
+            last_date = pd.to_datetime(last_date)
+        
+        future_dates = pd.date_range(
+            start=last_date + timedelta(days=1),
+            periods=periods,
+            freq='D'
+        )
+        return future_dates.strftime('%Y-%m-%d').tolist()
+    
+    def _fingerprint(self, series: pd.Series) -> Dict[str, Any]:
+        """Identifies the observations a state was built from"""
+        return {
+            "n": len(series),
+            "last_index": str(series.index[-1]),
+            "checksum": float(np.sum(series.to_numpy(dtype=np.float64))),
+        }
+    
+    def _reusable_prefix(self, state: Optional[Dict[str, Any]], series: pd.Series, kind: str) -> int:
+        """Observations of ``series`` already folded into ``state``, or 0 to refit"""
+        if not state or state.get("kind") != kind:
+            return 0
+        n = state.get("n", 0)
+        if not 0 < n <= len(series) or str(series.index[n - 1]) != state.get("last_index"):
+            return 0
+        checksum = float(np.sum(series.to_numpy(dtype=np.float64)[:n]))
+        if not math.isclose(checksum, state.get("checksum", math.nan), rel_tol=1e-9, abs_tol=1e-9):
+            return 0
+        return n
+
+
+def _trend_exog(trend: str, start: int, count: int) -> Optional[np.ndarray]:
+    """ARIMA trend regressor for observations ``start`` .. ``start + count - 1``"""
+    if trend == "c":
+        return np.ones((count, 1))
+    if trend == "t":
+        return np.arange(start, start + count, dtype=np.float64)[:, None]
+    return None
+
+
+def regression_moments(x: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+    """Means, M2 and co-moment of (x, y) for one series or each row of a 2-D array"""
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    n = y.shape[-1]
+    if not n:
+        zeros = np.zeros(y.shape[:-1])
+        return {"n": 0, "mean_x": 0.0, "mean_y": zeros, "m2_x": 0.0, "m2_y": zeros, "c_xy": zeros}
+    mean_x, mean_y = x.mean(), y.mean(axis=-1)
+    dx, dy = x - mean_x, y - mean_y[..., None]
+    return {
+        "n": n,
+        "mean_x": float(mean_x),
+        "mean_y": mean_y,
+        "m2_x": float(dx @ dx),
+        "m2_y": np.einsum("...i,...i->...", dy, dy),
+        "c_xy": dy @ dx,
+    }
+
+
+def merge_regression_moments(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Chan et al. combination of two sets of regression moments"""
+    if not b["n"]:
+        return a
+    n = a["n"] + b["n"]
+    delta_x = b["mean_x"] - a["mean_x"]
+    delta_y = np.subtract(b["mean_y"], a["mean_y"])
+    weight = a["n"] * b["n"] / n
+    return {
+        "n": n,
+        "mean_x": a["mean_x"] + delta_x * b["n"] / n,
+        "mean_y": np.add(a["mean_y"], delta_y * b["n"] / n),
+        "m2_x": a["m2_x"] + b["m2_x"] + delta_x * delta_x * weight,
+        "m2_y": np.add(np.add(a["m2_y"], b["m2_y"]), delta_y * delta_y * weight),
+        "c_xy": np.add(np.add(a["c_xy"], b["c_xy"]), delta_x * delta_y * weight),
+    }
+
+
+def linear_regression_forecast(
+    values: np.ndarray, periods: int, moments: Optional[Dict[str, Any]] = None, z: float = 1.96
+) -> Dict[str, Any]:
+    """Closed-form least-squares trend forecast for one series or a (series, n) array"""
+    y = np.asarray(values, dtype=np.float64)
+    single = y.ndim == 1
+    y = np.atleast_2d(y)
+    n = y.shape[1]
+    if moments is None:
+        moments = regression_moments(np.arange(n), y)
+    mean_y = np.atleast_1d(np.asarray(moments["mean_y"], dtype=np.float64))
+    m2_y = np.atleast_1d(np.asarray(moments["m2_y"], dtype=np.float64))
+    c_xy = np.atleast_1d(np.asarray(moments["c_xy"], dtype=np.float64))
+    m2_x = moments["m2_x"]
+    
+    slope = c_xy / m2_x if m2_x > 0 else np.zeros_like(c_xy)
+    intercept = mean_y - slope * moments["mean_x"]
+    sse = np.maximum(m2_y - slope * c_xy, 0.0)
+    std_error = np.sqrt(sse / n)
+    
+    predictions = intercept[:, None] + slope[:, None] * np.arange(n, n + periods)
+    residuals = y - (intercept[:, None] + slope[:, None] * np.arange(n))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(m2_y > 0, 1 - sse / m2_y, 1.0)
+    
+    result = {
+        "predictions": predictions,
+        "lower": predictions - z * std_error[:, None],
+        "upper": predictions + z * std_error[:, None],
+        "rmse": std_error,
+        "mae": np.abs(residuals).mean(axis=1),
+        "r2": r2,
+    }
+    if single:
+        result = {key: value[0] for key, value in result.items()}
+        result["moments"] = {
+            key: value if key == "n" else float(np.asarray(value).reshape(-1)[0])
+            for key, value in moments.items()
+        }
+    else:
+        result["moments"] = moments
+    return result
+
+
+def moving_average_forecast(values: np.ndarray, periods: int, window: int = 7, z: float = 1.96) -> Dict[str, Any]:
+    """Flat forecast at the last ``window``-point mean for one series or a (series, n) array"""
+    y = np.asarray(values, dtype=np.float64)
+    single = y.ndim == 1
+    y = np.atleast_2d(y)
+    if y.shape[1] < window:
+        raise ValueError(f"Need at least {window} points for a {window}-point moving average")
+    
+    # Window sums as differences of one running sum: O(n) rather than
+    # O(n * window). Offsetting by the first value keeps the running sum
+    # small, so the differences do not cancel away the window's digits.
+    offset = y[:, :1]
+    sums = np.cumsum(np.concatenate([np.zeros((len(y), 1)), y - offset], axis=1), axis=1)
+    means = (sums[:, window:] - sums[:, :-window]) / window + offset
+    errors = y[:, window - 1:] - means
+    last_ma = means[:, -1]
+    std_dev = y[:, -window:].std(axis=1, ddof=1) if window > 1 else np.zeros(len(y))
+    predictions = np.repeat(last_ma[:, None], periods, axis=1)
+    sse = np.einsum("ij,ij->i", errors, errors)
+    sae = np.abs(errors).sum(axis=1)
+    
+    result = {
+        "predictions": predictions,
+        "lower": predictions - z * std_dev[:, None],
+        "upper": predictions + z * std_dev[:, None],
+        "rmse": np.sqrt(sse / errors.shape[1]),
+        "mae": sae / errors.shape[1],
+        "sse": sse,
+        "sae": sae,
+        "first_error": errors[:, 0],
+        "errors": np.full(len(y), errors.shape[1]),
+    }
+    if single:
+        result = {key: value[0] for key, value in result.items()}
+    return result
 
 
 # Singleton instance
 forecast_service = ForecastService()
+
+
+def run_forecast(
+    data: Union[List[Dict[str, Any]], Dict[str, Any]],
+    target_column: str,
+    model_type: str = "arima",
+    forecast_periods: int = 30,
+    state: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Module-level entry point so forecasts can run in a worker process"""
+    return forecast_service.generate_forecast(
+        data=data,
+        target_column=target_column,
+        model_type=model_type,
+        forecast_periods=forecast_periods,
+        state=state
+    )
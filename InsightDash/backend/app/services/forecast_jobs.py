@@ -0,0 +1,431 @@
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.versioning import version_bump
+from ..models import models
+from .forecast import run_forecast
+from .meta_query import meta_query_service
+from .model_cache import model_cache
+from .schema_registry import schema_registry
+from .segments import segment_store
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+# (index, dataset_id, target_column, model_type, periods)
+BatchItem = Tuple[int, int, str, str, int]
+
+
+def load_forecast_data(
+    db: Session, dataset_id: int, target_column: str = "value"
+) -> Tuple[Union[List[Dict[str, Any]], Dict[str, Any]], int]:
+    """Load a dataset series in a shape ForecastService accepts"""
+    field = schema_registry.get_field(db, dataset_id, target_column)
+    if field is not None and field.backfill_status == "complete":
+        columns = schema_registry.read_field(db, field)
+        return columns, len(columns["timestamp"])
+    
+    if segment_store.enabled:
+        columns = segment_store.read(db, dataset_id)
+        return columns, len(columns["timestamp"])
+    
+    if target_column == "value":
+        rows = db.execute(
+            select(models.DataPoint.timestamp, models.DataPoint.value)
+            .where(models.DataPoint.dataset_id == dataset_id)
+            .order_by(models.DataPoint.timestamp)
+        ).all()
+        columns = {"timestamp": [r.timestamp for r in rows], "value": [r.value for r in rows]}
+        return columns, len(rows)
+    
+    data_points = db.query(models.DataPoint).filter(
+        models.DataPoint.dataset_id == dataset_id
+    ).order_by(models.DataPoint.timestamp).all()
+    
+    data_for_forecast = []
+    for point in data_points:
+        point_data = point.meta_data.copy() if point.meta_data else {}
+        point_data['timestamp'] = point.timestamp
+        point_data['value'] = point.value
+        data_for_forecast.append(point_data)
+    return data_for_forecast, len(data_for_forecast)
+
+
+def load_forecast_batch(
+    db: Session, series: Sequence[Tuple[int, str]]
+) -> Dict[Tuple[int, str], Tuple[Dict[str, Any], int]]:
+    """Load many (dataset_id, target_column) series with set-based queries"""
+    wanted = list(dict.fromkeys(series))
+    if not wanted:
+        return {}
+    dataset_ids = sorted({dataset_id for dataset_id, _ in wanted})
+    loaded: Dict[Tuple[int, str], Tuple[Dict[str, Any], int]] = {}
+
+    fields = db.query(models.DatasetField).filter(
+        models.DatasetField.dataset_id.in_(dataset_ids),
+        models.DatasetField.name.in_({target for _, target in wanted}),
+        models.DatasetField.backfill_status == "complete",
+    ).all()
+    fields = {f.id: f for f in fields if (f.dataset_id, f.name) in set(wanted)}
+    if fields:
+        rows = db.execute(
+            select(models.DataPointField.field_id, models.DataPointField.timestamp, models.DataPointField.value)
+            .where(models.DataPointField.field_id.in_(list(fields)))
+            .order_by(models.DataPointField.field_id, models.DataPointField.timestamp)
+        ).all()
+        grouped = {field_id: list(group) for field_id, group in itertools.groupby(rows, key=lambda r: r.field_id)}
+        for field_id, field in fields.items():
+            group = grouped.get(field_id, [])
+            timestamps = _to_ns([r.timestamp for r in group])
+            values = np.fromiter((r.value for r in group), dtype=np.float64, count=len(group))
+            # Points written since the last sync are only in meta_data
+            tail_timestamps, tail_values = schema_registry.read_unsynced(db, field)
+            if tail_timestamps:
+                timestamps = np.concatenate([timestamps, _to_ns(tail_timestamps)])
+                values = np.concatenate([values, tail_values])
+                order = np.argsort(timestamps, kind="stable")
+                timestamps, values = timestamps[order], values[order]
+            if field.dtype == "int":
+                values = np.round(values)
+            loaded[(field.dataset_id, field.name)] = ({"timestamp": timestamps, field.name: values}, len(values))
+
+    remaining = [key for key in wanted if key not in loaded]
+    if segment_store.enabled:
+        for dataset_id, target in remaining:
+            columns = segment_store.read(db, dataset_id, columns=[] if target == "value" else [target])
+            data = {"timestamp": columns["timestamp"]}
+            if target in columns:
+                data[target] = columns[target]
+            loaded[(dataset_id, target)] = (data, len(columns["timestamp"]))
+        return loaded
+    if not remaining:
+        return loaded
+
+    keys = sorted({target for _, target in remaining if target != "value"})
+    rows = db.execute(
+        select(
+            models.DataPoint.dataset_id,
+            models.DataPoint.timestamp,
+            models.DataPoint.value,
+            *meta_query_service.projection(keys),
+        )
+        .where(models.DataPoint.dataset_id.in_(sorted({dataset_id for dataset_id, _ in remaining})))
+        .order_by(models.DataPoint.dataset_id, models.DataPoint.timestamp)
+    ).all()
+    grouped = {dataset_id: list(group) for dataset_id, group in itertools.groupby(rows, key=lambda r: r.dataset_id)}
+    for dataset_id, target in remaining:
+        group = grouped.get(dataset_id, [])
+        data = {"timestamp": _to_ns([r.timestamp for r in group])}
+        if target == "value":
+            data["value"] = np.fromiter((r.value for r in group), dtype=np.float64, count=len(group))
+        else:
+            column = f"meta_{keys.index(target)}"
+            values = pd.to_numeric(pd.Series([getattr(r, column) for r in group], dtype=object), errors="coerce")
+            if values.notna().any():
+                data[target] = values.to_numpy(dtype=np.float64)
+        loaded[(dataset_id, target)] = (data, len(group))
+    return loaded
+
+
+def _to_ns(timestamps: List[datetime]) -> np.ndarray:
+    return pd.to_datetime(timestamps, utc=True).tz_localize(None).asi8.astype(np.int64)
+
+
+class ForecastJobQueue:
+    """Runs model fits off the event loop and tracks them as persisted jobs"""
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        if self._executor is None and settings.forecast_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.forecast_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(
+        self, dataset_id: int, data: Any, target_column: str, model_type: str, forecast_periods: int
+    ) -> Dict[str, Any]:
+        """Forecast in the pool, starting from and refreshing the cached model state"""
+        loop = asyncio.get_running_loop()
+        state = None
+        if settings.forecast_model_cache_enabled:
+            state = await asyncio.to_thread(
+                self._with_session, model_cache.get, dataset_id, target_column, model_type
+            )
+        result = await loop.run_in_executor(
+            self.executor, run_forecast, data, target_column, model_type, forecast_periods, state
+        )
+        model_state = result.pop("model_state", None)
+        if settings.forecast_model_cache_enabled and model_state is not None:
+            await asyncio.to_thread(
+                self._with_session, model_cache.put, dataset_id, target_column, result["model_type"], model_state
+            )
+        return result
+
+    async def call(self, func: Callable, *args: Any) -> Any:
+        """Run a picklable module-level ``func`` in the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def submit(
+        self,
+        db: Session,
+        dataset_id: int,
+        owner_id: int,
+        target_column: str,
+        model_type: str,
+        forecast_periods: int,
+    ) -> models.ForecastJob:
+        """Persist a queued job; ``schedule`` it once the caller has committed"""
+        job = models.ForecastJob(
+            dataset_id=dataset_id,
+            owner_id=owner_id,
+            target_column=target_column,
+            model_type=model_type,
+            forecast_periods=forecast_periods,
+            status="queued",
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        # Loaded while attached so the job still serializes once the session closes
+        job.forecast
+        return job
+
+    def schedule(
+        self, job_id: int, on_complete: Optional[Callable[[int, Dict[str, Any]], Awaitable[Any]]] = None
+    ) -> None:
+        task = asyncio.create_task(self._execute(job_id, on_complete))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get(self, db: Session, job_id: int) -> Optional[models.ForecastJob]:
+        return db.query(models.ForecastJob).filter(models.ForecastJob.id == job_id).first()
+
+    def recover(self) -> int:
+        """Fail jobs left queued or running by a previous process"""
+        db = SessionLocal()
+        try:
+            count = db.query(models.ForecastJob).filter(
+                models.ForecastJob.status.in_(("queued", "running"))
+            ).update(
+                {"status": "failed", "error": "Interrupted by server restart", "finished_at": datetime.utcnow()},
+                synchronize_session=False,
+            )
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _execute(self, job_id: int, on_complete) -> None:
+        try:
+            job = await asyncio.to_thread(self._update, job_id, status="running", started_at=datetime.utcnow())
+            data, point_count = await asyncio.to_thread(
+                self._with_session, load_forecast_data, job.dataset_id, job.target_column
+            )
+            if not point_count:
+                raise ValueError("No data points found for dataset")
+
+            result = await self.run(job.dataset_id, data, job.target_column, job.model_type, job.forecast_periods)
+            forecast = await asyncio.to_thread(self._store, job_id, result)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(
+                self._update, job_id, status="failed", error="Cancelled", finished_at=datetime.utcnow()
+            )
+            raise
+        except Exception as e:
+            logger.warning("Forecast job %s failed: %s", job_id, e)
+            await asyncio.to_thread(
+                self._update, job_id, status="failed", error=str(e), finished_at=datetime.utcnow()
+            )
+            return
+
+        if on_complete is None:
+            return
+        try:
+            await on_complete(forecast["dataset_id"], forecast)
+        except Exception:
+            logger.exception("Broadcasting forecast job %s failed", job_id)
+
+    async def stream_batch(
+        self,
+        items: Sequence[BatchItem],
+        failures: Sequence[Dict[str, Any]] = (),
+    ) -> AsyncIterator[bytes]:
+        """Fit a batch in the pool and yield one NDJSON line per item as it finishes"""
+        for failure in failures:
+            yield _ndjson(failure)
+
+        chunks = _batch_chunks(items, settings.forecast_batch_load_series)
+        slots = asyncio.Semaphore(settings.forecast_batch_concurrency)
+        fits: Set[asyncio.Task] = set()
+        loader: Optional[asyncio.Task] = None
+        try:
+            while chunks or loader is not None or fits:
+                if loader is None and chunks and len(fits) <= settings.forecast_batch_concurrency:
+                    loader = asyncio.create_task(self._load_chunk(chunks.pop(0)))
+                waiting = fits | {loader} if loader is not None else fits
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is loader:
+                        loader = None
+                        chunk, series, error = task.result()
+                        if error is not None:
+                            for item in chunk:
+                                yield _ndjson({**_batch_line(item), "status": "failed", "error": error})
+                            continue
+                        fits.update(asyncio.create_task(self._batch_item(item, series, slots)) for item in chunk)
+                    else:
+                        fits.discard(task)
+                        yield _ndjson(task.result())
+        finally:
+            for task in fits | ({loader} if loader is not None else set()):
+                task.cancel()
+
+    async def _load_chunk(
+        self, chunk: List[BatchItem]
+    ) -> Tuple[List[BatchItem], Dict[Tuple[int, str], Tuple[Dict[str, Any], int]], Optional[str]]:
+        try:
+            series = await asyncio.to_thread(
+                self._with_session, load_forecast_batch, [(item[1], item[2]) for item in chunk]
+            )
+        except Exception as e:
+            logger.warning("Loading forecast batch series failed: %s", e)
+            return chunk, {}, f"Loading data failed: {e}"
+        return chunk, series, None
+
+    async def _batch_item(
+        self,
+        item: BatchItem,
+        series: Dict[Tuple[int, str], Tuple[Dict[str, Any], int]],
+        slots: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        _, dataset_id, target_column, model_type, periods = item
+        line = _batch_line(item)
+        try:
+            data, point_count = series[(dataset_id, target_column)]
+            if not point_count:
+                raise ValueError("No data points found for dataset")
+            async with slots:
+                result = await self.run(dataset_id, data, target_column, model_type, periods)
+            forecast = await asyncio.to_thread(self._with_session, _save_forecast, dataset_id, target_column, result)
+        except Exception as e:
+            return {**line, "status": "failed", "error": str(e)}
+        return {**line, "status": "completed", "forecast": forecast}
+
+    def _with_session(self, func: Callable, *args: Any) -> Any:
+        db = SessionLocal()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    def _update(self, job_id: int, **values: Any) -> models.ForecastJob:
+        db = SessionLocal()
+        try:
+            job = self.get(db, job_id)
+            for key, value in values.items():
+                setattr(job, key, value)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _store(self, job_id: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Save the forecast and complete the job in one transaction"""
+        db = SessionLocal()
+        try:
+            job = self.get(db, job_id)
+            forecast = _save_forecast(db, job.dataset_id, job.target_column, result, commit=False)
+            job.forecast_id = forecast["id"]
+            job.status = "completed"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return {**forecast, "job_id": job_id}
+        finally:
+            db.close()
+
+
+def _save_forecast(
+    db: Session, dataset_id: int, target_column: str, result: Dict[str, Any], commit: bool = True
+) -> Dict[str, Any]:
+    """Store a forecast result and bump the dataset version"""
+    forecast = models.Forecast(
+        dataset_id=dataset_id,
+        model_type=result["model_type"],
+        target_column=target_column,
+        forecast_data=result["forecast_data"],
+        confidence_interval=result.get("confidence_interval"),
+        accuracy_metrics=result.get("accuracy_metrics"),
+    )
+    db.add(forecast)
+    db.flush()
+    db.execute(version_bump(dataset_id))
+    saved = {
+        "id": forecast.id,
+        "dataset_id": forecast.dataset_id,
+        "model_type": forecast.model_type,
+        "target_column": forecast.target_column,
+        "forecast_data": forecast.forecast_data,
+        "confidence_interval": forecast.confidence_interval,
+        "accuracy_metrics": forecast.accuracy_metrics,
+    }
+    if commit:
+        db.commit()
+    return saved
+
+
+def _batch_chunks(items: Sequence[BatchItem], series_per_chunk: int) -> List[List[BatchItem]]:
+    """Group items into chunks of at most ``series_per_chunk`` distinct series"""
+    by_series: Dict[Tuple[int, str], List[BatchItem]] = {}
+    for item in items:
+        by_series.setdefault((item[1], item[2]), []).append(item)
+    groups = list(by_series.values())
+    size = max(1, series_per_chunk)
+    return [
+        [item for group in groups[start:start + size] for item in group]
+        for start in range(0, len(groups), size)
+    ]
+
+
+def _batch_line(item: BatchItem) -> Dict[str, Any]:
+    index, dataset_id, target_column, _, _ = item
+    return {"index": index, "dataset_id": dataset_id, "target_column": target_column}
+
+
+def _ndjson(line: Dict[str, Any]) -> bytes:
+    return (json.dumps(line, default=str) + "\n").encode()
+
+
+# Singleton instance
+forecast_jobs = ForecastJobQueue()
@@ -0,0 +1,340 @@
+import asyncio
+import io
+import itertools
+import json
+import logging
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.versioning import version_bump
+from ..models import models
+from .rollups import rollup_service
+from .schema_registry import schema_registry
+from .segments import segment_store
+from .summaries import summary_service
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet support is optional
+    pa = pq = None
+
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "ndjson", "parquet", "arrow")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+
+class _StreamReader(io.RawIOBase):
+    """Blocking file object over an async byte stream, for use from a worker thread"""
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = b""
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._done:
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                self._done = True
+            else:
+                self._buffer = chunk
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+
+class IngestService:
+    """Service for bulk loading data points into a dataset"""
+
+    def __init__(self):
+        self._dirty: Set[int] = set()
+        self._maintainer: Optional[asyncio.Task] = None
+
+    def detect_format(self, content_type: Optional[str], filename: Optional[str] = None) -> str:
+        """Guess the import format from a filename or content type"""
+        name = (filename or "").lower()
+        ctype = (content_type or "").lower()
+        if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+            return "ndjson"
+        if name.endswith(".parquet") or "parquet" in ctype:
+            return "parquet"
+        if name.endswith((".arrow", ".arrows", ".feather")) or "arrow" in ctype:
+            return "arrow"
+        return "csv"
+
+    async def import_stream(
+        self,
+        dataset_id: int,
+        chunks: AsyncIterator[bytes],
+        data_format: str = "csv",
+        timestamp_column: str = "timestamp",
+        value_column: str = "value",
+    ) -> Dict[str, Any]:
+        """Parse a CSV/NDJSON byte stream and insert it in batches"""
+        if data_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported import format '{data_format}'")
+        if data_format in COLUMNAR_FORMATS:
+            return await self.import_columnar(dataset_id, chunks, data_format, timestamp_column, value_column)
+
+        source = io.BufferedReader(_StreamReader(chunks, asyncio.get_running_loop()), buffer_size=1024 * 1024)
+        frames = self._text_frames(source, data_format, timestamp_column, value_column)
+        return await self._write_frames(dataset_id, lambda: next(frames, None))
+
+    async def import_columnar(
+        self,
+        dataset_id: int,
+        chunks: AsyncIterator[bytes],
+        data_format: str = "parquet",
+        timestamp_column: str = "timestamp",
+        value_column: str = "value",
+    ) -> Dict[str, Any]:
+        """Load a Parquet file or Arrow IPC stream/file record batch by record batch"""
+        if pa is None:
+            raise ValueError(f"{data_format} import requires pyarrow")
+
+        with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as spool:
+            async for chunk in chunks:
+                spool.write(chunk)
+            spool.seek(0)
+
+            try:
+                batches = await asyncio.to_thread(self._open_batches, spool, data_format)
+                return await self._write_frames(
+                    dataset_id, lambda: self._next_frame(batches, timestamp_column, value_column)
+                )
+            except pa.ArrowException as e:
+                raise ValueError(f"Invalid {data_format} data: {e}")
+
+    async def _write_frames(
+        self, dataset_id: int, next_frame: Callable[[], Optional[pd.DataFrame]]
+    ) -> Dict[str, Any]:
+        """Write the frames returned by ``next_frame`` until it returns None"""
+        stats = {"rows_imported": 0, "rows_rejected": 0, "batches": 0, "transactions": 0}
+        uncommitted = 0
+        db = SessionLocal()
+        try:
+            while True:
+                frame = await asyncio.to_thread(next_frame)
+                if frame is None:
+                    break
+                stats["rows_rejected"] += frame.attrs.get("rejected", 0)
+                written = await asyncio.to_thread(self.write_frame, db, dataset_id, frame)
+                stats["rows_imported"] += written
+                stats["batches"] += 1
+                uncommitted += written
+                if uncommitted >= settings.bulk_import_commit_rows:
+                    await asyncio.to_thread(db.commit)
+                    stats["transactions"] += 1
+                    uncommitted = 0
+
+            if uncommitted:
+                await asyncio.to_thread(db.commit)
+                stats["transactions"] += 1
+        except Exception:
+            await asyncio.to_thread(db.rollback)
+            raise
+        finally:
+            db.close()
+
+        return stats
+
+    def _open_batches(self, source, data_format: str):
+        """Iterator of record batches from a seekable Parquet or Arrow source"""
+        chunk_rows = settings.bulk_import_chunk_rows
+        if data_format == "parquet":
+            return pq.ParquetFile(source).iter_batches(batch_size=chunk_rows)
+
+        magic = source.read(6)
+        source.seek(0)
+        if magic == b"ARROW1":
+            reader = pa.ipc.open_file(source)
+            return (reader.get_batch(i) for i in range(reader.num_record_batches))
+        return iter(pa.ipc.open_stream(source))
+
+    def _next_frame(self, batches, timestamp_column: str, value_column: str) -> Optional[pd.DataFrame]:
+        batch = next(batches, None)
+        if batch is None:
+            return None
+        return self.normalize_frame(batch.to_pandas(), timestamp_column, value_column)
+
+    def _text_frames(
+        self,
+        source,
+        data_format: str,
+        timestamp_column: str = "timestamp",
+        value_column: str = "value",
+    ) -> Iterator[pd.DataFrame]:
+        """Normalized points frames of up to ``bulk_import_chunk_rows`` rows from a CSV/NDJSON file"""
+        chunk_rows = settings.bulk_import_chunk_rows
+        if data_format == "csv":
+            try:
+                reader = pd.read_csv(source, chunksize=chunk_rows)
+            except pd.errors.EmptyDataError:
+                return
+            with reader:
+                for raw in reader:
+                    if not raw.empty:
+                        yield self.normalize_frame(raw, timestamp_column, value_column)
+            return
+
+        lines = iter(source)
+        while True:
+            batch = list(itertools.islice(lines, chunk_rows))
+            if not batch:
+                return
+            records = [json.loads(line) for line in batch if line.strip()]
+            if records:
+                yield self.normalize_frame(pd.DataFrame(records), timestamp_column, value_column)
+
+    def normalize_frame(
+        self,
+        raw: pd.DataFrame,
+        timestamp_column: str = "timestamp",
+        value_column: str = "value",
+    ) -> pd.DataFrame:
+        """Map an arbitrary tabular chunk onto timestamp/value/meta_data columns"""
+        if value_column not in raw.columns:
+            raise ValueError(f"Value column '{value_column}' not found in import data")
+
+        values = pd.to_numeric(raw[value_column], errors="coerce")
+        if timestamp_column in raw.columns:
+            timestamps = pd.to_datetime(raw[timestamp_column], errors="coerce", utc=True, format="mixed")
+            timestamps = timestamps.dt.tz_localize(None)
+        else:
+            timestamps = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+        timestamps = timestamps.fillna(pd.Timestamp(datetime.now()))
+
+        meta_columns = [c for c in raw.columns if c not in (timestamp_column, value_column)]
+        meta_data = self._build_meta(raw, meta_columns)
+
+        keep = values.notna().to_numpy()
+        frame = pd.DataFrame({
+            "timestamp": timestamps.to_numpy()[keep],
+            "value": values.to_numpy(dtype=np.float64)[keep],
+            "meta_data": [m for m, k in zip(meta_data, keep) if k],
+        })
+        frame.attrs["rejected"] = int((~keep).sum())
+        return frame
+
+    def _build_meta(self, raw: pd.DataFrame, meta_columns: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Collect the non-core columns of each row into a meta_data dict"""
+        if not meta_columns:
+            return [None] * len(raw)
+
+        nested = raw["meta_data"].tolist() if "meta_data" in meta_columns else None
+        flat_columns = [c for c in meta_columns if c != "meta_data"]
+        records = raw[flat_columns].astype(object).where(raw[flat_columns].notna(), None).to_dict("records") \
+            if flat_columns else [{} for _ in range(len(raw))]
+
+        meta_data = []
+        for i, record in enumerate(records):
+            record = {k: v for k, v in record.items() if v is not None}
+            if nested is not None:
+                extra = nested[i]
+                if isinstance(extra, str) and extra.startswith("{"):
+                    # CSV exports carry meta_data as a JSON object column
+                    extra = json.loads(extra)
+                if isinstance(extra, dict):
+                    record = {**extra, **record}
+            meta_data.append(record or None)
+        return meta_data
+
+    def write_frame(self, db: Session, dataset_id: int, frame: pd.DataFrame) -> int:
+        """Insert a normalized points frame with a single executemany INSERT"""
+        if frame.empty:
+            return 0
+
+        rows = [
+            {"dataset_id": dataset_id, "timestamp": ts, "value": value, "meta_data": meta}
+            for ts, value, meta in zip(
+                pd.DatetimeIndex(frame["timestamp"]).to_pydatetime(),
+                frame["value"].tolist(),
+                frame["meta_data"].tolist(),
+            )
+        ]
+        db.execute(insert(models.DataPoint.__table__), rows)
+        rollup_service.apply(db, dataset_id, frame["timestamp"].to_numpy(), frame["value"].to_numpy())
+        db.execute(version_bump(dataset_id))
+        return len(rows)
+
+    def write_points(self, db: Session, points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert individual points (possibly for several datasets) in one statement; the caller commits"""
+        if not points:
+            return []
+
+        table = models.DataPoint.__table__
+        stored = db.execute(
+            insert(table).returning(
+                table.c.id, table.c.dataset_id, table.c.timestamp, table.c.value, table.c.meta_data,
+                sort_by_parameter_order=True,
+            ),
+            points,
+        ).all()
+
+        by_dataset: Dict[int, List[Any]] = {}
+        for row in stored:
+            by_dataset.setdefault(row.dataset_id, []).append(row)
+        for dataset_id, rows in by_dataset.items():
+            # Statistics and sketches are folded in later by ``after_write``
+            rollup_service.apply(db, dataset_id, [r.timestamp for r in rows], [r.value for r in rows])
+            db.execute(version_bump(dataset_id))
+
+        return [dict(row._mapping) for row in stored]
+
+    def after_write(self, db: Session, dataset_id: int) -> None:
+        """Post-commit maintenance once new points of a dataset are durable"""
+        summary_service.fold(db, dataset_id)
+        schema_registry.sync(db, dataset_id)
+        while segment_store.maybe_seal(db, dataset_id):
+            pass
+
+    def schedule_maintenance(self, dataset_ids: Iterable[int]) -> None:
+        """Queue ``after_write`` for datasets in a background task; call on the event loop"""
+        loop = asyncio.get_running_loop()
+        self._dirty.update(dataset_ids)
+        if self._maintainer is None or self._maintainer.done() or self._maintainer.get_loop() is not loop:
+            self._maintainer = loop.create_task(self._maintain())
+
+    async def _maintain(self) -> None:
+        while self._dirty:
+            dataset_ids, self._dirty = self._dirty, set()
+            await asyncio.to_thread(self.maintain, dataset_ids)
+
+    def maintain(self, dataset_ids: Iterable[int]) -> None:
+        """Best-effort ``after_write`` with its own session"""
+        for dataset_id in dataset_ids:
+            db = SessionLocal()
+            try:
+                self.after_write(db, dataset_id)
+            except Exception:
+                db.rollback()
+                logger.exception("Post-write maintenance failed for dataset %s", dataset_id)
+            finally:
+                db.close()
+
+
+# Singleton instance
+ingest_service = IngestService()
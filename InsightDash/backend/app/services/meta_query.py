@@ -0,0 +1,207 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import Float, Index, case, cast, func, literal_column
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from ..models import models
+
+
+INDEX_KINDS = ("text", "number")
+
+# Keys are inlined into JSON paths and index names, so only plain identifiers
+# are accepted.
+_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,47}$")
+_MAX_INDEX_NAME = 63
+_PREDICATE_PATTERN = re.compile(r"^\s*([^<>=!\s]+)\s*(>=|<=|!=|=|>|<)\s*(.*?)\s*$")
+_OPERATORS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+@dataclass(frozen=True)
+class Predicate:
+    key: str
+    op: str
+    value: Union[float, str]
+
+
+class MetaQueryService:
+    """Projection and filtering of meta_data keys inside the database"""
+
+    def validate_key(self, key: str) -> str:
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid meta_data key '{key}'")
+        return key
+
+    def parse_fields(self, fields: str) -> List[str]:
+        """meta_data keys from a comma-separated ``fields`` parameter"""
+        keys = [key.strip() for key in fields.split(",") if key.strip()]
+        return list(dict.fromkeys(self.validate_key(key) for key in keys))
+
+    def parse_predicates(self, expressions: Sequence[str]) -> List[Predicate]:
+        """Parse ``key<op>value`` filters; values that look numeric compare as numbers"""
+        predicates = []
+        for expression in expressions:
+            match = _PREDICATE_PATTERN.match(expression)
+            if not match:
+                raise ValueError(f"Invalid filter '{expression}'")
+            key, op, raw = match.groups()
+            if key == "timestamp":
+                raise ValueError("Filter timestamps with start/end")
+            self.validate_key(key)
+
+            value: Union[float, str]
+            if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "\"'":
+                value = raw[1:-1]
+            else:
+                try:
+                    value = float(raw)
+                except ValueError:
+                    value = raw
+            if isinstance(value, str) and (key == "value" or op not in ("=", "!=")):
+                raise ValueError(f"Filter '{expression}' needs a numeric value")
+            predicates.append(Predicate(key, op, value))
+        return predicates
+
+    def expression(self, dialect: str, key: str, kind: str = "text"):
+        """SQL expression extracting a meta_data key, shared by filters and indexes"""
+        if dialect == "sqlite":
+            path = literal_column(f"'$.\"{key}\"'")
+            extracted = func.json_extract(models.DataPoint.meta_data, path)
+            if kind == "text":
+                return extracted
+            # json_extract passes strings through, which would compare as text. The
+            # type names are literals so queries match the index expression.
+            is_number = func.json_type(models.DataPoint.meta_data, path).in_(
+                [literal_column("'integer'"), literal_column("'real'")]
+            )
+            return case((is_number, extracted), else_=None)
+        if dialect == "postgresql":
+            path = literal_column(f"'{key}'")
+            extracted = models.DataPoint.meta_data.op("->>")(path)
+            if kind == "text":
+                return extracted
+            # A bare cast would fail the whole query (and index build) on the
+            # first non-numeric value
+            is_number = func.json_typeof(models.DataPoint.meta_data.op("->")(path)) == literal_column("'number'")
+            return case((is_number, cast(extracted, Float)), else_=None)
+        raise NotImplementedError(f"meta_data filters are not supported on {dialect}")
+
+    def where_clauses(self, dialect: str, predicates: Sequence[Predicate]) -> List[Any]:
+        clauses = []
+        for predicate in predicates:
+            if predicate.key == "value":
+                column = models.DataPoint.value
+            else:
+                kind = "text" if isinstance(predicate.value, str) else "number"
+                column = self.expression(dialect, predicate.key, kind)
+            clauses.append(_OPERATORS[predicate.op](column, predicate.value))
+        return clauses
+
+    def projection(self, keys: Sequence[str]) -> List[Any]:
+        """Labelled columns selecting only ``keys`` out of meta_data"""
+        return [models.DataPoint.meta_data[key].label(f"meta_{i}") for i, key in enumerate(keys)]
+
+    def projected_meta(self, row: Any, keys: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Rebuild a meta_data dict from a row selected with ``projection``"""
+        meta = {key: getattr(row, f"meta_{i}") for i, key in enumerate(keys)}
+        meta = {key: value for key, value in meta.items() if value is not None}
+        return meta or None
+
+    def list_indexes(self, db: Session, dataset_id: int) -> List[models.DatasetIndex]:
+        return db.query(models.DatasetIndex).filter(
+            models.DatasetIndex.dataset_id == dataset_id
+        ).order_by(models.DatasetIndex.id).all()
+
+    def create_index(self, db: Session, dataset_id: int, key: str, kind: str = "text") -> models.DatasetIndex:
+        """Register an expression index on a meta_data key for a dataset"""
+        self.validate_key(key)
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unsupported index kind '{kind}'")
+
+        existing = db.query(models.DatasetIndex).filter(
+            models.DatasetIndex.dataset_id == dataset_id,
+            models.DatasetIndex.key == key,
+            models.DatasetIndex.kind == kind,
+        ).first()
+        if existing is not None:
+            return existing
+
+        engine = db.get_bind()
+        dialect = engine.dialect.name
+        index = self.index_for(dialect, dataset_id, key, kind)
+        if dialect == "postgresql":
+            self._create_concurrently(engine, index)
+        else:
+            db.execute(CreateIndex(index, if_not_exists=True))
+            # Without statistics the planner keeps preferring the timestamp
+            # index; analyzing just the new index avoids a full-table pass
+            db.connection().exec_driver_sql(f"ANALYZE {engine.dialect.identifier_preparer.quote(index.name)}")
+        entry = models.DatasetIndex(dataset_id=dataset_id, key=key, kind=kind, index_name=index.name)
+        db.add(entry)
+        db.commit()
+        db.refresh(entry)
+        return entry
+
+    def drop_index(self, db: Session, entry: models.DatasetIndex) -> None:
+        index_name = entry.index_name
+        db.delete(entry)
+        db.flush()
+        self._drop_unused(db, [index_name])
+        db.commit()
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        entries = self.list_indexes(db, dataset_id)
+        if entries:
+            names = {entry.index_name for entry in entries}
+            db.query(models.DatasetIndex).filter(
+                models.DatasetIndex.dataset_id == dataset_id
+            ).delete(synchronize_session=False)
+            self._drop_unused(db, names)
+
+    def index_for(self, dialect: str, dataset_id: int, key: str, kind: str) -> Index:
+        """Partial expression index covering one dataset's points"""
+        suffix = "" if kind == "text" else "_num"
+        name = f"ix_data_points_meta_{dataset_id}_{key}{suffix}"
+        if len(name) > _MAX_INDEX_NAME:
+            # PostgreSQL truncates longer names, which could make two indexes collide
+            name = f"{name[:_MAX_INDEX_NAME - 9]}_{hashlib.sha1(name.encode()).hexdigest()[:8]}"
+        in_dataset = models.DataPoint.dataset_id == dataset_id
+        return Index(
+            name,
+            models.DataPoint.dataset_id,
+            self.expression(dialect, key, kind),
+            postgresql_where=in_dataset,
+            sqlite_where=in_dataset,
+            postgresql_concurrently=True,
+        )
+
+    def _create_concurrently(self, engine, index: Index) -> None:
+        """CREATE INDEX CONCURRENTLY, which cannot run inside a transaction"""
+        quoted = engine.dialect.identifier_preparer.quote(index.name)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            try:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+            except Exception:
+                conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {quoted}")
+                raise
+
+    def _drop_unused(self, db: Session, names) -> None:
+        preparer = db.get_bind().dialect.identifier_preparer
+        for name in names:
+            in_use = db.query(models.DatasetIndex.id).filter(models.DatasetIndex.index_name == name).first()
+            if in_use is None:
+                db.connection().exec_driver_sql(f"DROP INDEX IF EXISTS {preparer.quote(name)}")
+
+
+# Singleton instance
+meta_query_service = MetaQueryService()
@@ -0,0 +1,42 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.database import dialect_insert
+from ..models import models
+
+
+class ModelCacheService:
+    """Fitted forecast model state keyed by dataset, target column and model"""
+
+    def get(self, db: Session, dataset_id: int, target_column: str, model_type: str) -> Optional[Dict[str, Any]]:
+        entry = db.query(models.FittedModel).filter(
+            models.FittedModel.dataset_id == dataset_id,
+            models.FittedModel.target_column == target_column,
+            models.FittedModel.model_type == model_type,
+        ).first()
+        return entry.state if entry is not None else None
+
+    def put(self, db: Session, dataset_id: int, target_column: str, model_type: str, state: Dict[str, Any]) -> None:
+        table = models.FittedModel.__table__
+        stmt = dialect_insert(db, table).values(
+            dataset_id=dataset_id,
+            target_column=target_column,
+            model_type=model_type,
+            state=state,
+            point_count=state.get("n", 0),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dataset_id", "target_column", "model_type"],
+            set_={"state": stmt.excluded.state, "point_count": stmt.excluded.point_count, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+        db.commit()
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        db.query(models.FittedModel).filter(models.FittedModel.dataset_id == dataset_id).delete()
+
+
+# Singleton instance
+model_cache = ModelCacheService()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.versioning import version_bump
+from ..models import models
+from .model_cache import model_cache
+from .rollups import ROLLUP_BUCKETS, rollup_service
+from .segments import segment_store
+from .sketches import sketch_service
+from .statistics import statistics_service
+from .summaries import summary_service
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """Per-dataset retention rules and the compactor that enforces them"""
+
+    def get_policy(self, db: Session, dataset_id: int) -> Optional[models.RetentionPolicy]:
+        return db.query(models.RetentionPolicy).filter(
+            models.RetentionPolicy.dataset_id == dataset_id
+        ).first()
+
+    def set_policy(
+        self,
+        db: Session,
+        dataset_id: int,
+        raw_retention_days: int,
+        rollup_bucket: str = "hour",
+        rollup_retention_days: Optional[int] = None,
+    ) -> models.RetentionPolicy:
+        """Create or replace the retention policy of a dataset"""
+        if raw_retention_days < 1:
+            raise ValueError("raw_retention_days must be at least 1")
+        if rollup_bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unsupported rollup bucket '{rollup_bucket}'")
+        if rollup_retention_days is not None and rollup_retention_days < raw_retention_days:
+            raise ValueError("rollup_retention_days must not be shorter than raw_retention_days")
+
+        policy = self.get_policy(db, dataset_id)
+        if policy is None:
+            policy = models.RetentionPolicy(dataset_id=dataset_id, points_compacted=0)
+            db.add(policy)
+        policy.raw_retention_days = raw_retention_days
+        policy.rollup_bucket = rollup_bucket
+        policy.rollup_retention_days = rollup_retention_days
+        db.commit()
+        db.refresh(policy)
+        return policy
+
+    def delete_policy(self, db: Session, policy: models.RetentionPolicy) -> None:
+        db.delete(policy)
+        db.commit()
+
+    def compact(self, db: Session, policy: models.RetentionPolicy, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Apply one dataset's policy: expire raw points, fine rollups and segments"""
+        now = now or datetime.utcnow()
+        dataset_id = policy.dataset_id
+        cutoff = now - timedelta(days=policy.raw_retention_days)
+        raw_cutoff = datetime(cutoff.year, cutoff.month, cutoff.day)
+
+        if not rollup_service.is_complete(db, dataset_id):
+            # Deleted points must live on in the rollups
+            rollup_service.rebuild(db, dataset_id)
+        # Likewise in the sketches, and statistics can only take out what they hold
+        summary_service.fold(db, dataset_id)
+
+        points_deleted = self._delete_points(db, dataset_id, raw_cutoff)
+        if points_deleted:
+            # Fitted models no longer start at the oldest kept point
+            model_cache.drop_dataset(db, dataset_id)
+
+        # Rollups finer than the kept granularity are only useful while the
+        # raw window still covers them.
+        kept_seconds = ROLLUP_BUCKETS[policy.rollup_bucket]
+        rollups_deleted = 0
+        for bucket_seconds in ROLLUP_BUCKETS.values():
+            if bucket_seconds < kept_seconds:
+                rollups_deleted += self._delete_rollups(
+                    db, dataset_id, bucket_seconds, raw_cutoff - timedelta(seconds=bucket_seconds)
+                )
+        sketches_deleted = 0
+        if policy.rollup_retention_days is not None:
+            rollup_cutoff = now - timedelta(days=policy.rollup_retention_days)
+            for bucket_seconds in ROLLUP_BUCKETS.values():
+                rollups_deleted += self._delete_rollups(
+                    db, dataset_id, bucket_seconds, rollup_cutoff - timedelta(seconds=bucket_seconds)
+                )
+            # Day sketches are summaries like the rollups and share their window
+            sketches_deleted = sketch_service.expire(db, dataset_id, rollup_cutoff)
+
+        segments_deleted = segment_store.expire(db, dataset_id, raw_cutoff)
+
+        policy.last_compacted_at = now
+        policy.points_compacted = (policy.points_compacted or 0) + points_deleted
+        db.commit()
+
+        return {
+            "dataset_id": dataset_id,
+            "raw_cutoff": raw_cutoff,
+            "points_deleted": points_deleted,
+            "rollups_deleted": rollups_deleted,
+            "segments_deleted": segments_deleted,
+            "sketches_deleted": sketches_deleted,
+        }
+
+    def compact_dataset(self, db: Session, dataset_id: int) -> Optional[Dict[str, Any]]:
+        """Apply a dataset's policy now; None when it has no policy"""
+        policy = self.get_policy(db, dataset_id)
+        return self.compact(db, policy) if policy is not None else None
+
+    def compact_all(self, db: Session) -> List[Dict[str, Any]]:
+        """Run compaction for every dataset that has a retention policy"""
+        results = []
+        for policy in db.query(models.RetentionPolicy).order_by(models.RetentionPolicy.dataset_id).all():
+            try:
+                results.append(self.compact(db, policy))
+            except Exception:
+                db.rollback()
+                logger.exception("Retention compaction failed for dataset %s", policy.dataset_id)
+        return results
+
+    def _delete_points(self, db: Session, dataset_id: int, cutoff: datetime) -> int:
+        """Delete raw points older than ``cutoff`` in ``retention_delete_batch_rows`` batches"""
+        batch_rows = settings.retention_delete_batch_rows
+        deleted = 0
+        extrema_valid = True
+        while True:
+            # Locked first, so no fold runs between the delete and the subtraction
+            through = statistics_service.folded_through(db, dataset_id, for_update=True)
+            # Served by the (dataset_id, timestamp, id) index
+            rows = db.execute(
+                select(models.DataPoint.id, models.DataPoint.value, models.DataPoint.meta_data)
+                .where(models.DataPoint.dataset_id == dataset_id, models.DataPoint.timestamp < cutoff)
+                .limit(batch_rows)
+            ).all()
+            if not rows:
+                db.commit()
+                break
+
+            ids = [r.id for r in rows]
+            db.execute(delete(models.DataPointField).where(models.DataPointField.data_point_id.in_(ids)))
+            db.execute(delete(models.DataPoint).where(models.DataPoint.id.in_(ids)))
+            folded = [r for r in rows if r.id <= through]
+            if not statistics_service.remove(db, dataset_id, [r.value for r in folded], [r.meta_data for r in folded]):
+                extrema_valid = False
+            db.execute(version_bump(dataset_id))
+            db.commit()
+            deleted += len(ids)
+
+        if not extrema_valid:
+            statistics_service.rebuild(db, dataset_id)
+        return deleted
+
+    def _delete_rollups(self, db: Session, dataset_id: int, bucket_seconds: int, before: datetime) -> int:
+        result = db.execute(
+            delete(models.DataRollup).where(
+                models.DataRollup.dataset_id == dataset_id,
+                models.DataRollup.bucket_seconds == bucket_seconds,
+                models.DataRollup.bucket_start <= before,
+            )
+        )
+        if result.rowcount:
+            db.execute(version_bump(dataset_id))
+        db.commit()
+        return result.rowcount or 0
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        db.query(models.RetentionPolicy).filter(models.RetentionPolicy.dataset_id == dataset_id).delete()
+
+    async def run(self) -> None:
+        """Background compactor loop, started with the application"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self._compact_all_once)
+            except Exception:
+                logger.exception("Retention compaction run failed")
+            await asyncio.sleep(settings.retention_compact_interval_seconds)
+
+    def _compact_all_once(self) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            return self.compact_all(db)
+        finally:
+            db.close()
+
+
+# Singleton instance
+retention_service = RetentionService()
@@ -0,0 +1,158 @@
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from ..core.database import dialect_insert
+from ..core.timeutils import naive_utc
+from ..core.versioning import version_bump
+from ..models import models
+
+
+# Bucket sizes maintained for every dataset
+ROLLUP_BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+class RollupService:
+    """Incrementally maintained per-bucket aggregates of dataset values"""
+
+    def apply(self, db: Session, dataset_id: int, timestamps: Any, values: Any) -> None:
+        """Fold a batch of (timestamp, value) pairs into the rollup tables"""
+        ts_ns = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).asi8
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+
+        table = models.DataRollup.__table__
+        for bucket_seconds in ROLLUP_BUCKETS.values():
+            rows = self._aggregate(dataset_id, bucket_seconds, ts_ns, values)
+            stmt = dialect_insert(db, table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["dataset_id", "bucket_seconds", "bucket_start"],
+                set_={
+                    "count": table.c.count + stmt.excluded.count,
+                    "sum": table.c.sum + stmt.excluded.sum,
+                    "sum_sq": table.c.sum_sq + stmt.excluded.sum_sq,
+                    "min": case((stmt.excluded.min < table.c.min, stmt.excluded.min), else_=table.c.min),
+                    "max": case((stmt.excluded.max > table.c.max, stmt.excluded.max), else_=table.c.max),
+                },
+            )
+            db.execute(stmt, rows)
+
+    def _aggregate(self, dataset_id: int, bucket_seconds: int, ts_ns: np.ndarray, values: np.ndarray) -> List[Dict[str, Any]]:
+        width = bucket_seconds * 1_000_000_000
+        buckets = ts_ns // width
+        order = np.argsort(buckets, kind="stable")
+        buckets, sorted_values = buckets[order], values[order]
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+        counts = np.diff(np.r_[starts, len(buckets)])
+        sums = np.add.reduceat(sorted_values, starts)
+        sums_sq = np.add.reduceat(sorted_values * sorted_values, starts)
+        mins = np.minimum.reduceat(sorted_values, starts)
+        maxs = np.maximum.reduceat(sorted_values, starts)
+        bucket_starts = pd.to_datetime(buckets[starts] * width).to_pydatetime()
+
+        return [
+            {
+                "dataset_id": dataset_id,
+                "bucket_seconds": bucket_seconds,
+                "bucket_start": bucket_starts[i],
+                "count": int(counts[i]),
+                "sum": float(sums[i]),
+                "min": float(mins[i]),
+                "max": float(maxs[i]),
+                "sum_sq": float(sums_sq[i]),
+            }
+            for i in range(len(starts))
+        ]
+
+    def query(
+        self,
+        db: Session,
+        dataset_id: int,
+        bucket_seconds: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Read rollup buckets with derived avg and sample stddev"""
+        start, end = naive_utc(start), naive_utc(end)
+        query = db.query(models.DataRollup).filter(
+            models.DataRollup.dataset_id == dataset_id,
+            models.DataRollup.bucket_seconds == bucket_seconds,
+        )
+        if start is not None:
+            query = query.filter(models.DataRollup.bucket_start >= start)
+        if end is not None:
+            query = query.filter(models.DataRollup.bucket_start <= end)
+
+        return [
+            {
+                "bucket_start": r.bucket_start,
+                "count": r.count,
+                "sum": r.sum,
+                "min": r.min,
+                "max": r.max,
+                "avg": r.sum / r.count if r.count else None,
+                "stddev": self.stddev(r.count, r.sum, r.sum_sq),
+            }
+            for r in query.order_by(models.DataRollup.bucket_start).all()
+        ]
+
+    def stddev(self, count: int, total: float, total_sq: float) -> Optional[float]:
+        """Sample standard deviation from count, sum and sum of squares"""
+        if not count or count < 2:
+            return None
+        variance = (total_sq - total * total / count) / (count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def is_complete(self, db: Session, dataset_id: int) -> bool:
+        """Whether the dataset's rollups are known to include every one of its points"""
+        return db.query(models.RollupCoverage.id).filter(
+            models.RollupCoverage.dataset_id == dataset_id
+        ).first() is not None
+
+    def mark_complete(self, db: Session, dataset_id: int) -> None:
+        """Record full coverage; call in the transaction that establishes it"""
+        stmt = dialect_insert(db, models.RollupCoverage.__table__).values(dataset_id=dataset_id)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["dataset_id"], set_={"verified_at": datetime.utcnow()}
+        ))
+
+    def rebuild(self, db: Session, dataset_id: int, batch_rows: int = 50000) -> int:
+        """Recompute a dataset's rollups from its raw points"""
+        first = db.scalar(
+            select(func.min(models.DataPoint.timestamp)).where(models.DataPoint.dataset_id == dataset_id)
+        )
+        folded = 0
+        if first is not None:
+            day = ROLLUP_BUCKETS["day"] * 1_000_000_000
+            first_day = pd.Timestamp(pd.to_datetime(first, utc=True).value // day * day).to_pydatetime()
+            db.query(models.DataRollup).filter(
+                models.DataRollup.dataset_id == dataset_id,
+                models.DataRollup.bucket_start >= first_day,
+            ).delete()
+            result = db.execute(
+                select(models.DataPoint.timestamp, models.DataPoint.value)
+                .where(models.DataPoint.dataset_id == dataset_id)
+                .execution_options(yield_per=batch_rows)
+            )
+            for partition in result.partitions():
+                self.apply(db, dataset_id, [r.timestamp for r in partition], [r.value for r in partition])
+                folded += len(partition)
+        self.mark_complete(db, dataset_id)
+        db.execute(version_bump(dataset_id))
+        db.commit()
+        return folded
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        db.query(models.DataRollup).filter(models.DataRollup.dataset_id == dataset_id).delete()
+        db.query(models.RollupCoverage).filter(models.RollupCoverage.dataset_id == dataset_id).delete()
+
+
+# Singleton instance
+rollup_service = RollupService()
@@ -0,0 +1,167 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..models import models
+from .meta_query import meta_query_service
+
+
+SUPPORTED_DTYPES = ("float", "int")
+
+
+class SchemaRegistry:
+    """Per-dataset registry of meta_data keys promoted to typed storage"""
+
+    def list_fields(self, db: Session, dataset_id: int) -> List[models.DatasetField]:
+        return db.query(models.DatasetField).filter(
+            models.DatasetField.dataset_id == dataset_id
+        ).order_by(models.DatasetField.id).all()
+
+    def get_field(self, db: Session, dataset_id: int, name: str) -> Optional[models.DatasetField]:
+        return db.query(models.DatasetField).filter(
+            models.DatasetField.dataset_id == dataset_id,
+            models.DatasetField.name == name,
+        ).first()
+
+    def promote(self, db: Session, dataset_id: int, name: str, dtype: str = "float") -> models.DatasetField:
+        """Register a meta_data key for promotion; the backfill runs separately"""
+        meta_query_service.validate_key(name)
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported field dtype '{dtype}'")
+        if name in ("timestamp", "value"):
+            raise ValueError(f"'{name}' is already a column")
+
+        field = self.get_field(db, dataset_id, name)
+        if field is None:
+            field = models.DatasetField(dataset_id=dataset_id, name=name, dtype=dtype, backfilled_through=0)
+            db.add(field)
+            db.commit()
+            db.refresh(field)
+        return field
+
+    def demote(self, db: Session, field: models.DatasetField) -> None:
+        db.query(models.DataPointField).filter(models.DataPointField.field_id == field.id).delete()
+        db.delete(field)
+        db.commit()
+
+    def backfill(self, db: Session, field_id: int) -> None:
+        """Copy all existing values of a promoted key into data_point_fields"""
+        field = db.query(models.DatasetField).filter(models.DatasetField.id == field_id).first()
+        if field is None:
+            return
+
+        field.backfill_status = "running"
+        field.error = None
+        db.commit()
+        try:
+            self.sync_field(db, field)
+            field.backfill_status = "complete"
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            field.backfill_status = "failed"
+            field.error = str(e)
+            db.commit()
+
+    def sync(self, db: Session, dataset_id: int) -> None:
+        """Catch every completed field of a dataset up with newly inserted points"""
+        for field in self.list_fields(db, dataset_id):
+            if field.backfill_status == "complete":
+                self.sync_field(db, field)
+
+    def sync_field(self, db: Session, field: models.DatasetField) -> int:
+        """Copy values past the field watermark in bounded batches"""
+        batch_rows = settings.field_backfill_batch_rows
+        target = db.query(func.max(models.DataPoint.id)).filter(
+            models.DataPoint.dataset_id == field.dataset_id
+        ).scalar() or 0
+
+        copied = 0
+        watermark = field.backfilled_through or 0
+        extracted = self._numeric(db, field)
+        while watermark < target:
+            upper = db.query(models.DataPoint.id).filter(
+                models.DataPoint.dataset_id == field.dataset_id,
+                models.DataPoint.id > watermark,
+            ).order_by(models.DataPoint.id).offset(batch_rows - 1).limit(1).scalar() or target
+
+            source = select(
+                models.DataPoint.id,
+                literal(field.id),
+                models.DataPoint.timestamp,
+                extracted,
+            ).where(
+                models.DataPoint.dataset_id == field.dataset_id,
+                models.DataPoint.id > watermark,
+                models.DataPoint.id <= upper,
+                extracted.isnot(None),
+            )
+            stmt = dialect_insert(db, models.DataPointField.__table__).from_select(
+                ["data_point_id", "field_id", "timestamp", "value"], source
+            ).on_conflict_do_nothing()
+            copied += db.execute(stmt).rowcount or 0
+
+            field.backfilled_through = upper
+            db.commit()
+            watermark = upper
+        return copied
+
+    def read_field(self, db: Session, field: models.DatasetField) -> Dict[str, Any]:
+        """Read a promoted key as timestamp/value arrays ordered by timestamp, unsynced points included"""
+        rows = db.execute(
+            select(models.DataPointField.timestamp, models.DataPointField.value)
+            .where(models.DataPointField.field_id == field.id)
+            .order_by(models.DataPointField.timestamp)
+        ).all()
+        timestamps = [r.timestamp for r in rows]
+        values = np.fromiter((r.value for r in rows), dtype=np.float64, count=len(rows))
+
+        tail_timestamps, tail_values = self.read_unsynced(db, field)
+        if tail_timestamps:
+            timestamps = timestamps + tail_timestamps
+            values = np.concatenate([values, tail_values])
+            order = np.argsort(pd.to_datetime(timestamps, utc=True).asi8, kind="stable")
+            timestamps = [timestamps[i] for i in order]
+            values = values[order]
+        if field.dtype == "int":
+            values = np.round(values)
+        return {"timestamp": timestamps, field.name: values}
+
+    def read_unsynced(self, db: Session, field: models.DatasetField) -> Tuple[List[datetime], np.ndarray]:
+        """Timestamps and numeric values of the key on points past the field watermark"""
+        extracted = self._numeric(db, field)
+        rows = db.execute(
+            select(models.DataPoint.timestamp, extracted.label("value"))
+            .where(
+                models.DataPoint.dataset_id == field.dataset_id,
+                models.DataPoint.id > (field.backfilled_through or 0),
+                extracted.isnot(None),
+            )
+            .order_by(models.DataPoint.id)
+        ).all()
+        values = np.fromiter((r.value for r in rows), dtype=np.float64, count=len(rows))
+        return [r.timestamp for r in rows], values
+
+    def _numeric(self, db: Session, field: models.DatasetField):
+        # Only JSON numbers are copied; strings and other values are skipped
+        return meta_query_service.expression(db.get_bind().dialect.name, field.name, "number")
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        field_ids = [f.id for f in self.list_fields(db, dataset_id)]
+        if field_ids:
+            db.query(models.DataPointField).filter(
+                models.DataPointField.field_id.in_(field_ids)
+            ).delete(synchronize_session=False)
+            db.query(models.DatasetField).filter(
+                models.DatasetField.id.in_(field_ids)
+            ).delete(synchronize_session=False)
+
+
+# Singleton instance
+schema_registry = SchemaRegistry()
@@ -0,0 +1,537 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.timeutils import naive_utc
+from ..models import models
+from .statistics import statistics_service
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: seals are then only serialized per process
+    fcntl = None
+
+
+def to_ns(value: datetime) -> int:
+    """Convert a datetime to naive-UTC epoch nanoseconds"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.value
+
+
+class MappedSeries:
+    """Read-only, memory-mapped view of a dataset's sealed series"""
+
+    def __init__(self, directory: str, manifest: Dict[str, Any]):
+        self.directory = directory
+        self.version = manifest["version"]
+        self.last_point_id = manifest["last_point_id"]
+        self.row_count = manifest["row_count"]
+        self.columns: List[str] = manifest["columns"]
+        self.timestamp = self._map("timestamp", np.int64)
+        self.value = self._map("value", np.float64)
+        self._meta: Dict[str, np.ndarray] = {}
+
+    def _map(self, name: str, dtype) -> np.ndarray:
+        if not self.row_count:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, f"{name}.bin"), dtype=dtype, mode="r", shape=(self.row_count,))
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def column(self, key: str) -> np.ndarray:
+        if key == "timestamp":
+            return self.timestamp
+        if key == "value":
+            return self.value
+        if key not in self._meta:
+            self._meta[key] = self._map(f"meta_{self.columns.index(key)}", np.float64)
+        return self._meta[key]
+
+    def bounds(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Tuple[int, int]:
+        """Row range covering [start, end], found by binary search on timestamps"""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamp, to_ns(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamp, to_ns(end), side="right"))
+        return lo, max(lo, hi)
+
+    def slice(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Return memmap views of the rows within [start, end] (no copy)"""
+        lo, hi = self.bounds(start, end)
+        keys = ["timestamp", "value"] + [k for k in self.columns if columns is None or k in columns]
+        return {key: self.column(key)[lo:hi] for key in keys}
+
+
+class SegmentStore:
+    """Append-only columnar storage for sealed dataset series"""
+
+    def __init__(self):
+        self._mapped: Dict[int, MappedSeries] = {}
+        # dataset_id -> (max point id, buffered rows) at the last buffer count
+        self._buffered: Dict[int, Tuple[int, int]] = {}
+        # Serializes seals and series builds within this process; _locked
+        # adds a file lock for other processes
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.segment_storage_enabled
+
+    def dataset_dir(self, dataset_id: int) -> str:
+        return os.path.join(settings.segment_storage_path, str(dataset_id))
+
+    def watermark(self, db: Session, dataset_id: int, for_update: bool = False) -> int:
+        """Highest data point id already sealed into a segment"""
+        query = db.query(models.DataSegment.last_point_id).filter(
+            models.DataSegment.dataset_id == dataset_id
+        ).order_by(models.DataSegment.last_point_id.desc()).limit(1)
+        if for_update:
+            # Locks the watermark row on PostgreSQL; a no-op on SQLite
+            query = query.with_for_update()
+        return query.scalar() or 0
+
+    @contextmanager
+    def _locked(self, dataset_id: int):
+        """Hold the dataset's segment lock, shared by every process using the directory"""
+        with self._lock:
+            os.makedirs(self.dataset_dir(dataset_id), exist_ok=True)
+            with open(os.path.join(self.dataset_dir(dataset_id), ".lock"), "a") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def maybe_seal(self, db: Session, dataset_id: int) -> Optional[models.DataSegment]:
+        """Seal the write buffer if it has grown past ``segment_seal_rows``"""
+        if not self.enabled:
+            return None
+
+        # max(id) is an index lookup. Ids are shared by all datasets, so the
+        # gap to the last count only bounds the buffer from above; the buffer
+        # is counted (at most segment_seal_rows index entries) once that bound
+        # reaches a full segment.
+        seal_rows = settings.segment_seal_rows
+        max_id = db.query(func.max(models.DataPoint.id)).filter(
+            models.DataPoint.dataset_id == dataset_id
+        ).scalar()
+        if not max_id:
+            return None
+        counted_id, counted = self._buffered.get(dataset_id, (0, 0))
+        if counted_id and counted + max_id - counted_id < seal_rows:
+            return None
+
+        watermark = self.watermark(db, dataset_id)
+        if max_id - watermark < seal_rows:
+            return None
+        buffered = db.execute(
+            select(func.count()).select_from(
+                select(models.DataPoint.id)
+                .where(models.DataPoint.dataset_id == dataset_id, models.DataPoint.id > watermark)
+                .limit(seal_rows)
+                .subquery()
+            )
+        ).scalar()
+        if buffered < seal_rows:
+            self._buffered[dataset_id] = (max_id, buffered)
+            return None
+        self._buffered.pop(dataset_id, None)
+        return self.seal(db, dataset_id, min_rows=seal_rows)
+
+    def seal(self, db: Session, dataset_id: int, min_rows: int = 1) -> Optional[models.DataSegment]:
+        """Write the next ``segment_seal_rows`` buffered points as a segment"""
+        with self._locked(dataset_id):
+            watermark = self.watermark(db, dataset_id, for_update=True)
+            query = self._point_query(dataset_id).where(models.DataPoint.id > watermark)
+            if settings.segment_compact_sealed:
+                # Compacted points must already be in the statistics and sketches
+                query = query.where(models.DataPoint.id <= statistics_service.folded_through(db, dataset_id))
+            rows = db.execute(query.order_by(models.DataPoint.id).limit(settings.segment_seal_rows)).all()
+            if not rows or len(rows) < min_rows:
+                return None
+
+            ids = np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows))
+            columns = self._rows_to_columns(rows)
+            meta_keys = [k for k in columns if k not in ("timestamp", "value")]
+
+            relative_path = os.path.join(str(dataset_id), f"seg_{int(ids[0]):012d}_{int(ids[-1]):012d}.npz")
+            full_path = os.path.join(settings.segment_storage_path, relative_path)
+            tmp_path = f"{full_path}.{uuid.uuid4().hex[:8]}.tmp"
+            arrays = {"id": ids, "timestamp": columns["timestamp"], "value": columns["value"]}
+            arrays.update({f"meta_{i}": columns[key] for i, key in enumerate(meta_keys)})
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, full_path)
+
+            timestamps = columns["timestamp"]
+            segment = models.DataSegment(
+                dataset_id=dataset_id,
+                path=relative_path,
+                row_count=len(rows),
+                first_point_id=int(ids[0]),
+                last_point_id=int(ids[-1]),
+                min_timestamp=pd.Timestamp(timestamps.min()).to_pydatetime(),
+                max_timestamp=pd.Timestamp(timestamps.max()).to_pydatetime(),
+                columns=meta_keys,
+            )
+            db.add(segment)
+            if settings.segment_compact_sealed:
+                self._compact(db, dataset_id, segment.first_point_id, segment.last_point_id)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another host sealed the same range first (unique first_point_id)
+                db.rollback()
+                return None
+            db.refresh(segment)
+
+            mapped = self.open_series(dataset_id)
+            if (mapped.last_point_id if mapped is not None else 0) == watermark:
+                self._append(dataset_id, mapped, columns, segment.last_point_id)
+            else:
+                # The mapped series is missing earlier segments; rebuild it
+                self.materialize(db, dataset_id)
+            return segment
+
+    def _compact(self, db: Session, dataset_id: int, first_point_id: int, last_point_id: int) -> None:
+        """Delete a sealed id range from the write buffer, in the sealing transaction"""
+        sealed = select(models.DataPoint.id).where(
+            models.DataPoint.dataset_id == dataset_id,
+            models.DataPoint.id >= first_point_id,
+            models.DataPoint.id <= last_point_id,
+        )
+        db.execute(delete(models.DataPointField).where(models.DataPointField.data_point_id.in_(sealed)))
+        db.execute(
+            delete(models.DataPoint).where(
+                models.DataPoint.dataset_id == dataset_id,
+                models.DataPoint.id >= first_point_id,
+                models.DataPoint.id <= last_point_id,
+            )
+        )
+
+    def materialize(self, db: Session, dataset_id: int) -> Optional[MappedSeries]:
+        """Rebuild the memory-mappable series from all sealed segments; call under ``_locked``"""
+        segments = db.query(models.DataSegment).filter(
+            models.DataSegment.dataset_id == dataset_id
+        ).order_by(models.DataSegment.first_point_id).all()
+        if not segments:
+            self._remove_series(dataset_id)
+            return None
+
+        merged = self._concat([self._load_segment(segment, None) for segment in segments], None, None, None)
+        meta_keys = [k for k in merged if k not in ("timestamp", "value")]
+        return self._write_build(dataset_id, merged, meta_keys, segments[-1].last_point_id)
+
+    def _append(
+        self,
+        dataset_id: int,
+        mapped: Optional[MappedSeries],
+        run: Dict[str, np.ndarray],
+        last_point_id: int,
+    ) -> MappedSeries:
+        """Merge one sealed run of points into the mapped series"""
+        order = np.argsort(run["timestamp"], kind="stable")
+        run = {key: array[order] for key, array in run.items()}
+        if mapped is None:
+            return self._write_build(dataset_id, run, [k for k in run if k not in ("timestamp", "value")], last_point_id)
+
+        columns = mapped.columns + [k for k in run if k not in ("timestamp", "value") and k not in mapped.columns]
+        size = len(run["timestamp"])
+        if len(mapped) and run["timestamp"][0] < mapped.timestamp[-1]:
+            # Out of order: keep the prefix that sorts before the run and
+            # merge the rest with it into a new build.
+            split = int(np.searchsorted(mapped.timestamp, run["timestamp"][0], side="right"))
+            merged = {}
+            for key in ["timestamp", "value"] + columns:
+                old = mapped.column(key) if key in ("timestamp", "value") or key in mapped.columns \
+                    else np.full(len(mapped), np.nan)
+                new = run[key] if key in run else np.full(size, np.nan)
+                merged[key] = (old[:split], np.concatenate([old[split:], new]))
+            tail_order = np.argsort(merged["timestamp"][1], kind="stable")
+            arrays = {key: np.concatenate([head, tail[tail_order]]) for key, (head, tail) in merged.items()}
+            return self._write_build(dataset_id, arrays, columns, last_point_id)
+
+        # In order: write past the mapped rows. Anything after them is left
+        # over from an interrupted append and is overwritten.
+        for name, key in [("timestamp", "timestamp"), ("value", "value")] + \
+                [(f"meta_{i}", key) for i, key in enumerate(columns)]:
+            if key in ("timestamp", "value") or key in mapped.columns:
+                self._write_column(mapped.directory, name, len(mapped), run.get(key, np.full(size, np.nan)))
+            else:
+                # New key: earlier rows didn't have it
+                self._write_column(
+                    mapped.directory, name, 0, np.concatenate([np.full(len(mapped), np.nan), run[key]])
+                )
+        self._write_manifest(mapped.directory, last_point_id, len(mapped) + size, columns)
+        return self.open_series(dataset_id)
+
+    def _write_build(
+        self,
+        dataset_id: int,
+        arrays: Dict[str, np.ndarray],
+        meta_keys: List[str],
+        last_point_id: int,
+    ) -> MappedSeries:
+        """Write a complete series into a new build directory and publish it"""
+        build = f"series_{last_point_id:012d}_{uuid.uuid4().hex[:8]}"
+        directory = os.path.join(self.dataset_dir(dataset_id), build)
+        os.makedirs(directory)
+        self._write_column(directory, "timestamp", 0, arrays["timestamp"])
+        self._write_column(directory, "value", 0, arrays["value"])
+        for i, key in enumerate(meta_keys):
+            self._write_column(directory, f"meta_{i}", 0, arrays[key])
+        self._write_manifest(directory, last_point_id, len(arrays["timestamp"]), meta_keys)
+
+        pointer = os.path.join(self.dataset_dir(dataset_id), "CURRENT")
+        with open(pointer + ".tmp", "w") as f:
+            f.write(build)
+        os.replace(pointer + ".tmp", pointer)
+
+        # Older builds can go once CURRENT has moved; open memmaps stay valid
+        # because unlinked files live on until the last mapping is closed.
+        for name in os.listdir(self.dataset_dir(dataset_id)):
+            if name.startswith("series_") and name != build:
+                shutil.rmtree(os.path.join(self.dataset_dir(dataset_id), name), ignore_errors=True)
+
+        return self.open_series(dataset_id)
+
+    def _write_column(self, directory: str, name: str, offset: int, array: np.ndarray) -> None:
+        """Write ``array`` into a column file starting at row ``offset``"""
+        path = os.path.join(directory, f"{name}.bin")
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(offset * 8)
+            f.write(memoryview(np.ascontiguousarray(array, dtype="<i8" if name == "timestamp" else "<f8")))
+            f.truncate()
+
+    def _write_manifest(self, directory: str, last_point_id: int, row_count: int, columns: List[str]) -> None:
+        manifest = {
+            "version": f"{os.path.basename(directory)}:{last_point_id}",
+            "last_point_id": last_point_id,
+            "row_count": row_count,
+            "columns": columns,
+        }
+        path = os.path.join(directory, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def _remove_series(self, dataset_id: int) -> None:
+        self._mapped.pop(dataset_id, None)
+        try:
+            os.remove(os.path.join(self.dataset_dir(dataset_id), "CURRENT"))
+        except FileNotFoundError:
+            pass
+
+    def open_series(self, dataset_id: int) -> Optional[MappedSeries]:
+        """Open (or reuse) the current memory-mapped series of a dataset"""
+        try:
+            with open(os.path.join(self.dataset_dir(dataset_id), "CURRENT")) as f:
+                directory = os.path.join(self.dataset_dir(dataset_id), f.read().strip())
+            with open(os.path.join(directory, "manifest.json")) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            self._mapped.pop(dataset_id, None)
+            return None
+
+        mapped = self._mapped.get(dataset_id)
+        if mapped is not None and mapped.version == manifest["version"]:
+            return mapped
+
+        mapped = MappedSeries(directory, manifest)
+        self._mapped[dataset_id] = mapped
+        return mapped
+
+    def read(
+        self,
+        db: Session,
+        dataset_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Read a dataset series as NumPy arrays sorted by timestamp"""
+        start, end = naive_utc(start), naive_utc(end)
+        mapped = self.open_series(dataset_id)
+        parts = [mapped.slice(start, end, columns)] if mapped is not None else []
+        covered = mapped.last_point_id if mapped is not None else 0
+
+        # Segments sealed after the mapped build (normally none)
+        query = db.query(models.DataSegment).filter(
+            models.DataSegment.dataset_id == dataset_id,
+            models.DataSegment.last_point_id > covered,
+        )
+        if start is not None:
+            query = query.filter(models.DataSegment.max_timestamp >= start)
+        if end is not None:
+            query = query.filter(models.DataSegment.min_timestamp <= end)
+        segments = query.order_by(models.DataSegment.first_point_id).all()
+        parts.extend(self._load_segment(segment, columns) for segment in segments)
+
+        buffer_query = self._point_query(dataset_id).where(
+            models.DataPoint.id > self.watermark(db, dataset_id)
+        )
+        if start is not None:
+            buffer_query = buffer_query.where(models.DataPoint.timestamp >= start)
+        if end is not None:
+            buffer_query = buffer_query.where(models.DataPoint.timestamp <= end)
+        rows = db.execute(buffer_query.order_by(models.DataPoint.id)).all()
+        if rows:
+            parts.append(self._rows_to_columns(rows, columns))
+
+        if mapped is not None and len(parts) == 1:
+            # Everything lives in the mapped series: hand back the views as-is
+            view = parts[0]
+            for key in columns or []:
+                if key not in view:
+                    view[key] = np.full(len(view["timestamp"]), np.nan)
+            return view
+
+        return self._concat(parts, columns, start, end)
+
+    def expire(self, db: Session, dataset_id: int, cutoff: datetime) -> int:
+        """Drop sealed rows older than ``cutoff``; returns the number of segments deleted"""
+        query = db.query(models.DataSegment).filter(
+            models.DataSegment.dataset_id == dataset_id,
+            models.DataSegment.min_timestamp < cutoff,
+        )
+        if not query.count():
+            return 0
+
+        with self._locked(dataset_id):
+            # Read again under the lock: a seal may have committed meanwhile
+            affected = query.all()
+            if not affected:
+                return 0
+
+            cutoff_ns = to_ns(cutoff)
+            expired = []
+            for segment in affected:
+                full_path = os.path.join(settings.segment_storage_path, segment.path)
+                if to_ns(segment.max_timestamp) < cutoff_ns:
+                    expired.append(full_path)
+                    db.delete(segment)
+                    continue
+
+                with np.load(full_path) as npz:
+                    arrays = {name: npz[name] for name in npz.files}
+                keep = arrays["timestamp"] >= cutoff_ns
+                arrays = {name: array[keep] for name, array in arrays.items()}
+                # The trimmed rows are already gone from data_points, so the
+                # file can be swapped before the catalog commit
+                tmp_path = full_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.savez_compressed(f, **arrays)
+                os.replace(tmp_path, full_path)
+                segment.row_count = int(keep.sum())
+                segment.min_timestamp = pd.Timestamp(arrays["timestamp"].min()).to_pydatetime()
+            db.commit()
+
+            for path in expired:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.materialize(db, dataset_id)
+        return len(expired)
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        """Remove a dataset's segments from the catalog; ``remove_files`` deletes them after commit"""
+        db.query(models.DataSegment).filter(models.DataSegment.dataset_id == dataset_id).delete()
+
+    def remove_files(self, dataset_id: int) -> None:
+        """Delete a dropped dataset's segment directory"""
+        self._mapped.pop(dataset_id, None)
+        self._buffered.pop(dataset_id, None)
+        shutil.rmtree(self.dataset_dir(dataset_id), ignore_errors=True)
+
+    def _point_query(self, dataset_id: int):
+        return select(
+            models.DataPoint.id,
+            models.DataPoint.timestamp,
+            models.DataPoint.value,
+            models.DataPoint.meta_data,
+        ).where(models.DataPoint.dataset_id == dataset_id)
+
+    def _load_segment(self, segment: models.DataSegment, columns: Optional[Sequence[str]]) -> Dict[str, np.ndarray]:
+        path = os.path.join(settings.segment_storage_path, segment.path)
+        with np.load(path) as npz:
+            part = {"timestamp": npz["timestamp"], "value": npz["value"]}
+            for i, key in enumerate(segment.columns or []):
+                if columns is None or key in columns:
+                    part[key] = npz[f"meta_{i}"]
+        return part
+
+    def _rows_to_columns(self, rows: List[Any], columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Convert (id, timestamp, value, meta_data) rows into column arrays"""
+        timestamps = pd.to_datetime([r.timestamp for r in rows], utc=True).tz_localize(None)
+        result = {
+            "timestamp": timestamps.asi8.astype(np.int64),
+            "value": np.fromiter((r.value for r in rows), dtype=np.float64, count=len(rows)),
+        }
+
+        meta = pd.DataFrame.from_records([r.meta_data or {} for r in rows])
+        for key in meta.columns:
+            if columns is not None and key not in columns:
+                continue
+            column = meta[key]
+            if column.dtype == bool:
+                continue
+            numeric = pd.to_numeric(column, errors="coerce")
+            if numeric.notna().any() and numeric.notna().sum() == column.notna().sum():
+                result[str(key)] = numeric.to_numpy(dtype=np.float64)
+        return result
+
+    def _concat(
+        self,
+        parts: List[Dict[str, np.ndarray]],
+        columns: Optional[Sequence[str]],
+        start: Optional[datetime],
+        end: Optional[datetime],
+    ) -> Dict[str, np.ndarray]:
+        keys = ["timestamp", "value"]
+        for part in parts:
+            keys.extend(k for k in part if k not in keys)
+        if columns is not None:
+            keys.extend(k for k in columns if k not in keys)
+
+        if not parts:
+            return {k: np.empty(0, dtype=np.int64 if k == "timestamp" else np.float64) for k in keys}
+
+        merged = {}
+        for key in keys:
+            merged[key] = np.concatenate([
+                part[key] if key in part else np.full(len(part["timestamp"]), np.nan)
+                for part in parts
+            ])
+
+        mask = np.ones(len(merged["timestamp"]), dtype=bool)
+        if start is not None:
+            mask &= merged["timestamp"] >= to_ns(start)
+        if end is not None:
+            mask &= merged["timestamp"] <= to_ns(end)
+        order = np.argsort(merged["timestamp"][mask], kind="stable")
+        return {key: array[mask][order] for key, array in merged.items()}
+
+
+# Singleton instance
+segment_store = SegmentStore()
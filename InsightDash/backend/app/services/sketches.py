@@ -0,0 +1,430 @@
+import base64
+import math
+import numbers
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..core.timeutils import naive_utc
+from ..core.versioning import version_bump
+from ..models import models
+from .statistics import statistics_service
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang, Liberty)"""
+
+    def __init__(self, k: int = 200, levels: Optional[List[np.ndarray]] = None, n: int = 0,
+                 min_value: Optional[float] = None, max_value: Optional[float] = None):
+        self.k = k
+        self.levels = levels or [np.empty(0)]
+        self.n = n
+        self.min = min_value
+        self.max = max_value
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "KLLSketch":
+        return cls(
+            k=state["k"],
+            levels=[np.asarray(level, dtype=np.float64) for level in state["levels"]],
+            n=state["n"],
+            min_value=state.get("min"),
+            max_value=state.get("max"),
+        )
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "levels": [level.tolist() for level in self.levels],
+        }
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._extend(len(values), float(values.min()), float(values.max()))
+        self._compact()
+
+    def merge(self, other: "KLLSketch") -> None:
+        if other.n == 0:
+            return
+        for h, level in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate((self.levels[h], level))
+        self._extend(other.n, other.min, other.max)
+        self._compact()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        return float(items[order][min(index, len(items) - 1)])
+
+    def _extend(self, n: int, low: float, high: float) -> None:
+        self.n += n
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def _capacity(self, h: int) -> int:
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** (len(self.levels) - h - 1))))
+
+    def _compact(self) -> None:
+        rng = np.random.default_rng()
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(level)
+                # An odd item out stays behind at its own weight
+                keep, level = (level[:1], level[1:]) if len(level) % 2 else (np.empty(0), level)
+                self.levels[h + 1] = np.concatenate((self.levels[h + 1], level[rng.integers(2)::2]))
+                self.levels[h] = keep
+            h += 1
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes with ``2**p`` registers"""
+
+    def __init__(self, p: int = 12, registers: Optional[np.ndarray] = None):
+        self.p = p
+        self.registers = registers if registers is not None else np.zeros(1 << p, dtype=np.uint8)
+
+    @classmethod
+    def from_state(cls, state: str, p: int) -> "HyperLogLog":
+        return cls(p, np.frombuffer(base64.b64decode(state), dtype=np.uint8).copy())
+
+    def state(self) -> str:
+        return base64.b64encode(self.registers.tobytes()).decode()
+
+    def update(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.p)), 64 - self.p) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters summary of at most ``capacity`` items"""
+
+    def __init__(self, capacity: int = 64, items: Optional[Dict[str, List[int]]] = None, floor: int = 0):
+        self.capacity = capacity
+        self.items = items or {}
+        self.floor = floor
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SpaceSaving":
+        return cls(state["capacity"], {k: list(v) for k, v in state["items"].items()}, state["floor"])
+
+    @classmethod
+    def from_counts(cls, counts: Iterable[Tuple[Any, int]], capacity: int) -> "SpaceSaving":
+        """Exact summary of a batch from (item, count) pairs sorted by count, descending"""
+        items, floor = {}, 0
+        for item, count in counts:
+            if len(items) == capacity:
+                floor = int(count)
+                break
+            items[_format_item(item)] = [int(count), 0]
+        return cls(capacity, items, floor)
+
+    def state(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "floor": self.floor, "items": self.items}
+
+    def merge(self, other: "SpaceSaving") -> None:
+        merged = {}
+        for item in self.items.keys() | other.items.keys():
+            a = self.items.get(item, [self.floor, self.floor])
+            b = other.items.get(item, [other.floor, other.floor])
+            merged[item] = [a[0] + b[0], a[1] + b[1]]
+        ranked = sorted(merged.items(), key=lambda entry: entry[1][0], reverse=True)
+        dropped = ranked[self.capacity][1][0] if len(ranked) > self.capacity else 0
+        self.items = dict(ranked[:self.capacity])
+        self.floor = max(self.floor + other.floor, dropped)
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        ranked = sorted(self.items.items(), key=lambda entry: entry[1][0], reverse=True)[:limit]
+        return [
+            {"item": item, "count": count, "lower_bound": count - error}
+            for item, (count, error) in ranked
+        ]
+
+
+class SketchService:
+    """Per-dataset, per-column, per-day mergeable sketches"""
+
+    bucket_seconds = 86400
+
+    def apply(self, db: Session, dataset_id: int, timestamps: Any, values: Any,
+              meta_data: Sequence[Optional[Dict[str, Any]]]) -> None:
+        """Fold a batch into the dataset's sketches; ``summary_service.fold`` holds the statistics lock"""
+        if not settings.sketches_enabled:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+
+        ts_ns = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).asi8
+        buckets = ts_ns // (self.bucket_seconds * 1_000_000_000)
+        columns = self._columns(values, meta_data)
+
+        keys = [(name, int(bucket)) for bucket in np.unique(buckets) for name in columns]
+        existing = self._load(db, dataset_id, keys)
+        for bucket in np.unique(buckets):
+            rows = np.flatnonzero(buckets == bucket)
+            bucket_start = _EPOCH + timedelta(seconds=int(bucket) * self.bucket_seconds)
+            for name, column in columns.items():
+                batch = self._summarize([column[i] for i in rows] if name != "value" else values[rows])
+                if batch is None:
+                    continue
+                self._merge_into(existing[(name, bucket_start)], batch)
+        db.flush()
+
+    def query(
+        self,
+        db: Session,
+        dataset_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+        quantiles: Sequence[float] = (0.5, 0.95, 0.99),
+        top: int = 10,
+    ) -> Dict[str, Any]:
+        """Merge the day buckets overlapping ``[start, end]`` per column"""
+        query = select(models.DataSketch).where(models.DataSketch.dataset_id == dataset_id)
+        if start is not None:
+            query = query.where(models.DataSketch.bucket_start >= self._bucket_floor(start))
+        if end is not None:
+            query = query.where(models.DataSketch.bucket_start <= naive_utc(end))
+        if columns:
+            query = query.where(models.DataSketch.column_name.in_(list(columns)))
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        buckets = set()
+        for row in db.execute(query.order_by(models.DataSketch.bucket_start)).scalars():
+            buckets.add(row.bucket_start)
+            sketch = self._from_row(row)
+            if row.column_name in merged:
+                self._merge_into(merged[row.column_name], sketch)
+            else:
+                merged[row.column_name] = sketch
+
+        result = {}
+        for name, sketch in merged.items():
+            kll = sketch["quantiles"]
+            result[name] = {
+                "count": sketch["count"],
+                "min": kll.min if kll else None,
+                "max": kll.max if kll else None,
+                "quantiles": {str(q): kll.quantile(q) if kll else None for q in quantiles},
+                "distinct": sketch["distinct"].estimate(),
+                "top": sketch["top"].top(top),
+            }
+        return {
+            "dataset_id": dataset_id,
+            "bucket_seconds": self.bucket_seconds,
+            "bucket_count": len(buckets),
+            "columns": result,
+        }
+
+    def rebuild(self, db: Session, dataset_id: int, batch_rows: int = 50000) -> int:
+        """Recompute a dataset's sketches from the raw points up to the statistics watermark"""
+        through = statistics_service.folded_through(db, dataset_id)
+        self.drop_dataset(db, dataset_id)
+        result = db.execute(
+            select(models.DataPoint.timestamp, models.DataPoint.value, models.DataPoint.meta_data)
+            .where(models.DataPoint.dataset_id == dataset_id, models.DataPoint.id <= through)
+            .execution_options(yield_per=batch_rows)
+        )
+        folded = 0
+        for partition in result.partitions():
+            self.apply(
+                db, dataset_id,
+                [r.timestamp for r in partition], [r.value for r in partition], [r.meta_data for r in partition],
+            )
+            folded += len(partition)
+        db.execute(version_bump(dataset_id))
+        db.commit()
+        return folded
+
+    def expire(self, db: Session, dataset_id: int, before: datetime) -> int:
+        """Delete day buckets that end at or before ``before``"""
+        result = db.execute(
+            delete(models.DataSketch).where(
+                models.DataSketch.dataset_id == dataset_id,
+                models.DataSketch.bucket_start <= before - timedelta(seconds=self.bucket_seconds),
+            )
+        )
+        if result.rowcount:
+            db.execute(version_bump(dataset_id))
+        db.commit()
+        return result.rowcount or 0
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        db.query(models.DataSketch).filter(models.DataSketch.dataset_id == dataset_id).delete()
+
+    def _columns(self, values: np.ndarray, meta_data: Sequence[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """``value`` plus one list per meta_data key (None where missing), up to the cap"""
+        keys: Dict[str, None] = {}
+        limit = settings.sketch_max_columns - 1
+        for meta in meta_data:
+            if meta:
+                for key in meta:
+                    if key not in keys and len(keys) < limit:
+                        keys[key] = None
+        columns: Dict[str, Any] = {"value": values}
+        for key in keys:
+            columns[key] = [meta.get(key) if meta else None for meta in meta_data]
+        return columns
+
+    def _summarize(self, raw: Any) -> Optional[Dict[str, Any]]:
+        """Sketches of one column's values within one bucket"""
+        if isinstance(raw, np.ndarray):
+            numeric, other = raw[np.isfinite(raw)], []
+        else:
+            numeric = np.asarray([v for v in raw if _is_number(v)], dtype=np.float64)
+            numeric = numeric[np.isfinite(numeric)]
+            other = [_format_item(v) for v in raw if v is not None and not _is_number(v)]
+        count = len(numeric) + len(other)
+        if count == 0:
+            return None
+
+        capacity, p = settings.sketch_top_k, settings.sketch_hll_precision
+        kll = None
+        if len(numeric):
+            kll = KLLSketch(settings.sketch_kll_k)
+            kll.update(numeric)
+        hll = HyperLogLog(p)
+        hll.update(pd.util.hash_array(numeric))
+        hll.update(pd.util.hash_array(np.asarray(other, dtype=object)))
+        distinct, counts = np.unique(numeric, return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        top = SpaceSaving.from_counts(zip(distinct[order].tolist(), counts[order].tolist()), capacity)
+        if other:
+            top.merge(SpaceSaving.from_counts(Counter(other).most_common(), capacity))
+        return {"count": count, "quantiles": kll, "distinct": hll, "top": top}
+
+    def _merge_into(self, target: Any, sketch: Dict[str, Any]) -> None:
+        """Merge ``sketch`` into a DataSketch row or an in-memory sketch dict"""
+        if isinstance(target, models.DataSketch):
+            current = self._from_row(target)
+            self._merge_into(current, sketch)
+            target.count = current["count"]
+            target.quantiles = current["quantiles"].state() if current["quantiles"] else None
+            target.distinct = current["distinct"].state()
+            target.top = current["top"].state()
+            return
+
+        target["count"] += sketch["count"]
+        if sketch["quantiles"] is not None:
+            if target["quantiles"] is None:
+                target["quantiles"] = KLLSketch(sketch["quantiles"].k)
+            target["quantiles"].merge(sketch["quantiles"])
+        target["distinct"].merge(sketch["distinct"])
+        target["top"].merge(sketch["top"])
+
+    def _from_row(self, row: models.DataSketch) -> Dict[str, Any]:
+        p = settings.sketch_hll_precision
+        return {
+            "count": row.count or 0,
+            "quantiles": KLLSketch.from_state(row.quantiles) if row.quantiles else None,
+            "distinct": HyperLogLog.from_state(row.distinct, p) if row.distinct else HyperLogLog(p),
+            "top": SpaceSaving.from_state(row.top) if row.top else SpaceSaving(settings.sketch_top_k),
+        }
+
+    def _load(self, db: Session, dataset_id: int, keys: List[tuple]) -> Dict[tuple, models.DataSketch]:
+        """Sketch rows for (column, bucket) keys, created empty where missing and locked"""
+        rows = [
+            {
+                "dataset_id": dataset_id,
+                "column_name": name,
+                "bucket_start": _EPOCH + timedelta(seconds=bucket * self.bucket_seconds),
+                "count": 0,
+            }
+            for name, bucket in keys
+        ]
+        stmt = dialect_insert(db, models.DataSketch.__table__).on_conflict_do_nothing(
+            index_elements=["dataset_id", "column_name", "bucket_start"]
+        )
+        db.execute(stmt, rows)
+        starts = sorted({row["bucket_start"] for row in rows})
+        found = db.execute(
+            select(models.DataSketch).where(
+                models.DataSketch.dataset_id == dataset_id,
+                models.DataSketch.bucket_start >= starts[0],
+                models.DataSketch.bucket_start <= starts[-1],
+                models.DataSketch.column_name.in_({name for name, _ in keys}),
+            ).with_for_update().execution_options(populate_existing=True)
+        ).scalars()
+        return {(row.column_name, naive_utc(row.bucket_start)): row for row in found}
+
+    def _bucket_floor(self, value: datetime) -> datetime:
+        value = naive_utc(value)
+        seconds = int((value - _EPOCH).total_seconds()) // self.bucket_seconds * self.bucket_seconds
+        return _EPOCH + timedelta(seconds=seconds)
+
+
+def _leading_zeros(x: np.ndarray) -> np.ndarray:
+    """Count of leading zero bits of each uint64 (64 for zero)"""
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (x >> np.uint64(64 - shift)) == 0
+        zeros += empty * shift
+        x = np.where(empty, x << np.uint64(shift), x)
+    return zeros + (x == 0)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _format_item(value: Any) -> str:
+    """Stable string form of a value for top-k summaries"""
+    if isinstance(value, str):
+        return value
+    if _is_number(value):
+        value = float(value)
+        return str(int(value)) if value.is_integer() and abs(value) < 2 ** 53 else repr(value)
+    return str(value)
+
+
+# Singleton instance
+sketch_service = SketchService()
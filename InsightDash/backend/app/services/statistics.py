@@ -0,0 +1,283 @@
+import math
+import numbers
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..core.versioning import version_bump
+from ..models import models
+
+
+# Pairwise moment arrays stored per dataset, each columns x columns
+_MOMENTS = ("n", "mean", "m2", "comoment")
+
+
+class StatisticsService:
+    """Incrementally maintained per-column statistics and correlations"""
+
+    def apply(
+        self,
+        db: Session,
+        dataset_id: int,
+        values: Any,
+        meta_data: Sequence[Optional[Dict[str, Any]]],
+        through: Optional[int] = None,
+    ) -> None:
+        """Fold a batch of points into the dataset statistics, advancing the watermark to ``through``"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+
+        known = db.scalar(
+            select(models.DatasetStatistics.columns).where(models.DatasetStatistics.dataset_id == dataset_id)
+        )
+        batch_columns = self._batch_columns(list(known or []), meta_data)
+        matrix = self._matrix(batch_columns, values, meta_data)
+        batch = self._batch_moments(matrix)
+
+        stats = self._load(db, dataset_id, for_update=True)
+        columns = list(stats.columns or [])
+        if batch_columns[:len(columns)] != columns:
+            # Another writer added columns in the meantime
+            batch_columns = self._batch_columns(columns, meta_data)
+            matrix = self._matrix(batch_columns, values, meta_data)
+            batch = self._batch_moments(matrix)
+
+        current = self._unpack(stats, len(batch_columns))
+        merged = self._merge(current, batch)
+        mins, maxs = self._extrema(stats, len(batch_columns))
+        # fmin/fmax skip NaN, so columns missing from the batch keep their extrema
+        mins = np.fmin(mins, np.fmin.reduce(matrix, axis=0, initial=np.inf))
+        maxs = np.fmax(maxs, np.fmax.reduce(matrix, axis=0, initial=-np.inf))
+
+        stats.columns = batch_columns
+        stats.row_count = (stats.row_count or 0) + len(values)
+        stats.moments = {name: merged[name].tolist() for name in _MOMENTS}
+        stats.moments["min"] = [None if math.isinf(v) else v for v in mins.tolist()]
+        stats.moments["max"] = [None if math.isinf(v) else v for v in maxs.tolist()]
+        if through is not None:
+            stats.folded_through = through
+        db.flush()
+
+    def remove(self, db: Session, dataset_id: int, values: Any, meta_data: Sequence[Optional[Dict[str, Any]]]) -> bool:
+        """Take deleted points back out of the dataset statistics"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return True
+
+        stats = db.execute(
+            select(models.DatasetStatistics)
+            .where(models.DatasetStatistics.dataset_id == dataset_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if stats is None:
+            return True
+        columns = list(stats.columns or [])
+        matrix = self._matrix(columns, values, meta_data)
+
+        remaining = self._subtract(self._unpack(stats, len(columns)), self._batch_moments(matrix))
+        mins, maxs = self._extrema(stats, len(columns))
+        low = np.fmin.reduce(matrix, axis=0, initial=np.inf)
+        high = np.fmax.reduce(matrix, axis=0, initial=-np.inf)
+
+        moments = stats.moments or {}
+        stats.row_count = max((stats.row_count or 0) - len(values), 0)
+        stats.moments = {name: remaining[name].tolist() for name in _MOMENTS}
+        stats.moments["min"] = moments.get("min", [])
+        stats.moments["max"] = moments.get("max", [])
+        db.flush()
+        return not ((np.isfinite(low) & (low <= mins)).any() or (np.isfinite(high) & (high >= maxs)).any())
+
+    def summary(self, db: Session, dataset_id: int) -> Optional[Dict[str, Any]]:
+        """Per-column statistics and the pairwise correlation matrix"""
+        stats = db.query(models.DatasetStatistics).filter(
+            models.DatasetStatistics.dataset_id == dataset_id
+        ).first()
+        if stats is None:
+            return None
+
+        columns = list(stats.columns or [])
+        moments = self._unpack(stats, len(columns))
+        mins, maxs = (stats.moments or {}).get("min", []), (stats.moments or {}).get("max", [])
+        row_count = stats.row_count or 0
+
+        summary = {}
+        for i, name in enumerate(columns):
+            count = int(moments["n"][i, i])
+            summary[name] = {
+                "count": count,
+                "mean": float(moments["mean"][i, i]) if count else None,
+                "std": math.sqrt(moments["m2"][i, i] / (count - 1)) if count > 1 else None,
+                "min": mins[i] if i < len(mins) else None,
+                "max": maxs[i] if i < len(maxs) else None,
+                "null_count": row_count - count,
+            }
+
+        correlations = {}
+        for i, a in enumerate(columns):
+            correlations[a] = {}
+            for j, b in enumerate(columns):
+                correlations[a][b] = self._correlation(moments, i, j)
+
+        return {
+            "dataset_id": dataset_id,
+            "row_count": row_count,
+            "summary": summary,
+            "correlations": correlations,
+        }
+
+    def rebuild(self, db: Session, dataset_id: int, batch_rows: int = 50000) -> models.DatasetStatistics:
+        """Recompute a dataset's statistics from the raw points up to its watermark"""
+        through = self.folded_through(db, dataset_id)
+        self.drop_dataset(db, dataset_id)
+        result = db.execute(
+            select(models.DataPoint.value, models.DataPoint.meta_data)
+            .where(models.DataPoint.dataset_id == dataset_id, models.DataPoint.id <= through)
+            .execution_options(yield_per=batch_rows)
+        )
+        for partition in result.partitions():
+            self.apply(db, dataset_id, [r.value for r in partition], [r.meta_data for r in partition])
+        stats = self._load(db, dataset_id, for_update=False)
+        stats.folded_through = through
+        db.execute(version_bump(dataset_id))
+        db.commit()
+        return stats
+
+    def folded_through(self, db: Session, dataset_id: int, for_update: bool = False) -> int:
+        """Last point id folded in; ``for_update`` creates and locks the row, serializing folds"""
+        if for_update:
+            return self._load(db, dataset_id, for_update=True).folded_through or 0
+        return db.scalar(
+            select(models.DatasetStatistics.folded_through).where(models.DatasetStatistics.dataset_id == dataset_id)
+        ) or 0
+
+    def drop_dataset(self, db: Session, dataset_id: int) -> None:
+        db.query(models.DatasetStatistics).filter(models.DatasetStatistics.dataset_id == dataset_id).delete()
+
+    def _load(self, db: Session, dataset_id: int, for_update: bool) -> models.DatasetStatistics:
+        stmt = dialect_insert(db, models.DatasetStatistics.__table__).values(
+            dataset_id=dataset_id, row_count=0, columns=[], moments={}, folded_through=0
+        ).on_conflict_do_nothing(index_elements=["dataset_id"])
+        db.execute(stmt)
+        query = select(models.DatasetStatistics).where(models.DatasetStatistics.dataset_id == dataset_id)
+        if for_update:
+            query = query.with_for_update()
+        return db.execute(query.execution_options(populate_existing=True)).scalar_one()
+
+    def _batch_columns(self, columns: List[str], meta_data: Sequence[Optional[Dict[str, Any]]]) -> List[str]:
+        """Known columns plus numeric meta_data keys first seen in this batch, up to the cap"""
+        columns = columns or ["value"]
+        known = set(columns)
+        limit = settings.statistics_max_columns
+        for meta in meta_data:
+            if not meta or len(columns) >= limit:
+                continue
+            for key, value in meta.items():
+                if key not in known and _is_number(value) and len(columns) < limit:
+                    columns.append(key)
+                    known.add(key)
+        return columns
+
+    def _matrix(self, columns: List[str], values: np.ndarray, meta_data: Sequence[Optional[Dict[str, Any]]]) -> np.ndarray:
+        """Points x columns float matrix, NaN where a column is missing or not numeric"""
+        matrix = np.full((len(values), len(columns)), np.nan)
+        matrix[:, 0] = values
+        index = {name: i for i, name in enumerate(columns) if i}
+        for row, meta in enumerate(meta_data):
+            if not meta:
+                continue
+            for key, value in meta.items():
+                i = index.get(key)
+                if i is not None and _is_number(value):
+                    matrix[row, i] = value
+        return matrix
+
+    def _batch_moments(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """Pairwise count, mean, M2 and co-moment of one batch"""
+        present = ~np.isnan(matrix)
+        mask = present.astype(np.float64)
+        # Shift by the column means first so the sums below do not cancel
+        counts = mask.sum(axis=0)
+        shift = np.where(counts > 0, np.where(present, matrix, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        centered = np.where(present, matrix - shift, 0.0)
+
+        n = mask.T @ mask
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(n > 0, (centered.T @ mask) / n, 0.0)
+        m2 = np.maximum((centered * centered).T @ mask - n * mean * mean, 0.0)
+        comoment = centered.T @ centered - n * mean * mean.T
+        return {"n": n, "mean": mean + shift[:, None], "m2": m2, "comoment": comoment}
+
+    def _merge(self, a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Chan et al. combination of two sets of pairwise moments"""
+        n = a["n"] + b["n"]
+        delta = b["mean"] - a["mean"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.where(n > 0, b["n"] / n, 0.0)
+        weight = a["n"] * share
+        mean = a["mean"] + delta * share
+        return {
+            "n": n,
+            "mean": mean,
+            "m2": a["m2"] + b["m2"] + delta * delta * weight,
+            "comoment": a["comoment"] + b["comoment"] + delta * delta.T * weight,
+        }
+
+    def _subtract(self, total: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Inverse of ``_merge``: the moments of ``total`` without the points of ``b``"""
+        n = total["n"] - b["n"]
+        empty = n <= 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(empty, 0.0, (total["n"] * total["mean"] - b["n"] * b["mean"]) / n)
+            weight = np.where(empty, 0.0, n * b["n"] / total["n"])
+        delta = b["mean"] - mean
+        return {
+            "n": np.where(empty, 0.0, n),
+            "mean": mean,
+            "m2": np.where(empty, 0.0, np.maximum(total["m2"] - b["m2"] - delta * delta * weight, 0.0)),
+            "comoment": np.where(empty, 0.0, total["comoment"] - b["comoment"] - delta * delta.T * weight),
+        }
+
+    def _unpack(self, stats: models.DatasetStatistics, size: int) -> Dict[str, np.ndarray]:
+        """Stored moment matrices, zero-padded to ``size`` columns"""
+        moments = stats.moments or {}
+        unpacked = {}
+        for name in _MOMENTS:
+            matrix = np.zeros((size, size))
+            stored = np.asarray(moments.get(name, []), dtype=np.float64)
+            if stored.size:
+                k = stored.shape[0]
+                matrix[:k, :k] = stored
+            unpacked[name] = matrix
+        return unpacked
+
+    def _extrema(self, stats: models.DatasetStatistics, size: int):
+        moments = stats.moments or {}
+        mins, maxs = np.full(size, np.inf), np.full(size, -np.inf)
+        for target, stored in ((mins, moments.get("min", [])), (maxs, moments.get("max", []))):
+            for i, v in enumerate(stored):
+                if v is not None:
+                    target[i] = v
+        return mins, maxs
+
+    def _correlation(self, moments: Dict[str, np.ndarray], i: int, j: int) -> Optional[float]:
+        """Pearson correlation over the points where both columns are present"""
+        if moments["n"][i, j] < 2:
+            return None
+        denominator = math.sqrt(moments["m2"][i, j] * moments["m2"][j, i])
+        if denominator == 0:
+            return None
+        return max(-1.0, min(1.0, float(moments["comoment"][i, j] / denominator)))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and math.isfinite(value)
+
+
+# Singleton instance
+statistics_service = StatisticsService()
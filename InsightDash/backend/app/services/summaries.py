@@ -0,0 +1,39 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.versioning import version_bump
+from ..models import models
+from .sketches import sketch_service
+from .statistics import statistics_service
+
+
+class SummaryService:
+    """Statistics and sketches folded in from data_points behind a per-dataset watermark"""
+
+    def fold(self, db: Session, dataset_id: int, batch_rows: int = 50000) -> int:
+        """Fold points past the watermark into statistics and sketches, one locked batch at a time"""
+        folded = 0
+        while True:
+            # The locked statistics row serializes concurrent folds of a dataset
+            through = statistics_service.folded_through(db, dataset_id, for_update=True)
+            rows = db.execute(
+                select(models.DataPoint.id, models.DataPoint.timestamp, models.DataPoint.value, models.DataPoint.meta_data)
+                .where(models.DataPoint.dataset_id == dataset_id, models.DataPoint.id > through)
+                .order_by(models.DataPoint.id)
+                .limit(batch_rows)
+            ).all()
+            if not rows:
+                db.commit()
+                return folded
+
+            values = [r.value for r in rows]
+            meta_data = [r.meta_data for r in rows]
+            sketch_service.apply(db, dataset_id, [r.timestamp for r in rows], values, meta_data)
+            statistics_service.apply(db, dataset_id, values, meta_data, through=rows[-1].id)
+            db.execute(version_bump(dataset_id))
+            db.commit()
+            folded += len(rows)
+
+
+# Singleton instance
+summary_service = SummaryService()
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from .ingest import ingest_service
+
+
+class GroupCommitBuffer:
+    """In-process group commit for single-point ingestion"""
+
+    def __init__(self):
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.group_commit_enabled
+
+    async def submit(self, point: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a point and wait until the batch holding it is committed"""
+        loop = asyncio.get_running_loop()
+        self._ensure_flusher(loop)
+
+        future = loop.create_future()
+        self._pending.append((point, future))
+        if len(self._pending) >= settings.group_commit_max_points:
+            self._wakeup.set()
+        return await future
+
+    def _ensure_flusher(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._wakeup = asyncio.Event()
+            self._flusher = None
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        delay = settings.group_commit_max_delay_ms / 1000
+        max_points = settings.group_commit_max_points
+
+        # Give the first point a chance to land before deciding to exit
+        await asyncio.sleep(0)
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            batch, self._pending = self._pending[:max_points], self._pending[max_points:]
+            try:
+                # Points that arrive while this batch is being written queue up
+                # for the next one.
+                rows = await loop.run_in_executor(None, self._write, [point for point, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), row in zip(batch, rows):
+                    if not future.done():
+                        future.set_result(row)
+                ingest_service.schedule_maintenance({row["dataset_id"] for row in rows})
+
+    def _write(self, points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            rows = ingest_service.write_points(db, points)
+            db.commit()
+            return rows
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Singleton instance
+write_buffer = GroupCommitBuffer()
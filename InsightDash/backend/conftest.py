@@ -0,0 +1,58 @@
+"""
+pytest setup for the unit tests: a throwaway SQLite database and segment directory
+
+Set before anything imports ``app``, so tests never touch insightdash.db.
+"""
+import os
+import tempfile
+import uuid
+
+_root = tempfile.mkdtemp(prefix="insightdash-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_root, 'test.db')}"
+os.environ["SEGMENT_STORAGE_PATH"] = os.path.join(_root, "segments")
+
+import pytest
+
+from app.core.database import SessionLocal, engine
+from app.models import models
+
+models.Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def dataset_id(db):
+    dataset = models.Dataset(name="test")
+    db.add(dataset)
+    db.commit()
+    return dataset.id
+
+
+@pytest.fixture
+def user(db):
+    name = uuid.uuid4().hex[:12]
+    user = models.User(email=f"{name}@example.com", username=name, hashed_password="x", role="admin")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(user):
+    """API client authenticated as ``user``; the app's lifespan tasks are not started"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from app.core.security import create_access_token
+
+    client = TestClient(main.app)
+    client.headers["Authorization"] = "Bearer " + create_access_token({"sub": user.username})
+    return client
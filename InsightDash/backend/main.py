@@ -1,19 +1,40 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1 import api_router
-from app.core.database import engine
+from app.core.database import async_engine, engine, pool_status
+from app.core.dependencies import get_admin_user
 from app.models import models
+from app.services.forecast_jobs import forecast_jobs
+from app.services.retention import retention_service
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    compactor = asyncio.create_task(retention_service.run()) if settings.retention_enabled else None
+    await asyncio.to_thread(forecast_jobs.recover)
+    yield
+    await forecast_jobs.shutdown()
+    if compactor is not None:
+        compactor.cancel()
+        with suppress(asyncio.CancelledError):
+            await compactor
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
     description="A dynamic dashboard for visualizing complex datasets with real-time updates and predictive insights",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -23,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include API routes
@@ -46,3 +68,9 @@ async def health_check():
         "environment": settings.environment,
         "version": settings.version
     }
+
+
+@app.get("/health/database")
+async def database_health(current_user: models.User = Depends(get_admin_user)):
+    """Connection pool occupancy and checkout wait telemetry (admins only)"""
+    return pool_status()
@@ -0,0 +1,67 @@
+"""
+Checks for server-side bucketed aggregation over raw points and rollups
+
+Needs the throwaway database from conftest.py: pytest test_aggregation.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import models
+from app.services.aggregation import aggregation_service
+from app.services.meta_query import meta_query_service
+from app.services.rollups import rollup_service
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def points(db, dataset_id):
+    readings = [1.0, "n/a", 3.0, None, True, 6.0]
+    rows = [
+        {
+            "dataset_id": dataset_id,
+            "timestamp": START + timedelta(minutes=20 * i),
+            "value": float(i),
+            "meta_data": {"load": reading, "region": "north" if i % 2 else "south"},
+        }
+        for i, reading in enumerate(readings)
+    ]
+    db.execute(insert(models.DataPoint.__table__), rows)
+    rollup_service.apply(db, dataset_id, [r["timestamp"] for r in rows], [r["value"] for r in rows])
+    rollup_service.mark_complete(db, dataset_id)
+    db.commit()
+
+
+def test_meta_columns_skip_non_numeric_values(db, dataset_id, points):
+    result = aggregation_service.aggregate(
+        db, dataset_id, 3600, aggregates=("count", "sum", "max"), columns=("value", "load")
+    )
+    assert result["source"] == "raw"
+    first, second = (bucket["columns"] for bucket in result["buckets"])
+    assert first["value"] == {"count": 3, "sum": 3.0, "max": 2.0}
+    assert first["load"] == {"count": 2, "sum": 4.0, "max": 3.0}
+    assert second["load"] == {"count": 1, "sum": 6.0, "max": 6.0}
+
+
+def test_value_only_requests_use_rollups(db, dataset_id, points):
+    rolled = aggregation_service.aggregate(db, dataset_id, 7200, aggregates=("count", "avg"))
+    assert rolled["source"] == "rollups"
+    assert rolled["buckets"][0]["columns"]["value"] == {"count": 6, "avg": 2.5}
+
+    # Predicates need the raw rows, and give the same numbers for a matching subset
+    predicates = meta_query_service.parse_predicates(["region=north"])
+    raw = aggregation_service.aggregate(db, dataset_id, 7200, aggregates=("count", "avg"), predicates=predicates)
+    assert raw["source"] == "raw"
+    assert raw["buckets"][0]["columns"]["value"] == {"count": 3, "avg": 3.0}
+
+
+def test_rejects_bad_requests(db, dataset_id):
+    with pytest.raises(ValueError):
+        aggregation_service.aggregate(db, dataset_id, 60, aggregates=("median",))
+    with pytest.raises(ValueError):
+        aggregation_service.aggregate(db, dataset_id, 60, columns=("load\"') --",))
+    with pytest.raises(ValueError):
+        aggregation_service.parse_interval("0m")
+    assert aggregation_service.parse_interval("15m") == 900
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Checks for the ARIMA order search: the criterion picks the winner, the
+time budget stops it, and a broken process pool is shut down and replaced
+
+Runs without a server: python test_arima_search.py (or pytest)
+"""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.forecast import ForecastService
+
+# Keep the order search in-process
+settings.forecast_arima_workers = 1
+
+
+def make_values(n=150, seed=3):
+    rng = np.random.default_rng(seed)
+    values = np.zeros(n)
+    for i in range(2, n):
+        values[i] = 0.5 * values[i - 1] - 0.3 * values[i - 2] + rng.normal(0, 1)
+    return 50 + values
+
+
+class RecordingService(ForecastService):
+    """Keeps every candidate result the search sees"""
+
+    def __init__(self):
+        super().__init__()
+        self.fitted = []
+
+    def _fit_candidates(self, values, candidates, deadline):
+        results = super()._fit_candidates(values, candidates, deadline)
+        self.fitted.extend(r for r in results if r is not None)
+        return results
+
+
+class BrokenPool:
+    """Stands in for a ProcessPoolExecutor whose workers died"""
+
+    def __init__(self):
+        self.shutdown_calls = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_calls.append((wait, cancel_futures))
+
+
+def test_best_order_minimizes_criterion():
+    values = make_values()
+    for criterion in ("aic", "bic"):
+        settings.forecast_arima_criterion = criterion
+        try:
+            service = RecordingService()
+            search = service._arima_order_search(values)
+        finally:
+            settings.forecast_arima_criterion = "aic"
+        assert search["criterion"] == criterion
+        assert search["evaluated"] >= len(service.fitted) > 1
+        assert search["best"][criterion] == min(r[criterion] for r in service.fitted)
+
+
+def test_time_budget_stops_search():
+    values = make_values()
+    budget = settings.forecast_arima_time_budget_seconds
+    settings.forecast_arima_time_budget_seconds = 0
+    try:
+        service = ForecastService()
+        search = service._arima_order_search(values)
+        assert search["best"] is None and search["evaluated"] == 0
+
+        # With nothing fitted the forecast falls back to linear regression
+        series = pd.Series(values, index=pd.date_range("2024-01-01", periods=len(values), freq="D"))
+        result = service._arima_forecast(series, 5)
+        assert result["accuracy_metrics"]["fallback"] == "linear_regression"
+        assert len(result["predictions"]) == 5
+    finally:
+        settings.forecast_arima_time_budget_seconds = budget
+
+
+def test_broken_pool_is_shut_down_and_replaced():
+    service = ForecastService()
+    broken = BrokenPool()
+    service._search_pool = broken
+    settings.forecast_arima_workers = 2
+    try:
+        results = service._fit_candidates(make_values(), [((1, 0, 0), (0, 0, 0, 0), "c")], float("inf"))
+        assert results == []
+        assert broken.shutdown_calls == [(False, True)]
+        assert service._search_pool is None
+
+        replacement = service._pool()
+        try:
+            assert replacement is not None and replacement is not broken
+        finally:
+            replacement.shutdown()
+    finally:
+        settings.forecast_arima_workers = 1
+
+
+if __name__ == "__main__":
+    for test in (test_best_order_minimizes_criterion, test_time_budget_stops_search,
+                 test_broken_pool_is_shut_down_and_replaced):
+        test()
+        print(f"{test.__name__}: ok")
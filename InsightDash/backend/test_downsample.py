@@ -0,0 +1,116 @@
+"""
+Checks for LTTB/min-max downsampling and timezone-aware series bounds
+
+Needs the throwaway database from conftest.py: pytest test_downsample.py
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.core.timeutils import naive_utc
+from app.models import models
+from app.services.downsample import downsample_service
+from app.services.rollups import ROLLUP_BUCKETS, rollup_service
+from app.services.sketches import sketch_service
+
+START = datetime(2024, 1, 1)
+PLUS_TWO = timezone(timedelta(hours=2))
+
+
+def reference_lttb(x, y, max_points):
+    """Textbook LTTB, one point at a time, over the same bucket edges"""
+    n = len(x)
+    x = [float(v - x[0]) for v in x]
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = [0]
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = int(edges[i]), int(edges[i + 1])
+        if i + 2 < len(edges):
+            nxt = range(int(edges[i + 1]), int(edges[i + 2]))
+            avg_x = sum(x[j] for j in nxt) / len(nxt)
+            avg_y = sum(y[j] for j in nxt) / len(nxt)
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(11)
+    n = 5000
+    # Irregular nanosecond timestamps in 2024, a trend, a spike and noise
+    x = np.cumsum(rng.integers(1, 5, n)) * 1_000_000_000 + 1_704_067_200_000_000_000
+    y = np.sin(np.arange(n) / 200) * 10 + rng.normal(0, 1, n)
+    y[3210] = 80.0
+
+    for max_points in (3, 10, 250, 999):
+        index = downsample_service.lttb(x, y, max_points)
+        assert len(index) == max_points
+        assert index[0] == 0 and index[-1] == n - 1
+        assert np.all(np.diff(index) > 0)
+        assert index.tolist() == reference_lttb(x, y.tolist(), max_points)
+    assert 3210 in downsample_service.lttb(x, y, 250)
+
+
+def test_lttb_short_series_untouched():
+    x = np.arange(10)
+    y = np.arange(10.0)
+    assert downsample_service.lttb(x, y, 10).tolist() == list(range(10))
+    assert downsample_service.lttb(x, y, 2).tolist() == list(range(10))
+
+
+def test_minmax_keeps_extremes():
+    y = np.sin(np.arange(1000) / 30.0)
+    y[417] = 9.0
+    index = downsample_service.minmax(np.arange(1000), y, 20)
+    assert len(index) <= 20 and np.all(np.diff(index) > 0)
+    assert 417 in index and int(np.argmin(y)) in index
+
+
+def test_naive_utc():
+    assert naive_utc(None) is None
+    naive = datetime(2024, 6, 1, 8, 0)
+    assert naive_utc(naive) is naive
+    assert naive_utc(datetime(2024, 6, 1, 8, 0, tzinfo=timezone.utc)) == naive
+    assert naive_utc(datetime(2024, 6, 1, 3, 0, tzinfo=timezone(timedelta(hours=-5)))) == naive
+
+
+def shifted(value):
+    """The same instant as a naive UTC ``value``, expressed at UTC+2"""
+    return (value + timedelta(hours=2)).replace(tzinfo=PLUS_TWO)
+
+
+def test_aware_bounds(db, dataset_id):
+    rows = [
+        {"dataset_id": dataset_id, "timestamp": START + timedelta(hours=i), "value": float(i), "meta_data": {"load": i}}
+        for i in range(72)
+    ]
+    db.execute(insert(models.DataPoint.__table__), rows)
+    timestamps = [r["timestamp"] for r in rows]
+    values = [r["value"] for r in rows]
+    rollup_service.apply(db, dataset_id, timestamps, values)
+    sketch_service.apply(db, dataset_id, timestamps, values, [r["meta_data"] for r in rows])
+    db.commit()
+
+    lo, hi = START + timedelta(hours=30), START + timedelta(hours=40)
+    series = downsample_service.series(db, dataset_id, shifted(lo), shifted(hi), max_points=1000)
+    assert [p["value"] for p in series["points"]] == list(np.arange(30.0, 41.0))
+
+    hours = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["hour"], shifted(lo), shifted(hi))
+    assert hours == rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["hour"], lo, hi)
+    assert len(hours) == 11
+
+    # The end bound falls on the second day's midnight in UTC but not at UTC+2
+    day_two = START + timedelta(days=1)
+    sketches = sketch_service.query(db, dataset_id, START, shifted(day_two), columns=["value"])
+    assert sketches == sketch_service.query(db, dataset_id, START, day_two, columns=["value"])
+    assert sketches["columns"]["value"]["count"] == 48
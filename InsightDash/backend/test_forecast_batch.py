@@ -0,0 +1,110 @@
+"""
+Checks for batch forecasting: chunking by series and the NDJSON stream
+
+Needs the throwaway database from conftest.py: pytest test_forecast_batch.py
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.models import models
+from app.services import forecast_jobs as forecast_jobs_module
+from app.services.forecast_jobs import _batch_chunks, forecast_jobs
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    # Fits run in the event loop's thread pool instead of spawned workers
+    monkeypatch.setattr(settings, "forecast_workers", 0)
+    monkeypatch.setattr(settings, "forecast_model_cache_enabled", False)
+
+
+def add_points(db, dataset_id, count):
+    db.execute(insert(models.DataPoint.__table__), [
+        {"dataset_id": dataset_id, "timestamp": datetime(2024, 1, 1) + timedelta(days=i), "value": 3.0 * i}
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def collect(items, failures=()):
+    async def scenario():
+        return [json.loads(line) async for line in forecast_jobs.stream_batch(items, failures)]
+    return asyncio.run(scenario())
+
+
+def test_chunks_keep_a_series_together():
+    items = [
+        (0, 1, "value", "arima", 5),
+        (1, 2, "value", "arima", 5),
+        (2, 1, "value", "linear_regression", 5),
+        (3, 1, "temp", "arima", 5),
+        (4, 3, "value", "arima", 5),
+    ]
+    chunks = _batch_chunks(items, 2)
+    assert [[item[0] for item in chunk] for chunk in chunks] == [[0, 2, 1], [3, 4]]
+    assert [item[0] for chunk in _batch_chunks(items, 0) for item in chunk] == [0, 2, 1, 3, 4]
+    assert _batch_chunks([], 50) == []
+
+
+def test_stream_reports_every_item(db, dataset_id, monkeypatch):
+    monkeypatch.setattr(settings, "forecast_batch_load_series", 1)
+    monkeypatch.setattr(settings, "forecast_batch_concurrency", 1)
+    add_points(db, dataset_id, 30)
+    empty = models.Dataset(name="empty")
+    db.add(empty)
+    db.commit()
+
+    rejected = {"index": 0, "dataset_id": 0, "target_column": "value", "status": "failed", "error": "Dataset not found"}
+    items = [
+        (1, dataset_id, "value", "linear_regression", 5),
+        (2, empty.id, "value", "linear_regression", 5),
+        (3, dataset_id, "value", "moving_average", 4),
+    ]
+    lines = collect(items, [rejected])
+    assert lines[0] == rejected
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == [0, 1, 2, 3]
+
+    assert by_index[1]["status"] == by_index[3]["status"] == "completed"
+    assert len(by_index[1]["forecast"]["forecast_data"]) == 5
+    assert by_index[3]["forecast"]["model_type"] == "moving_average"
+    assert (by_index[2]["status"], by_index[2]["error"]) == ("failed", "No data points found for dataset")
+    saved = db.query(models.Forecast).filter(models.Forecast.dataset_id == dataset_id).count()
+    assert saved == 2
+
+
+def test_load_failure_fails_its_chunk(db, dataset_id, monkeypatch):
+    def broken(db, series):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(forecast_jobs_module, "load_forecast_batch", broken)
+    lines = collect([(0, dataset_id, "value", "arima", 5), (1, dataset_id, "temp", "arima", 5)])
+    assert [(line["index"], line["status"]) for line in lines] == [(0, "failed"), (1, "failed")]
+    assert lines[0]["error"] == "Loading data failed: database is locked"
+
+
+def test_batch_endpoint_streams_rejections(client):
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "batch"}).json()["id"]
+    for i in range(20):
+        client.post(f"/api/v1/datasets/{dataset_id}/data", json={"timestamp": f"2024-01-{i + 1:02d}T00:00:00", "value": i})
+
+    response = client.post("/api/v1/analytics/forecast/batch", json={"items": [
+        {"dataset_id": dataset_id, "model_type": "linear_regression", "periods": 3},
+        {"dataset_id": dataset_id + 1000},
+        {"dataset_id": dataset_id, "periods": 0},
+        {"dataset_id": dataset_id, "target_column": "bad key!"},
+    ]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    assert lines[0]["status"] == "completed"
+    assert lines[1]["error"] == "Dataset not found"
+    assert lines[2]["error"] == "periods must be between 1 and 365"
+    assert lines[3]["status"] == "failed"
+
+    assert client.post("/api/v1/analytics/forecast/batch", json={"items": []}).status_code == 400
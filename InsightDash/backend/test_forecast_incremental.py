@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Checks that forecasts carried forward from a cached model_state match a
+fit over the whole series
+
+Runs without a server: python test_forecast_incremental.py (or pytest)
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+
+from app.core.config import settings
+from app.services.forecast import forecast_service
+
+# Keep the order search in-process
+settings.forecast_arima_workers = 1
+
+
+def make_series(n, seed=5):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n, freq="D")
+    noise = np.zeros(n)
+    for i in range(1, n):
+        noise[i] = 0.6 * noise[i - 1] + rng.normal(0, 1)
+    return pd.Series(1000 + 0.5 * np.arange(n) + noise, index=index)
+
+
+def extend(model_type, series, split, periods=14):
+    """Fit on the first ``split`` points, then forecast the whole series from that state"""
+    first = forecast_service.models[model_type](series.iloc[:split], periods)
+    return first, forecast_service.models[model_type](series, periods, state=first["state"])
+
+
+def test_linear_regression_incremental_matches_refit():
+    series = make_series(300)
+    _, incremental = extend("linear_regression", series, 220)
+    full = forecast_service.models["linear_regression"](series, 14)
+
+    assert incremental["accuracy_metrics"]["fit"] == "incremental"
+    assert full["accuracy_metrics"]["fit"] == "full"
+    assert np.allclose(incremental["predictions"], full["predictions"], rtol=1e-10)
+    assert np.allclose(incremental["confidence_interval"]["lower"], full["confidence_interval"]["lower"], rtol=1e-10)
+    for metric in ("rmse", "mae", "r2_score"):
+        assert np.isclose(incremental["accuracy_metrics"][metric], full["accuracy_metrics"][metric], rtol=1e-8)
+
+
+def test_moving_average_incremental_matches_refit():
+    series = make_series(300)
+    _, incremental = extend("moving_average", series, 220)
+    full = forecast_service.models["moving_average"](series, 14)
+
+    assert incremental["accuracy_metrics"]["fit"] == "incremental"
+    assert np.allclose(incremental["predictions"], full["predictions"], rtol=1e-12)
+    assert np.allclose(incremental["confidence_interval"]["upper"], full["confidence_interval"]["upper"], rtol=1e-12)
+    for metric in ("rmse", "mae"):
+        assert np.isclose(incremental["accuracy_metrics"][metric], full["accuracy_metrics"][metric], rtol=1e-9)
+    assert incremental["state"]["errors"] == full["state"]["errors"]
+
+
+def test_changed_prefix_refits():
+    series = make_series(120)
+    first = forecast_service.models["moving_average"](series.iloc[:100], 5)
+    edited = series.copy()
+    edited.iloc[10] += 1.0
+    again = forecast_service.models["moving_average"](edited, 5, state=first["state"])
+    assert again["accuracy_metrics"]["fit"] == "full"
+
+
+def test_arima_incremental_matches_filter_over_full_series():
+    """Same parameters filtered over the whole series give the same forecast"""
+    series = make_series(200)
+    first, incremental = extend("arima", series, 190)
+    state = first["state"]
+    assert incremental["accuracy_metrics"]["fit"] == "incremental"
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = ARIMA(
+            series.to_numpy(), order=tuple(state["order"]),
+            seasonal_order=tuple(state["seasonal_order"]), trend=state["trend"],
+        )
+        prediction = model.filter(np.asarray(state["params"])).get_forecast(steps=14)
+    assert np.allclose(incremental["predictions"], prediction.predicted_mean, rtol=1e-8, atol=1e-8)
+    conf_int = np.asarray(prediction.conf_int())
+    assert np.allclose(incremental["confidence_interval"]["lower"], conf_int[:, 0], rtol=1e-8, atol=1e-6)
+    assert np.allclose(incremental["confidence_interval"]["upper"], conf_int[:, 1], rtol=1e-8, atol=1e-6)
+
+
+if __name__ == "__main__":
+    for test in (test_linear_regression_incremental_matches_refit, test_moving_average_incremental_matches_refit,
+                 test_changed_prefix_refits, test_arima_incremental_matches_filter_over_full_series):
+        test()
+        print(f"{test.__name__}: ok")
@@ -0,0 +1,102 @@
+"""
+Checks for the forecast job queue: lifecycle, failures, cancellation and recovery
+
+Needs the throwaway database from conftest.py: pytest test_forecast_jobs.py
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.models import models
+from app.services.forecast_jobs import forecast_jobs
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    # Fits run in the event loop's thread pool instead of spawned workers
+    monkeypatch.setattr(settings, "forecast_workers", 0)
+    monkeypatch.setattr(settings, "forecast_model_cache_enabled", False)
+
+
+def add_points(db, dataset_id, count):
+    db.execute(insert(models.DataPoint.__table__), [
+        {"dataset_id": dataset_id, "timestamp": datetime(2024, 1, 1) + timedelta(days=i), "value": 2.0 * i + 1}
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def submit(db, dataset_id, user, model_type="linear_regression"):
+    return forecast_jobs.submit(db, dataset_id, user.id, "value", model_type, 5)
+
+
+def test_job_completes_and_notifies(db, dataset_id, user):
+    add_points(db, dataset_id, 30)
+    job = submit(db, dataset_id, user)
+    assert job.status == "queued" and job.forecast is None
+
+    notified = []
+
+    async def on_complete(notified_dataset, forecast):
+        notified.append((notified_dataset, forecast["job_id"]))
+
+    asyncio.run(forecast_jobs._execute(job.id, on_complete))
+    done = forecast_jobs.get(db, job.id)
+    db.refresh(done)
+    assert done.status == "completed" and done.error is None
+    assert done.started_at is not None and done.finished_at >= done.started_at
+    assert len(done.forecast.forecast_data) == 5
+    assert notified == [(dataset_id, job.id)]
+
+
+def test_job_without_data_fails(db, dataset_id, user):
+    job = submit(db, dataset_id, user)
+    asyncio.run(forecast_jobs._execute(job.id, None))
+    failed = forecast_jobs.get(db, job.id)
+    db.refresh(failed)
+    assert failed.status == "failed"
+    assert failed.error == "No data points found for dataset"
+    assert failed.forecast_id is None
+
+
+def test_shutdown_cancels_scheduled_jobs(db, dataset_id, user, monkeypatch):
+    add_points(db, dataset_id, 30)
+    job = submit(db, dataset_id, user)
+    started = asyncio.Event()
+
+    async def never_finishes(*args):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(forecast_jobs, "run", never_finishes)
+
+    async def scenario():
+        forecast_jobs.schedule(job.id)
+        await asyncio.wait_for(started.wait(), timeout=10)
+        await forecast_jobs.shutdown()
+
+    asyncio.run(scenario())
+    cancelled = forecast_jobs.get(db, job.id)
+    db.refresh(cancelled)
+    assert (cancelled.status, cancelled.error) == ("failed", "Cancelled")
+
+
+def test_recover_fails_interrupted_jobs(db, dataset_id, user):
+    queued = submit(db, dataset_id, user)
+    running = submit(db, dataset_id, user)
+    forecast_jobs._update(running.id, status="running")
+    finished = submit(db, dataset_id, user)
+    forecast_jobs._update(finished.id, status="completed")
+
+    assert forecast_jobs.recover() >= 2
+    statuses = {
+        job.id: (job.status, job.error)
+        for job in db.query(models.ForecastJob).filter(
+            models.ForecastJob.id.in_([queued.id, running.id, finished.id])
+        ).populate_existing()
+    }
+    assert statuses[queued.id] == statuses[running.id] == ("failed", "Interrupted by server restart")
+    assert statuses[finished.id] == ("completed", None)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Checks that the vectorized forecast kernels give the same answers for a
+2-D batch as row by row, and match a plain rolling mean
+
+Runs without a server: python test_forecast_kernels.py (or pytest)
+"""
+import numpy as np
+import pandas as pd
+
+from app.services.forecast import linear_regression_forecast, moving_average_forecast
+
+
+def test_kernels_2d_match_1d():
+    rng = np.random.default_rng(12)
+    batch = rng.normal(0, 1, (6, 80)).cumsum(axis=1) + rng.uniform(-1e6, 1e6, (6, 1))
+
+    lr = linear_regression_forecast(batch, 10)
+    ma = moving_average_forecast(batch, 10, window=5)
+    for row, values in enumerate(batch):
+        lr_one = linear_regression_forecast(values, 10)
+        ma_one = moving_average_forecast(values, 10, window=5)
+        for key in ("predictions", "lower", "upper", "rmse", "mae", "r2"):
+            assert np.allclose(lr[key][row], lr_one[key], rtol=1e-10), key
+        for key in ("predictions", "lower", "upper", "rmse", "mae", "sse", "sae", "first_error"):
+            assert np.allclose(ma[key][row], ma_one[key], rtol=1e-10), key
+
+
+def test_moving_average_kernel_matches_rolling_mean():
+    values = 1e9 + np.random.default_rng(13).normal(0, 1, 500)
+    fit = moving_average_forecast(values, 3, window=7)
+    rolling = pd.Series(values).rolling(7).mean().to_numpy()[6:]
+    errors = values[6:] - rolling
+    assert np.allclose(fit["predictions"], rolling[-1], rtol=0, atol=1e-6)
+    assert np.isclose(fit["sse"], errors @ errors, rtol=1e-6)
+
+
+if __name__ == "__main__":
+    for test in (test_kernels_2d_match_1d, test_moving_average_kernel_matches_rolling_mean):
+        test()
+        print(f"{test.__name__}: ok")
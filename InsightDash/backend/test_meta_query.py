@@ -0,0 +1,97 @@
+"""
+Checks for meta_data filters and the per-dataset expression indexes behind them
+
+Needs the throwaway database from conftest.py: pytest test_meta_query.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, text
+
+from app.models import models
+from app.services.meta_query import meta_query_service
+
+
+def add_points(db, dataset_id, count):
+    db.execute(insert(models.DataPoint.__table__), [
+        {
+            "dataset_id": dataset_id,
+            "timestamp": datetime(2024, 1, 1) + timedelta(minutes=i),
+            "value": float(i),
+            "meta_data": {"region": f"r{i % 20}", "load": i if i % 10 else "n/a"},
+        }
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def index_names(db):
+    return {
+        name for (name,) in db.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_data_points_meta_%'")
+        )
+    }
+
+
+def plan(db, query):
+    compiled = query.compile(db.get_bind())
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    return " ".join(row[3] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params))
+
+
+def matching_ids(db, dataset_id, *filters):
+    predicates = meta_query_service.parse_predicates(filters)
+    return select(models.DataPoint.id).where(
+        models.DataPoint.dataset_id == dataset_id,
+        *meta_query_service.where_clauses("sqlite", predicates),
+    )
+
+
+def test_parse_predicates():
+    region, load, quoted = meta_query_service.parse_predicates(["region = north", "load>=2.5", "code='7'"])
+    assert (region.key, region.op, region.value) == ("region", "=", "north")
+    assert (load.op, load.value) == (">=", 2.5)
+    assert quoted.value == "7"
+    for bad in ("region>north", "timestamp>1", "bad key=1", "value=abc", "no operator"):
+        with pytest.raises(ValueError):
+            meta_query_service.parse_predicates([bad])
+
+
+def test_numeric_filters_skip_strings(db, dataset_id):
+    add_points(db, dataset_id, 100)
+    ids = db.execute(matching_ids(db, dataset_id, "load>85")).scalars().all()
+    assert len(ids) == 13  # 86..99 without 90, stored as "n/a"
+
+
+def test_indexes_belong_to_one_dataset(db, dataset_id):
+    other = models.Dataset(name="other")
+    db.add(other)
+    db.commit()
+    add_points(db, dataset_id, 2000)
+    add_points(db, other.id, 50)
+
+    mine = meta_query_service.create_index(db, dataset_id, "region")
+    theirs = meta_query_service.create_index(db, other.id, "region")
+    numbers = meta_query_service.create_index(db, dataset_id, "load", "number")
+    assert meta_query_service.create_index(db, dataset_id, "region").id == mine.id
+    assert mine.index_name == f"ix_data_points_meta_{dataset_id}_region"
+    assert numbers.index_name == f"ix_data_points_meta_{dataset_id}_load_num"
+    assert {mine.index_name, theirs.index_name, numbers.index_name} <= index_names(db)
+
+    assert mine.index_name in plan(db, matching_ids(db, dataset_id, "region=r3"))
+    assert numbers.index_name in plan(db, matching_ids(db, dataset_id, "load>1990"))
+
+    # Dropping one dataset's index or the dataset leaves the other's in place
+    dropped = {mine.index_name, numbers.index_name}
+    meta_query_service.drop_index(db, mine)
+    meta_query_service.drop_dataset(db, dataset_id)
+    db.commit()
+    assert index_names(db) & dropped == set()
+    assert theirs.index_name in index_names(db)
+
+
+def test_long_keys_get_distinct_names():
+    first = meta_query_service.index_for("postgresql", 123456, "k" * 47 + "a", "number")
+    second = meta_query_service.index_for("postgresql", 123456, "k" * 47 + "b", "number")
+    assert len(first.name) <= 63 and len(second.name) <= 63
+    assert first.name != second.name
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Checks for keyset cursors, cursor paging and time ranges of the dataset data endpoint
+
+Cursor tests run as a script too; the endpoint test needs pytest (conftest.py)
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.timeutils import naive_utc
+
+
+def test_cursor_round_trip():
+    for timestamp in (
+        datetime(2024, 3, 1, 12, 30),
+        datetime(2024, 3, 1, 12, 30, 0, 123456),
+        datetime(1999, 12, 31, 23, 59, 59, 999999),
+    ):
+        for point_id in (1, 42, 2**40):
+            cursor = encode_cursor(timestamp, point_id)
+            assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+            assert decode_cursor(cursor) == (timestamp, point_id)
+
+
+def test_cursor_from_aware_timestamp():
+    aware = datetime(2024, 3, 1, 14, 30, 0, 500, tzinfo=timezone(timedelta(hours=2)))
+    decoded = decode_cursor(encode_cursor(naive_utc(aware), 7))
+    assert decoded == (datetime(2024, 3, 1, 12, 30, 0, 500), 7)
+
+
+def test_malformed_cursor():
+    for cursor in ("", "not-a-cursor", "e30", encode_cursor(datetime(2024, 1, 1), 1)[:-3]):
+        assert decode_cursor(cursor) is None
+
+
+def test_cursor_pages_cover_shared_timestamps(client):
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "paging"}).json()["id"]
+    # Three points per timestamp, so page boundaries fall inside ties
+    for i in range(20):
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/data",
+            json={"timestamp": f"2024-01-01T00:00:{i // 3:02d}", "value": i},
+        )
+
+    for order in ("asc", "desc"):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 4, "order": order, **({"cursor": cursor} if cursor else {})}
+            response = client.get(f"/api/v1/datasets/{dataset_id}/data", params=params)
+            assert response.status_code == 200
+            seen.extend(point["value"] for point in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        expected = [float(i) for i in range(20)]
+        assert seen == (expected if order == "asc" else expected[::-1])
+
+    # Half a keyset position would skip the rest of a tie
+    response = client.get(f"/api/v1/datasets/{dataset_id}/data", params={"after_ts": "2024-01-01T00:00:01"})
+    assert response.status_code == 400
+
+
+def test_time_range_over_aware_timestamps(client):
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "ranges"}).json()["id"]
+    # 10:00 UTC written three ways, then one point per hour after it
+    for i, stamp in enumerate(("2024-01-01T10:00:00Z", "2024-01-01T12:00:00+02:00", "2024-01-01T10:00:00")):
+        client.post(f"/api/v1/datasets/{dataset_id}/data", json={"timestamp": stamp, "value": i})
+    for hour in range(11, 14):
+        client.post(f"/api/v1/datasets/{dataset_id}/data", json={"timestamp": f"2024-01-01T{hour}:00:00Z", "value": hour})
+
+    response = client.get(
+        f"/api/v1/datasets/{dataset_id}/data",
+        params={"start": "2024-01-01T12:00:00+02:00", "end": "2024-01-01T07:00:00-05:00"},
+    )
+    assert response.status_code == 200
+    points = response.json()
+    assert [p["value"] for p in points] == [0.0, 1.0, 2.0, 11.0, 12.0]
+    assert {p["timestamp"] for p in points[:3]} == {"2024-01-01T10:00:00"}
+
+
+if __name__ == "__main__":
+    for test in (test_cursor_round_trip, test_cursor_from_aware_timestamp, test_malformed_cursor):
+        test()
+        print(f"{test.__name__}: ok")
@@ -0,0 +1,101 @@
+"""
+Checks for retention policies: validation and compaction into rollups
+
+Needs the throwaway database from conftest.py: pytest test_retention.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app.models import models
+from app.services.ingest import ingest_service
+from app.services.retention import retention_service
+from app.services.rollups import ROLLUP_BUCKETS, rollup_service
+from app.services.statistics import statistics_service
+
+START = datetime(2024, 1, 1)
+NOW = datetime(2024, 1, 11, 12)
+
+
+def add_hourly_points(db, dataset_id, days):
+    points = [
+        {"dataset_id": dataset_id, "timestamp": START + timedelta(hours=i), "value": float(i % 24), "meta_data": None}
+        for i in range(days * 24)
+    ]
+    ingest_service.write_points(db, points)
+    db.commit()
+    return points
+
+
+def count_points(db, dataset_id):
+    return db.query(func.count(models.DataPoint.id)).filter(models.DataPoint.dataset_id == dataset_id).scalar()
+
+
+def test_policy_validation(db, dataset_id):
+    with pytest.raises(ValueError):
+        retention_service.set_policy(db, dataset_id, 0)
+    with pytest.raises(ValueError):
+        retention_service.set_policy(db, dataset_id, 7, rollup_bucket="week")
+    with pytest.raises(ValueError):
+        retention_service.set_policy(db, dataset_id, 7, rollup_retention_days=3)
+
+    policy = retention_service.set_policy(db, dataset_id, 7)
+    replaced = retention_service.set_policy(db, dataset_id, 14, "day", 90)
+    assert replaced.id == policy.id
+    assert (replaced.raw_retention_days, replaced.rollup_bucket, replaced.rollup_retention_days) == (14, "day", 90)
+    assert retention_service.compact_dataset(db, dataset_id + 1000) is None
+
+
+def test_compaction_keeps_history_in_rollups(db, dataset_id):
+    rollup_service.mark_complete(db, dataset_id)
+    add_hourly_points(db, dataset_id, 10)
+    policy = retention_service.set_policy(db, dataset_id, 3, rollup_bucket="hour")
+
+    result = retention_service.compact(db, policy, now=NOW)
+    raw_cutoff = datetime(2024, 1, 8)
+    assert result["raw_cutoff"] == raw_cutoff
+    assert result["points_deleted"] == 7 * 24
+    assert count_points(db, dataset_id) == 3 * 24
+    assert db.query(func.min(models.DataPoint.timestamp)).filter(
+        models.DataPoint.dataset_id == dataset_id
+    ).scalar() == raw_cutoff
+
+    # Minute buckets go with the raw points; hour and day buckets still cover everything
+    minutes = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["minute"])
+    assert minutes[0]["bucket_start"] == raw_cutoff
+    hours = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["hour"])
+    assert sum(b["count"] for b in hours) == 10 * 24
+    assert statistics_service.summary(db, dataset_id)["row_count"] == 3 * 24
+
+    db.refresh(policy)
+    assert policy.points_compacted == 7 * 24 and policy.last_compacted_at == NOW
+
+    # A second run has nothing left to do
+    assert retention_service.compact(db, policy, now=NOW)["points_deleted"] == 0
+
+
+def test_rollup_retention_window(db, dataset_id):
+    rollup_service.mark_complete(db, dataset_id)
+    add_hourly_points(db, dataset_id, 10)
+    policy = retention_service.set_policy(db, dataset_id, 2, rollup_bucket="day", rollup_retention_days=5)
+
+    retention_service.compact(db, policy, now=NOW)
+    hours = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["hour"])
+    days = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["day"])
+    assert hours[0]["bucket_start"] == datetime(2024, 1, 9)
+    assert days[0]["bucket_start"] == datetime(2024, 1, 6)
+
+
+def test_compaction_rebuilds_incomplete_rollups(db, dataset_id):
+    # Points stored before rollups were maintained must reach them before deletion
+    add_hourly_points(db, dataset_id, 4)
+    db.query(models.DataRollup).filter(models.DataRollup.dataset_id == dataset_id).delete()
+    db.commit()
+    assert not rollup_service.is_complete(db, dataset_id)
+
+    policy = retention_service.set_policy(db, dataset_id, 1)
+    retention_service.compact(db, policy, now=datetime(2024, 1, 4, 12))
+    assert rollup_service.is_complete(db, dataset_id)
+    days = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["day"])
+    assert [b["count"] for b in days] == [24] * 4
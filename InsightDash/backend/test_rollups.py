@@ -0,0 +1,97 @@
+"""
+Checks for the time-bucket rollup tables: incremental folds, rebuilds and coverage
+
+Needs the throwaway database from conftest.py: pytest test_rollups.py
+"""
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from app.models import models
+from app.services.rollups import ROLLUP_BUCKETS, rollup_service
+
+START = datetime(2024, 1, 1, 23, 30)
+
+
+def make_points(count, offset=0):
+    timestamps = [START + timedelta(minutes=7 * (offset + i)) for i in range(count)]
+    values = [float((offset + i) % 17) - 3.5 for i in range(count)]
+    return timestamps, values
+
+
+def store(db, dataset_id, timestamps, values):
+    db.execute(insert(models.DataPoint.__table__), [
+        {"dataset_id": dataset_id, "timestamp": ts, "value": value}
+        for ts, value in zip(timestamps, values)
+    ])
+    rollup_service.apply(db, dataset_id, timestamps, values)
+    db.commit()
+
+
+def test_incremental_batches_match_a_rebuild(db, dataset_id):
+    for offset in (0, 300, 120):  # The last batch lands in already-rolled-up buckets
+        store(db, dataset_id, *make_points(150, offset))
+    incremental = {
+        seconds: rollup_service.query(db, dataset_id, seconds) for seconds in ROLLUP_BUCKETS.values()
+    }
+
+    assert rollup_service.rebuild(db, dataset_id) == 450
+    for seconds, buckets in incremental.items():
+        rebuilt = rollup_service.query(db, dataset_id, seconds)
+        assert [b["bucket_start"] for b in buckets] == [b["bucket_start"] for b in rebuilt]
+        for before, after in zip(buckets, rebuilt):
+            assert before["count"] == after["count"]
+            assert before["min"] == after["min"] and before["max"] == after["max"]
+            assert math.isclose(before["sum"], after["sum"], abs_tol=1e-9)
+
+
+def test_bucket_statistics(db, dataset_id):
+    timestamps, values = make_points(400)
+    store(db, dataset_id, timestamps, values)
+
+    days = rollup_service.query(db, dataset_id, ROLLUP_BUCKETS["day"])
+    assert sum(b["count"] for b in days) == 400
+    assert days[0]["bucket_start"] == datetime(2024, 1, 1)
+
+    first_day = [v for ts, v in zip(timestamps, values) if ts.date() == START.date()]
+    assert days[0]["count"] == len(first_day)
+    assert math.isclose(days[0]["avg"], np.mean(first_day))
+    assert math.isclose(days[0]["stddev"], np.std(first_day, ddof=1))
+    assert days[0]["min"] == min(first_day) and days[0]["max"] == max(first_day)
+
+
+def test_query_bounds(db, dataset_id):
+    store(db, dataset_id, *make_points(100))
+    hours = rollup_service.query(
+        db, dataset_id, ROLLUP_BUCKETS["hour"], datetime(2024, 1, 2, 1), datetime(2024, 1, 2, 3)
+    )
+    assert [b["bucket_start"].hour for b in hours] == [1, 2, 3]
+
+
+def test_stddev_needs_two_values():
+    assert rollup_service.stddev(0, 0.0, 0.0) is None
+    assert rollup_service.stddev(1, 5.0, 25.0) is None
+    assert rollup_service.stddev(2, 2.0, 2.0) == 0.0
+
+
+def test_coverage(db, dataset_id):
+    assert not rollup_service.is_complete(db, dataset_id)
+    rollup_service.rebuild(db, dataset_id)
+    assert rollup_service.is_complete(db, dataset_id)
+
+    # Marking again refreshes the row instead of failing
+    rollup_service.mark_complete(db, dataset_id)
+    db.commit()
+    rollup_service.drop_dataset(db, dataset_id)
+    db.commit()
+    assert not rollup_service.is_complete(db, dataset_id)
+
+
+@pytest.mark.parametrize("seconds", list(ROLLUP_BUCKETS.values()))
+def test_empty_batch_is_a_no_op(db, dataset_id, seconds):
+    rollup_service.apply(db, dataset_id, [], [])
+    db.commit()
+    assert rollup_service.query(db, dataset_id, seconds) == []
@@ -0,0 +1,67 @@
+"""
+Checks for promoted meta_data fields: key validation, backfill and unsynced reads
+
+Needs the throwaway database from conftest.py: pytest test_schema_registry.py
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from app.models import models
+from app.services.forecast_jobs import load_forecast_batch, load_forecast_data
+from app.services.schema_registry import schema_registry
+
+START = datetime(2024, 1, 1)
+
+
+def add_points(db, dataset_id, values, offset=0):
+    rows = [
+        {
+            "dataset_id": dataset_id,
+            "timestamp": START + timedelta(hours=offset + i),
+            "value": 0.0,
+            "meta_data": {"load": value} if value is not None else {"note": "no reading"},
+        }
+        for i, value in enumerate(values)
+    ]
+    db.execute(insert(models.DataPoint.__table__), rows)
+    db.commit()
+
+
+def test_promote_validates_key(db, dataset_id):
+    for name in ("bad key", "a'); DROP TABLE data_points; --", "", "value"):
+        with pytest.raises(ValueError):
+            schema_registry.promote(db, dataset_id, name)
+    assert schema_registry.promote(db, dataset_id, "load").backfill_status == "pending"
+
+
+def test_reads_include_points_written_after_sync(db, dataset_id):
+    add_points(db, dataset_id, [1.5, None, 2.5, "3.5", True])
+    field = schema_registry.promote(db, dataset_id, "load")
+    schema_registry.backfill(db, field.id)
+    db.refresh(field)
+    assert field.backfill_status == "complete"
+
+    # Only JSON numbers are copied, in the backfill and the unsynced tail alike
+    assert np.array_equal(schema_registry.read_field(db, field)["load"], [1.5, 2.5])
+
+    # Written after the backfill, no sync yet; one lands before the synced points
+    add_points(db, dataset_id, [3.5, "n/a", 4.5, 5.5], offset=10)
+    add_points(db, dataset_id, [0.5], offset=-5)
+
+    columns = schema_registry.read_field(db, field)
+    assert np.array_equal(columns["load"], [0.5, 1.5, 2.5, 3.5, 4.5, 5.5])
+    assert columns["timestamp"] == sorted(columns["timestamp"])
+
+    data, count = load_forecast_data(db, dataset_id, "load")
+    assert count == 6 and np.array_equal(data["load"], columns["load"])
+    (batch, batch_count), = load_forecast_batch(db, [(dataset_id, "load")]).values()
+    assert batch_count == 6 and np.array_equal(batch["load"], columns["load"])
+
+    # Once synced, the same series comes from data_point_fields alone
+    schema_registry.sync(db, dataset_id)
+    db.refresh(field)
+    assert schema_registry.read_unsynced(db, field)[0] == []
+    assert np.array_equal(schema_registry.read_field(db, field)["load"], columns["load"])
@@ -0,0 +1,121 @@
+"""
+Checks for the columnar segment store: sealing, mapped reads and compaction
+
+Needs the throwaway database from conftest.py: pytest test_segments.py
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.models import models
+from app.services.segments import segment_store, to_ns
+from app.services.summaries import summary_service
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def segments_on(monkeypatch):
+    monkeypatch.setattr(settings, "segment_storage_enabled", True)
+    monkeypatch.setattr(settings, "segment_seal_rows", 100)
+
+
+def add_points(db, dataset_id, count, offset=0):
+    rows = [
+        {
+            "dataset_id": dataset_id,
+            "timestamp": START + timedelta(minutes=offset + i),
+            "value": float(offset + i),
+            "meta_data": {"temperature": (offset + i) / 2, "region": "north"},
+        }
+        for i in range(count)
+    ]
+    db.execute(insert(models.DataPoint.__table__), rows)
+    db.commit()
+
+
+def test_seal_and_read_round_trip(db, dataset_id):
+    add_points(db, dataset_id, 250)
+    assert segment_store.maybe_seal(db, dataset_id) is not None
+    assert segment_store.maybe_seal(db, dataset_id) is not None
+    assert segment_store.maybe_seal(db, dataset_id) is None  # 50 left, under a full segment
+    assert segment_store.watermark(db, dataset_id) > 0
+
+    columns = segment_store.read(db, dataset_id)
+    assert np.array_equal(columns["value"], np.arange(250.0))
+    assert np.array_equal(columns["temperature"], np.arange(250.0) / 2)
+    assert "region" not in columns  # Only numeric keys become columns
+    assert columns["timestamp"][0] == to_ns(START)
+
+
+def test_read_range_with_aware_bounds(db, dataset_id):
+    add_points(db, dataset_id, 150)
+    segment_store.seal(db, dataset_id)
+
+    naive = segment_store.read(db, dataset_id, START + timedelta(minutes=90), START + timedelta(minutes=120))
+    plus_two = timezone(timedelta(hours=2))
+    aware = segment_store.read(
+        db, dataset_id,
+        (START + timedelta(minutes=90, hours=2)).replace(tzinfo=plus_two),
+        (START + timedelta(minutes=120, hours=2)).replace(tzinfo=plus_two),
+    )
+    assert np.array_equal(naive["value"], np.arange(90.0, 121.0))
+    assert np.array_equal(aware["value"], naive["value"])
+
+
+def test_compaction_empties_the_buffer(db, dataset_id, monkeypatch):
+    monkeypatch.setattr(settings, "segment_compact_sealed", True)
+    add_points(db, dataset_id, 230)
+    # Points stay buffered until they are folded into the statistics
+    assert segment_store.maybe_seal(db, dataset_id) is None
+    summary_service.fold(db, dataset_id)
+    while segment_store.maybe_seal(db, dataset_id):
+        pass
+
+    buffered = db.query(func.count(models.DataPoint.id)).filter(
+        models.DataPoint.dataset_id == dataset_id
+    ).scalar()
+    assert buffered == 30
+    assert np.array_equal(segment_store.read(db, dataset_id)["value"], np.arange(230.0))
+
+    # New points past the watermark are still read from the buffer
+    add_points(db, dataset_id, 5, offset=230)
+    assert np.array_equal(segment_store.read(db, dataset_id)["value"], np.arange(235.0))
+
+
+def test_appends_match_a_full_build(db, dataset_id):
+    """Segments appended in place or merged out of order equal a rebuild from scratch"""
+    add_points(db, dataset_id, 100)
+    add_points(db, dataset_id, 100, offset=300)
+    add_points(db, dataset_id, 100, offset=150)  # Overlaps the mapped tail: merged
+    while segment_store.maybe_seal(db, dataset_id):
+        pass
+
+    mapped = segment_store.open_series(dataset_id)
+    appended = {key: np.array(mapped.column(key)) for key in ("timestamp", "value", "temperature")}
+    with segment_store._locked(dataset_id):
+        rebuilt = segment_store.materialize(db, dataset_id)
+    for key, array in appended.items():
+        assert np.array_equal(array, rebuilt.column(key))
+    assert np.all(np.diff(appended["timestamp"]) >= 0)
+
+    view = segment_store.read(db, dataset_id, START + timedelta(minutes=120), START + timedelta(minutes=320))
+    assert isinstance(view["value"], np.memmap)
+    assert view["value"][0] == 150.0 and view["value"][-1] == 320.0
+
+
+def test_second_seal_of_a_range_is_rejected(db, dataset_id):
+    add_points(db, dataset_id, 100)
+    first = segment_store.seal(db, dataset_id)
+    duplicate = models.DataSegment(
+        dataset_id=dataset_id, path="dup.npz", row_count=1,
+        first_point_id=first.first_point_id, last_point_id=first.last_point_id,
+    )
+    db.add(duplicate)
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
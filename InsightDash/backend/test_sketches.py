@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Error-bound checks for the mergeable sketches (KLL, HyperLogLog, Space-Saving)
+
+Runs without a server: python test_sketches.py (or pytest test_sketches.py)
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from app.services.sketches import HyperLogLog, KLLSketch, SpaceSaving, sketch_service
+
+
+def kll_of(batches, k=200):
+    """One KLL sketch per batch, merged, as day buckets are at query time"""
+    merged = KLLSketch(k)
+    for batch in batches:
+        sketch = KLLSketch(k)
+        sketch.update(batch)
+        merged.merge(KLLSketch.from_state(sketch.state()))
+    return merged
+
+
+def test_kll_rank_error():
+    """Merged KLL quantiles stay within 2% rank error of the exact ones"""
+    rng = np.random.default_rng(7)
+    values = np.concatenate([rng.normal(0, 1, 60000), rng.exponential(5, 40000)])
+    sketch = kll_of(np.array_split(rng.permutation(values), 20))
+    ordered = np.sort(values)
+
+    assert sketch.n == len(values)
+    assert sketch.min == ordered[0] and sketch.max == ordered[-1]
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99):
+        rank = np.searchsorted(ordered, sketch.quantile(q)) / len(values)
+        assert abs(rank - q) <= 0.02, (q, rank)
+
+
+def test_kll_stays_small():
+    rng = np.random.default_rng(8)
+    sketch = kll_of(np.array_split(rng.normal(size=200000), 50))
+    assert sum(len(level) for level in sketch.levels) < 2000
+
+
+def test_hll_relative_error():
+    """Estimates within 3 standard errors (1.04 / sqrt(m)) across cardinalities"""
+    p = 12
+    bound = 3 * 1.04 / np.sqrt(1 << p)
+    for distinct in (100, 5000, 200000):
+        items = np.arange(distinct, dtype=np.float64) * 1.5
+        merged = HyperLogLog(p)
+        for part in np.array_split(np.random.default_rng(distinct).permutation(items), 8):
+            hll = HyperLogLog(p)
+            # Repeats must not count twice
+            hll.update(pd.util.hash_array(np.concatenate([part, part[: len(part) // 2]])))
+            merged.merge(HyperLogLog.from_state(hll.state(), p))
+        assert abs(merged.estimate() - distinct) / distinct <= bound, (distinct, merged.estimate())
+
+
+def test_space_saving_bounds():
+    """Every monitored count brackets the true count; the heaviest items are found"""
+    rng = np.random.default_rng(9)
+    stream = rng.zipf(1.3, 100000)
+    stream = stream[stream < 10000]
+    exact = Counter(stream.tolist())
+
+    capacity = 64
+    summary = SpaceSaving(capacity)
+    for part in np.array_split(stream, 25):
+        counts = Counter(part.tolist()).most_common()
+        summary.merge(SpaceSaving.from_counts(counts, capacity))
+
+    top = summary.top(capacity)
+    for entry in top:
+        true_count = exact[int(entry["item"])]
+        assert entry["lower_bound"] <= true_count <= entry["count"], entry
+    for item, count in exact.items():
+        if str(item) not in summary.items:
+            assert count <= summary.floor, (item, count, summary.floor)
+
+    reported = [int(entry["item"]) for entry in top[:5]]
+    assert reported == [item for item, _ in exact.most_common(5)]
+
+
+def test_summarize_mixed_column():
+    """Numbers and strings in one column feed the right sketches"""
+    raw = [1, 2, 2, "north", "north", "north", None, 3.5]
+    sketch = sketch_service._summarize(raw)
+    assert sketch["count"] == 7
+    assert sketch["quantiles"].n == 4
+    assert sketch["distinct"].estimate() == 4
+    assert sketch["top"].top(1)[0] == {"item": "north", "count": 3, "lower_bound": 3}
+
+
+if __name__ == "__main__":
+    for test in (test_kll_rank_error, test_kll_stays_small, test_hll_relative_error,
+                 test_space_saving_bounds, test_summarize_mixed_column):
+        test()
+        print(f"{test.__name__}: ok")
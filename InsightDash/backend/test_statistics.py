@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Checks that incrementally maintained dataset statistics match a full pass
+
+Batches are folded with the Chan / Welford merge used on insert and taken
+back out with the inverse update used by retention; both must agree with
+numpy/pandas over the same points. Runs without a server.
+"""
+import numpy as np
+import pandas as pd
+
+from app.services.statistics import statistics_service
+
+
+def make_points(n, seed):
+    rng = np.random.default_rng(seed)
+    value = rng.normal(1e6, 5, n)  # large offset: naive sum-of-squares would cancel
+    temperature = value * 0.3 + rng.normal(0, 2, n)
+    humidity = rng.normal(50, 10, n)
+    meta_data = []
+    for t, h, missing in zip(temperature, humidity, rng.random(n) < 0.2):
+        meta = {"temperature": float(t), "region": "north"}
+        if not missing:
+            meta["humidity"] = float(h)
+        meta_data.append(meta)
+    return value, meta_data
+
+
+def fold(columns, batches, combine):
+    """Fold (values, meta_data) batches into pairwise moments with ``combine``"""
+    size = len(columns)
+    moments = {name: np.zeros((size, size)) for name in ("n", "mean", "m2", "comoment")}
+    for values, meta_data in batches:
+        matrix = statistics_service._matrix(columns, np.asarray(values), meta_data)
+        moments = combine(moments, statistics_service._batch_moments(matrix))
+    return moments
+
+
+def reference(columns, values, meta_data):
+    frame = pd.DataFrame(meta_data)
+    frame["value"] = values
+    return frame[columns].astype(float)
+
+
+def assert_matches(moments, frame):
+    columns = list(frame.columns)
+    for i, name in enumerate(columns):
+        column = frame[name].dropna()
+        assert moments["n"][i, i] == len(column)
+        assert np.isclose(moments["mean"][i, i], column.mean(), rtol=1e-12)
+        assert np.isclose(moments["m2"][i, i] / (len(column) - 1), column.var(ddof=1), rtol=1e-8)
+    correlations = frame.corr()
+    for i, a in enumerate(columns):
+        for j, b in enumerate(columns):
+            if i != j:
+                assert np.isclose(statistics_service._correlation(moments, i, j), correlations.loc[a, b], atol=1e-9)
+
+
+def test_chan_merge_matches_full_pass():
+    columns = ["value", "temperature", "humidity"]
+    values, meta_data = make_points(20000, seed=1)
+    batches = [(values[i:i + 1500], meta_data[i:i + 1500]) for i in range(0, len(values), 1500)]
+
+    merged = fold(columns, batches, statistics_service._merge)
+    assert_matches(merged, reference(columns, values, meta_data))
+
+
+def test_merge_order_does_not_matter():
+    columns = ["value", "temperature", "humidity"]
+    values, meta_data = make_points(5000, seed=2)
+    batches = [(values[i:i + 700], meta_data[i:i + 700]) for i in range(0, len(values), 700)]
+
+    forward = fold(columns, batches, statistics_service._merge)
+    backward = fold(columns, batches[::-1], statistics_service._merge)
+    for name in forward:
+        assert np.allclose(forward[name], backward[name], rtol=1e-9, atol=1e-6)
+
+
+def test_subtract_undoes_merge():
+    """Removing the oldest batches leaves the moments of the rest"""
+    columns = ["value", "temperature", "humidity"]
+    values, meta_data = make_points(12000, seed=3)
+    batches = [(values[i:i + 1000], meta_data[i:i + 1000]) for i in range(0, len(values), 1000)]
+
+    moments = fold(columns, batches, statistics_service._merge)
+    for removed in batches[:5]:
+        matrix = statistics_service._matrix(columns, np.asarray(removed[0]), removed[1])
+        moments = statistics_service._subtract(moments, statistics_service._batch_moments(matrix))
+    assert_matches(moments, reference(columns, values[5000:], meta_data[5000:]))
+
+    # Taking everything out leaves nothing behind
+    for removed in batches[5:]:
+        matrix = statistics_service._matrix(columns, np.asarray(removed[0]), removed[1])
+        moments = statistics_service._subtract(moments, statistics_service._batch_moments(matrix))
+    for name in moments:
+        assert not moments[name].any()
+
+
+def test_new_columns_join_at_the_end():
+    columns = statistics_service._batch_columns(["value", "temperature"], [
+        {"humidity": 1.0, "region": "north", "flag": True},
+        {"pressure": 2},
+    ])
+    assert columns == ["value", "temperature", "humidity", "pressure"]
+
+
+if __name__ == "__main__":
+    for test in (test_chan_merge_matches_full_pass, test_merge_order_does_not_matter,
+                 test_subtract_undoes_merge, test_new_columns_join_at_the_end):
+        test()
+        print(f"{test.__name__}: ok")
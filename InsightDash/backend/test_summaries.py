@@ -0,0 +1,97 @@
+"""
+Checks for statistics and sketches folded in behind the write path
+
+Needs the throwaway database from conftest.py: pytest test_summaries.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app.models import models
+from app.services.ingest import ingest_service
+from app.services.retention import retention_service
+from app.services.sketches import sketch_service
+from app.services.statistics import statistics_service
+from app.services.summaries import summary_service
+
+START = datetime(2024, 1, 1)
+
+
+def write(db, dataset_id, count, offset=0):
+    points = [
+        {
+            "dataset_id": dataset_id,
+            "timestamp": START + timedelta(hours=offset + i),
+            "value": float((offset + i) % 13),
+            "meta_data": {"load": (offset + i) * 0.5, "region": f"r{i % 3}"},
+        }
+        for i in range(count)
+    ]
+    rows = ingest_service.write_points(db, points)
+    db.commit()
+    return rows
+
+
+def version(db, dataset_id):
+    return db.get(models.Dataset, dataset_id, populate_existing=True).version
+
+
+def test_writes_leave_summaries_to_the_fold(db, dataset_id):
+    rows = write(db, dataset_id, 50)
+    assert statistics_service.summary(db, dataset_id) is None
+    assert sketch_service.query(db, dataset_id)["columns"] == {}
+
+    before = version(db, dataset_id)
+    assert summary_service.fold(db, dataset_id, batch_rows=20) == 50
+    assert statistics_service.folded_through(db, dataset_id) == rows[-1]["id"]
+    assert version(db, dataset_id) > before
+    assert statistics_service.summary(db, dataset_id)["row_count"] == 50
+    assert sketch_service.query(db, dataset_id)["columns"]["load"]["count"] == 50
+
+    # Nothing new: no work, no version bump
+    before = version(db, dataset_id)
+    assert summary_service.fold(db, dataset_id) == 0
+    assert version(db, dataset_id) == before
+
+
+def test_folds_match_rebuilds(db, dataset_id):
+    for offset in (0, 30, 90):
+        write(db, dataset_id, 30, offset)
+        summary_service.fold(db, dataset_id, batch_rows=7)
+    folded_stats = statistics_service.summary(db, dataset_id)
+    folded_sketches = sketch_service.query(db, dataset_id)
+
+    statistics_service.rebuild(db, dataset_id)
+    sketch_service.rebuild(db, dataset_id)
+    for name, column in statistics_service.summary(db, dataset_id)["summary"].items():
+        assert column == pytest.approx(folded_stats["summary"][name])
+    rebuilt = sketch_service.query(db, dataset_id)["columns"]
+    for name, column in folded_sketches["columns"].items():
+        assert rebuilt[name]["count"] == column["count"]
+        assert rebuilt[name]["distinct"] == column["distinct"]
+
+
+def test_rebuilds_stop_at_the_watermark(db, dataset_id):
+    write(db, dataset_id, 10)
+    summary_service.fold(db, dataset_id)
+    write(db, dataset_id, 5, offset=10)
+
+    # Unfolded points are left to the next fold rather than counted twice
+    assert statistics_service.rebuild(db, dataset_id).row_count == 10
+    assert sketch_service.rebuild(db, dataset_id) == 10
+    summary_service.fold(db, dataset_id)
+    assert statistics_service.summary(db, dataset_id)["row_count"] == 15
+    assert sketch_service.query(db, dataset_id)["columns"]["value"]["count"] == 15
+
+
+def test_retention_only_subtracts_folded_points(db, dataset_id):
+    write(db, dataset_id, 10, offset=100)
+    summary_service.fold(db, dataset_id)
+    write(db, dataset_id, 5)  # Older timestamps, not folded yet
+
+    deleted = retention_service._delete_points(db, dataset_id, START + timedelta(hours=103))
+    assert deleted == 8
+    summary_service.fold(db, dataset_id)
+    remaining = db.query(func.count(models.DataPoint.id)).filter(models.DataPoint.dataset_id == dataset_id).scalar()
+    assert statistics_service.summary(db, dataset_id)["row_count"] == remaining == 7